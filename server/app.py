@@ -1,24 +1,34 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Request, request, jsonify, send_file, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import BadRequest, UnsupportedMediaType
 import cobra
 from cobra import Model, Reaction, Metabolite
 from cobra.io.mat import create_mat_dict
 from cobra.io import write_sbml_model
 from cobra.io import save_json_model
+from cobra.util.context import get_context
+from cobra.util.solver import linear_reaction_coefficients
+from cobra.exceptions import OptimizationError
+import ast
 import time
 import os
 import tempfile
 import uuid
 import pickle
 import re
-from collections import defaultdict
+import hashlib
+from collections import defaultdict, OrderedDict, deque
 from scipy.io import savemat
+from scipy import sparse
 import io
-from collections import defaultdict
 import math
 import numpy as np
 import base64
 import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
 import networkx as nx
 import gseapy as gp
 import json
@@ -27,12 +37,31 @@ import sys
 import shutil
 import zipfile
 import threading
+import functools
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import gzip
+
+try:
+    import msgpack
+except ImportError:  # optional: MessagePack bodies are refused with 415/406 without it
+    msgpack = None
+try:
+    import brotli
+except ImportError:  # optional: responses are gzip-compressed only without it
+    brotli = None
 
 from cobra.flux_analysis import pfba
 from cobra.flux_analysis import flux_variability_analysis
 from cobra.flux_analysis.loopless import loopless_solution
 from cobra.flux_analysis import single_reaction_deletion, single_gene_deletion
 
+import flux_worker
+from flux_worker import apply_bound_edits, Histogram, LPStats, timed_lps
+
 app = Flask(__name__)
 CORS(app)
 
@@ -43,6 +72,83 @@ cached_data = {
     "Other": None
 }
 
+met_namespaces = None  # {"KEGG": set, "BIGG": set} of cleaned metabolite ids
+currency_matchers = {}  # (db, keywords) -> CurrencyMatcher
+search_indexes = {}  # db -> ReactionSearchIndex
+catalog_records = {}  # db -> (reaction records, metabolite records) keyed by Abbreviation
+
+# Source files of each catalog, and where their Arrow IPC snapshots live. Every
+# worker memory-maps the same snapshot files, so the stoichiometry arrays are
+# shared through the page cache instead of being parsed into each process.
+# Only those arrays are shared: the reaction and metabolite tables, the id
+# lists and the indexes built from them (search, currency, records) are
+# Python objects, so each worker still holds its own copy of them. The
+# snapshot spares them the CSV parsing, not the memory.
+catalog_sources = {
+    "BIGG": [
+        './../data/BiGG/smatrix-v2.parquet',
+        './../data/BiGG/reactions.csv',
+        './../data/BiGG/bigg_models_metabolites.txt'
+    ],
+    "KEGG": [
+        "./../data/KEGG/currmets_kegg.txt",
+        "./../data/KEGG/kegg_smat.parquet",
+        "./../data/KEGG/kegg_reactions.tsv",
+        "./../data/KEGG/kegg_metabolites.tsv"
+    ]
+}
+snapshot_dir = os.environ.get("NAVIFLUX_SNAPSHOT_DIR", "./../data/snapshots")
+snapshot_version = 1
+
+# One re-entrant lock per catalog so concurrent first requests load it once;
+# re-entrant because the search index and matchers are built under the same
+# lock and call get_data() themselves.
+catalog_locks = {db: threading.RLock() for db in cached_data}
+namespace_lock = threading.Lock()
+
+# Load state and timings reported by /readyz
+catalog_status = {
+    "BIGG": {"state": "pending"},
+    "KEGG": {"state": "pending"},
+    "namespaces": {"state": "pending"}
+}
+
+# Upload responses keyed by content hash, so re-uploading a model skips cobra
+# parsing and pathway extraction. Bounded by the size of the response bodies.
+upload_cache_bytes = int(float(os.environ.get("NAVIFLUX_UPLOAD_CACHE_MB", "512")) * 2**20)
+
+# Compiled models of the visualizer, so analyses can reference a session id
+# instead of resending and rebuilding the whole model.
+session_cache_bytes = int(float(os.environ.get("NAVIFLUX_SESSION_CACHE_MB", "1024")) * 2**20)
+
+# Long flux analyses (fva, srd, sgd, loopless) run as jobs on a pool of solver
+# processes (flux_worker.py); finished jobs are kept for job_ttl_seconds.
+# NAVIFLUX_SOLVER_WORKERS is the solver budget of the whole server. Each web
+# worker (gunicorn -w N) runs its own pool, so a pool gets an equal share of
+# the budget: set NAVIFLUX_WEB_WORKERS (or gunicorn's WEB_CONCURRENCY) to N.
+solver_budget = int(os.environ.get("NAVIFLUX_SOLVER_WORKERS", os.cpu_count() or 1))
+web_workers = int(os.environ.get("NAVIFLUX_WEB_WORKERS", os.environ.get("WEB_CONCURRENCY", "1")))
+solver_workers = max(1, solver_budget // max(1, web_workers))  # this process's pool size
+job_ttl_seconds = float(os.environ.get("NAVIFLUX_JOB_TTL", "3600"))
+# Samples per flux sampling chain (task). Fixed, not derived from the pool
+# size, so that the chains and their seeds, and hence the samples of a seeded
+# request, are the same whatever the number of workers.
+sample_chain_size = 250
+solver_pool = None
+solver_pool_lock = threading.Lock()
+flux_jobs = {}  # job id -> FluxJob
+flux_jobs_lock = threading.Lock()
+
+# Flux analysis results keyed by a canonical hash of the model and the analysis
+# parameters, so repeating an analysis on an unchanged model skips the solver.
+# Results are also written under result_cache_dir (unless set empty) to survive
+# restarts; the directory is pruned to result_cache_disk_bytes, oldest first.
+result_cache_bytes = int(float(os.environ.get("NAVIFLUX_RESULT_CACHE_MB", "256")) * 2**20)
+result_cache_dir = os.environ.get("NAVIFLUX_RESULT_CACHE_DIR", "./../data/result-cache")
+result_cache_disk_bytes = int(float(os.environ.get("NAVIFLUX_RESULT_CACHE_DISK_MB", "2048")) * 2**20)
+result_cache_version = 1  # bumped when the results of the same inputs change
+result_cache_dir_lock = threading.Lock()
+
 compartments = {
     "c": "Cytoplasm",
     "n": "Nucleus",
@@ -68,10 +174,142 @@ key_map = {
     "EC": "ec-code"
 }
 
+# Wire formats offered on /api/v1/* besides JSON, chosen by Content-Type for
+# request bodies and by Accept for responses.
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+# Responses at least this large are compressed when the client accepts it.
+compress_min_bytes = int(os.environ.get("NAVIFLUX_COMPRESS_MIN_BYTES", "1024"))
+
+COMPRESSIBLE_MIMETYPES = (JSON_MIMETYPE, ARROW_STREAM_MIMETYPE, "application/xml") + MSGPACK_MIMETYPES
+
+# Request phase timings (parse, build, solve, serialize) and LP statistics of
+# every solve, per endpoint, as served by /api/v1/metrics. Responses carry the
+# phases in a Server-Timing header, and a `diagnostics` block on request.
+phase_buckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+metrics_started = time.time()
+metrics_lock = threading.Lock()
+endpoint_metrics = {}  # endpoint -> {"requests", "errors", "phases": {phase: Histogram}}
+lp_totals = LPStats()
+
+
+class SparseStoichiometry:
+    """
+    Catalog stoichiometric matrix held as CSR (by metabolite) and CSC (by reaction).
+    Only nonzero coefficients are stored; ids are mapped to integer positions.
+    """
+
+    def __init__(self, matrix, met_ids, rxn_ids, by_rxn=None):
+        self.index = list(met_ids)
+        self.columns = list(rxn_ids)
+        self.met_pos = {met: i for i, met in enumerate(self.index)}
+        self.rxn_pos = {rxn: j for j, rxn in enumerate(self.columns)}
+        if by_rxn is None:
+            self.by_met = sparse.csr_matrix(matrix, dtype=np.float64)
+            self.by_met.sum_duplicates()
+            self.by_met.sort_indices()
+            self.by_rxn = self.by_met.tocsc()
+            self.by_rxn.sort_indices()
+        else:
+            # canonical CSR/CSC pair, e.g. read-only views over a snapshot
+            self.by_met = matrix
+            self.by_rxn = by_rxn
+        self.build_metabolite_index()
+
+    def build_metabolite_index(self):
+        # Inverted index from cleaned metabolite id to the reactions consuming
+        # and producing it, built once per catalog. As with the old per-call
+        # map, the last metabolite row wins when two ids clean to the same name.
+        self.cleaned_ids = {clean_met_name(met): met for met in self.index}
+        self.consumed_by = {}
+        self.produced_by = {}
+        indptr, indices, data = self.by_met.indptr, self.by_met.indices, self.by_met.data
+        for i, met in enumerate(self.index):
+            consumers = {}
+            producers = {}
+            for j, v in zip(indices[indptr[i]:indptr[i + 1]].tolist(), data[indptr[i]:indptr[i + 1]].tolist()):
+                if v < 0:
+                    consumers[self.columns[j]] = v
+                else:
+                    producers[self.columns[j]] = v
+            self.consumed_by[met] = consumers
+            self.produced_by[met] = producers
+
+    def resolve(self, metabolite_name, cleaned=True):
+        """Catalog row id for a metabolite, or None if it is not in the catalog."""
+        if cleaned:
+            return self.cleaned_ids.get(clean_met_name(metabolite_name))
+        return metabolite_name if metabolite_name in self.met_pos else None
+
+    def reactions_touching(self, met_id):
+        """Reactions consuming or producing a catalog metabolite, in column order."""
+        return [rxn for rxn, _ in self.met_row(met_id)]
+
+    def reactions_converting(self, substrate_id, product_id):
+        """Reactions that consume substrate_id and produce product_id, in column order."""
+        produced = self.produced_by[product_id]
+        return [rxn for rxn in self.consumed_by[substrate_id] if rxn in produced]
+
+    @classmethod
+    def from_parquet(cls, path, engine="auto", index_col=None, chunk_size=2000):
+        # Read a bounded number of reaction columns at a time so the dense
+        # matrix is never fully materialised.
+        schema = pq.read_schema(path)
+        pandas_meta = schema.pandas_metadata or {}
+        skip = {c for c in pandas_meta.get("index_columns", []) if isinstance(c, str)}
+        if index_col:
+            skip.add(index_col)
+        rxn_ids = [c for c in schema.names if c not in skip]
+
+        met_ids = None
+        rows, cols, vals = [], [], []
+        for start in range(0, len(rxn_ids), chunk_size):
+            chunk = rxn_ids[start:start + chunk_size]
+            frame = pd.read_parquet(path, engine=engine, columns=chunk + ([index_col] if index_col else []))
+            if index_col:
+                frame = frame.set_index(index_col)
+            if met_ids is None:
+                met_ids = frame.index.tolist()
+            values = frame[chunk].to_numpy(dtype=np.float64)
+            values[np.isnan(values)] = 0.0
+            r, c = np.nonzero(values)
+            rows.append(r)
+            cols.append(c + start)
+            vals.append(values[r, c])
+            del frame, values
+
+        met_ids = met_ids or []
+        matrix = sparse.coo_matrix(
+            (np.concatenate(vals) if vals else [], (np.concatenate(rows) if rows else [], np.concatenate(cols) if cols else [])),
+            shape=(len(met_ids), len(rxn_ids))
+        )
+        return cls(matrix, met_ids, rxn_ids)
+
+    def met_row(self, met_id):
+        """Nonzero (reaction, coefficient) pairs of a metabolite, in column order."""
+        i = self.met_pos[met_id]
+        start, end = self.by_met.indptr[i], self.by_met.indptr[i + 1]
+        return [
+            (self.columns[j], float(v))
+            for j, v in zip(self.by_met.indices[start:end], self.by_met.data[start:end])
+        ]
+
+    def reaction_items(self, rxn_id):
+        """Nonzero (metabolite, coefficient) pairs of a reaction, in row order."""
+        j = self.rxn_pos[rxn_id]
+        start, end = self.by_rxn.indptr[j], self.by_rxn.indptr[j + 1]
+        return [
+            (self.index[i], float(v))
+            for i, v in zip(self.by_rxn.indices[start:end], self.by_rxn.data[start:end])
+        ]
+
+
 def get_data(db="Other"):
     """
-    Returns (cur_metabolites, smat, df, df2) for the requested DB.
-    Loads from disk only if not already cached.
+    Returns (cur_metabolites, smat, df, df2) for the requested DB, where smat
+    is a SparseStoichiometry. Loads from disk only if not already cached.
     """
     global cached_data
 
@@ -82,19 +320,48 @@ def get_data(db="Other"):
         # already loaded, return cached version
         return cached_data[db]
 
-    # load data depending on DB
+    with catalog_locks[db]:
+        if cached_data[db] is not None:
+            # loaded by another thread while we waited
+            return cached_data[db]
+
+        if db in catalog_status:
+            catalog_status[db] = {"state": "loading"}
+        tic = time.time()
+
+        try:
+            source = "snapshot"
+            loaded = load_catalog_snapshot(db)
+            if loaded is None:
+                source = "files"
+                loaded = load_catalog_sources(db)
+                write_catalog_snapshot(db, loaded)
+            cur_metabolites, smat, df, df2 = loaded
+        except Exception as e:
+            if db in catalog_status:
+                catalog_status[db] = {"state": "error", "error": str(e)}
+            raise
+
+        # cache it
+        cached_data[db] = (cur_metabolites, smat, df, df2)
+        if db in catalog_status:
+            catalog_status[db] = {"state": "ready", "source": source, "load_seconds": round(time.time() - tic, 3)}
+        return cached_data[db]
+
+
+def load_catalog_sources(db):
+    """Parses (cur_metabolites, smat, df, df2) for a DB from the files under data/."""
     if db == "BIGG":
         cur_metabolites = []
-        smat = pd.read_parquet('./../data/BiGG/smatrix-v2.parquet')
+        smat = SparseStoichiometry.from_parquet('./../data/BiGG/smatrix-v2.parquet')
         df = pd.read_csv('./../data/BiGG/reactions.csv', index_col=0)
         df2 = pd.read_csv('./../data/BiGG/bigg_models_metabolites.txt', sep="\t")
     elif db == "KEGG":  # KEGG
         with open("./../data/KEGG/currmets_kegg.txt") as f:
             cur_metabolites = [clean_met_name(line.strip()) for line in f if line.strip()]
-        kegg_smat = pd.read_parquet("./../data/KEGG/kegg_smat.parquet", engine="fastparquet")
-        kegg_smat.set_index('Unnamed: 0', inplace=True)
-        kegg_smat.index.name = None
-        smat = kegg_smat
+        smat = SparseStoichiometry.from_parquet(
+            "./../data/KEGG/kegg_smat.parquet", engine="fastparquet", index_col="Unnamed: 0"
+        )
         df = pd.read_csv("./../data/KEGG/kegg_reactions.tsv", sep="\t")
         df2 = pd.read_csv("./../data/KEGG/kegg_metabolites.tsv", sep="\t")
     else:
@@ -102,22 +369,1154 @@ def get_data(db="Other"):
         smat = None
         df = None
         df2 = None
+    return cur_metabolites, smat, df, df2
+
+
+def catalog_signature(db):
+    """Size and mtime of every source file of a catalog; a snapshot is valid only for these."""
+    return {
+        path: [os.stat(path).st_size, os.stat(path).st_mtime_ns]
+        for path in catalog_sources[db]
+    }
+
 
-    # cache it
-    cached_data[db] = (cur_metabolites, smat, df, df2)
-    return cached_data[db]
+def snapshot_path(db, part):
+    return os.path.join(snapshot_dir, f"{db.lower()}.{part}.arrow")
+
+
+def write_snapshot_table(path, table):
+    # write next to the target and rename, so readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_snapshot_table(path):
+    # The memory map is not closed here: the returned table's buffers point into it.
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def write_catalog_snapshot(db, loaded):
+    """
+    Writes a catalog as Arrow IPC files under snapshot_dir. Best effort: a
+    catalog that cannot be converted or a read-only directory only means the
+    next process parses the source files again.
+    """
+    if not snapshot_dir or db not in catalog_sources:
+        return
+    cur_metabolites, smat, df, df2 = loaded
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        metadata = {
+            b"navifluX.snapshot_version": str(snapshot_version).encode(),
+            b"navifluX.sources": json.dumps(catalog_signature(db)).encode()
+        }
+        tables = {
+            "stoichiometry": pa.table({
+                "csr_indices": smat.by_met.indices.astype(np.int32),
+                "csr_data": smat.by_met.data,
+                "csc_indices": smat.by_rxn.indices.astype(np.int32),
+                "csc_data": smat.by_rxn.data
+            }).replace_schema_metadata({b"navifluX.currency": json.dumps(cur_metabolites).encode()}),
+            "metabolite_ids": pa.table({
+                "id": pa.array([str(met) for met in smat.index]),
+                "csr_end": smat.by_met.indptr[1:].astype(np.int64)
+            }),
+            "reaction_ids": pa.table({
+                "id": pa.array([str(rxn) for rxn in smat.columns]),
+                "csc_end": smat.by_rxn.indptr[1:].astype(np.int64)
+            }),
+            "reactions": pa.Table.from_pandas(df),
+            "metabolites": pa.Table.from_pandas(df2)
+        }
+        for part, table in tables.items():
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+            write_snapshot_table(snapshot_path(db, part), table)
+    except Exception:
+        # a failed snapshot never fails the request that loaded the catalog
+        pass
+
+
+def load_catalog_snapshot(db):
+    """
+    Memory-maps a catalog snapshot read-only. Returns None when there is no
+    snapshot or it was built from different source files. The CSR/CSC arrays
+    stay views into the map; the tables and id lists are converted to pandas
+    and Python lists, which copies them into this process.
+    """
+    if not snapshot_dir or db not in catalog_sources:
+        return None
+    try:
+        signature = catalog_signature(db)
+        tables = {}
+        for part in ("stoichiometry", "metabolite_ids", "reaction_ids", "reactions", "metabolites"):
+            path = snapshot_path(db, part)
+            if not os.path.exists(path):
+                return None
+            table = read_snapshot_table(path)
+            metadata = table.schema.metadata or {}
+            if (metadata.get(b"navifluX.snapshot_version") != str(snapshot_version).encode()
+                    or json.loads(metadata.get(b"navifluX.sources", b"{}")) != signature):
+                return None
+            tables[part] = table
+    except (OSError, pa.ArrowException, ValueError):
+        return None
+
+    def column(table, name):
+        col = table.column(name)
+        col = col.chunk(0) if col.num_chunks == 1 else col.combine_chunks()
+        return col.to_numpy(zero_copy_only=False)
+
+    stoich = tables["stoichiometry"]
+    met_ids = tables["metabolite_ids"].column("id").to_pylist()
+    rxn_ids = tables["reaction_ids"].column("id").to_pylist()
+    # indptr is rebuilt (one entry per row/column) in the indices' dtype so
+    # scipy keeps the nnz-sized indices and data as views into the memory map
+    csr_indices = column(stoich, "csr_indices")
+    csc_indices = column(stoich, "csc_indices")
+    csr_indptr = np.concatenate([[0], column(tables["metabolite_ids"], "csr_end")]).astype(csr_indices.dtype)
+    csc_indptr = np.concatenate([[0], column(tables["reaction_ids"], "csc_end")]).astype(csc_indices.dtype)
+    shape = (len(met_ids), len(rxn_ids))
+    by_met = sparse.csr_matrix((column(stoich, "csr_data"), csr_indices, csr_indptr), shape=shape, copy=False)
+    by_rxn = sparse.csc_matrix((column(stoich, "csc_data"), csc_indices, csc_indptr), shape=shape, copy=False)
+    smat = SparseStoichiometry(by_met, met_ids, rxn_ids, by_rxn=by_rxn)
+    cur_metabolites = json.loads(stoich.schema.metadata[b"navifluX.currency"])
+    df = tables["reactions"].to_pandas()
+    df2 = tables["metabolites"].to_pandas()
+    return cur_metabolites, smat, df, df2
+
+
+def get_met_namespaces():
+    """
+    Returns {"KEGG": set, "BIGG": set} of cleaned catalog metabolite ids.
+    Read from disk once and kept resident for the life of the process.
+    """
+    global met_namespaces
+
+    if met_namespaces is not None:
+        return met_namespaces
+
+    with namespace_lock:
+        if met_namespaces is not None:
+            return met_namespaces
+
+        catalog_status["namespaces"] = {"state": "loading"}
+        tic = time.time()
+        try:
+            kegg_mets = pd.read_csv("./../data/KEGG/kegg_metabolites.tsv", sep="\t", usecols=["Abbreviation"])
+            bigg_mets = pd.read_csv('./../data/BiGG/bigg_models_metabolites.txt', sep="\t", usecols=["Abbreviation"])
+        except Exception as e:
+            catalog_status["namespaces"] = {"state": "error", "error": str(e)}
+            raise
+        met_namespaces = {
+            "KEGG": {clean_met_name(str(x)) for x in kegg_mets['Abbreviation'].dropna()},
+            "BIGG": {clean_met_name(str(x)) for x in bigg_mets['Abbreviation'].dropna()}
+        }
+        catalog_status["namespaces"] = {"state": "ready", "load_seconds": round(time.time() - tic, 3)}
+        return met_namespaces
 
 
 def check_kegg_bigg(met):
     cleaned_met = clean_met_name(met)
-    kegg_mets_df = pd.read_csv("./../data/KEGG/kegg_metabolites.tsv", sep="\t")
-    kegg_mets = kegg_mets_df['Abbreviation'].map(lambda x: clean_met_name(x))
-    if(any(cleaned_met == kegg_mets)):
-        return "KEGG"
-    bigg_mets_df = pd.read_csv('./../data/BiGG/bigg_models_metabolites.txt', sep="\t")
-    bigg_mets = bigg_mets_df['Abbreviation'].map(lambda x: clean_met_name(x))
-    if(any(cleaned_met == bigg_mets)):
-        return "BIGG"
+    for db, mets in get_met_namespaces().items():
+        if cleaned_met in mets:
+            return db
+
+
+def classify_metabolites(met_ids):
+    """
+    Classifies a batch of metabolite ids against the KEGG and BiGG namespaces.
+    Returns the majority database (None if no id is recognised), whether more
+    than one database was seen, and the per-database counts.
+    """
+    counts = {"KEGG": 0, "BIGG": 0, "Other": 0}
+    for met in met_ids:
+        counts[check_kegg_bigg(met) or "Other"] += 1
+
+    # ties go to KEGG, the namespace check_kegg_bigg() tries first
+    recognised = {db: n for db, n in counts.items() if db != "Other" and n > 0}
+    database = max(recognised, key=recognised.get) if recognised else None
+    return {
+        "database": database,
+        "mixed": len(recognised) > 1,
+        "counts": counts
+    }
+
+
+def check_model_database(modelData):
+    """
+    (majority database, whether the metabolites span more than one database)
+    of a visualizer model. The flag is kept as g.mixed_databases, which
+    flag_mixed_databases() reports with the response.
+    """
+    met_ids = [met for pathData in modelData.values() for met in pathData.get("metabolites", {})]
+    classification = classify_metabolites(met_ids)
+    if has_request_context():
+        g.mixed_databases = classification["mixed"]
+    return classification["database"], classification["mixed"]
+
+
+@app.after_request
+def flag_mixed_databases(response):
+    """
+    Models whose metabolites span KEGG and BiGG are analysed against the
+    majority database; the response says so in an X-Mixed-Databases header.
+    """
+    if g.get("mixed_databases"):
+        response.headers["X-Mixed-Databases"] = "true"
+    return response
+
+
+currency_keywords = [
+    "h", "k", "pi", "cl", "o2", "na1", "h2o", "co2", "atp", "adp",
+    "utp", "gtp", "gdp", "amp", "nad", "fad", "coa", "ppi", "nh4", "nh3",
+    "acp", "thf", "crn", "nadh", "fadh", "nadp", "nadph"
+]
+
+# model uploads use a shorter list so ions such as k/cl stay on the pathway
+upload_currency_keywords = [
+    "h", "pi", "o2", "na1", "h2o", "co2", "atp", "adp",
+    "amp", "nad", "fad", "coa", "ppi",
+    "nadh", "fadh", "nadp", "nadph"
+]
+
+
+class CurrencyMatcher:
+    """
+    Case-insensitive prefix matcher for currency metabolites, compiled once into
+    a single anchored regex. Results are memoized per metabolite id.
+    """
+
+    memo_limit = 200000
+
+    def __init__(self, prefixes):
+        # longest first so the alternation never stops at a shorter prefix
+        self.prefixes = sorted({p.lower() for p in prefixes if p}, key=len, reverse=True)
+        self.pattern = re.compile("|".join(re.escape(p) for p in self.prefixes)) if self.prefixes else None
+        self.memo = {}
+
+    def __call__(self, met):
+        hit = self.memo.get(met)
+        if hit is None:
+            hit = self.pattern is not None and self.pattern.match(met.lower()) is not None
+            if len(self.memo) >= self.memo_limit:
+                self.memo.clear()
+            self.memo[met] = hit
+        return hit
+
+    def match_array(self, met_ids):
+        """Boolean mask over an array of metabolite ids, evaluated in bulk."""
+        ids = np.asarray(met_ids, dtype=str)
+        if self.pattern is None or ids.size == 0:
+            return np.zeros(ids.shape, dtype=bool)
+        lowered = np.char.lower(ids)
+        return np.char.startswith(lowered[..., None], np.array(self.prefixes)).any(axis=-1)
+
+
+def get_currency_matcher(db, keywords=currency_keywords):
+    """Returns the shared CurrencyMatcher for a database and keyword list."""
+    key = (db, tuple(keywords))
+    matcher = currency_matchers.get(key)
+    if matcher is None:
+        with catalog_locks[db]:
+            matcher = currency_matchers.get(key)
+            if matcher is None:
+                cur_metabolites, _, _, _ = get_data(db)
+                matcher = currency_matchers[key] = CurrencyMatcher(cur_metabolites + list(keywords))
+    return matcher
+
+
+def model_stoichiometry(model):
+    """
+    Sparse (metabolites x reactions) CSC stoichiometric matrix of a cobra model,
+    built from the reactions' own coefficients without a dense intermediate.
+    """
+    met_pos = {met.id: i for i, met in enumerate(model.metabolites)}
+    rows, cols, vals = [], [], []
+    for j, rxn in enumerate(model.reactions):
+        for met, coef in rxn.metabolites.items():
+            rows.append(met_pos[met.id])
+            cols.append(j)
+            vals.append(coef)
+    matrix = sparse.csc_matrix(
+        (np.array(vals, dtype=np.float64), (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))),
+        shape=(len(model.metabolites), len(model.reactions))
+    )
+    matrix.sum_duplicates()
+    matrix.eliminate_zeros()
+    matrix.sort_indices()
+    return matrix
+
+
+class ModelGraph:
+    """
+    Reaction x metabolite incidence of a model as an integer-indexed CSR matrix;
+    coefficients keep their sign (negative for substrates, positive for products).
+    Built straight from modelData for the graph endpoints, without cobra objects.
+    """
+
+    def __init__(self, incidence, rxn_ids, met_ids):
+        self.incidence = incidence
+        self.rxn_ids = rxn_ids
+        self.met_ids = met_ids
+
+    @classmethod
+    def from_stoichiometry(cls, S, met_ids, rxn_ids):
+        incidence = sparse.csr_matrix(S.T)
+        incidence.sort_indices()
+        return cls(incidence, list(rxn_ids), list(met_ids))
+
+    @classmethod
+    def from_model_data(cls, modelData, is_currency_metabolite):
+        """
+        Compiles the reactions and metabolites build_cobra_model() followed by
+        clean_cobra_model() would produce, in the same order, and raises the same
+        KeyError for edges naming unknown metabolites or missing stoichiometry.
+        """
+        rxn_ids = []
+        seen = set()
+        met_pos = {}
+        rows, cols, vals = [], [], []
+        for path in modelData:
+            pathData = modelData[path]
+            known_mets = pathData['metabolites']
+            enzymes = pathData['enzymes']
+
+            reaction_mets = defaultdict(list)
+            for src, tgt in pathData['edges'] + pathData['currency_edges']:
+                if src in enzymes:  # enzyme → metabolite (product)
+                    reaction_mets[src].append(tgt)
+                elif tgt in enzymes:  # metabolite (substrate) → enzyme
+                    reaction_mets[tgt].append(src)
+
+            for enzyme_id, mets in reaction_mets.items():
+                actual_stoichiometry = pathData["stoichiometry"][enzyme_id]
+                coefficients = {}
+                for met in mets:
+                    if met not in known_mets and not is_currency_metabolite(met):
+                        raise KeyError(met)
+                    coefficients[met] = actual_stoichiometry[met]
+
+                # cobra keeps the first copy of a reaction listed in several pathways
+                if enzyme_id in seen or not enzyme_id.strip():
+                    continue
+                seen.add(enzyme_id)
+                j = len(rxn_ids)
+                rxn_ids.append(enzyme_id)
+                for met, coef in coefficients.items():
+                    if coef == 0:
+                        continue
+                    rows.append(j)
+                    cols.append(met_pos.setdefault(met, len(met_pos)))
+                    vals.append(coef)
+
+        # clean_cobra_model() re-adds metabolites without a compartment after the
+        # others, which moves them to the end in first-seen order
+        met_ids = list(met_pos)
+        valid = [bool(met.strip()) and bool(met.split('_')[-1].strip()) for met in met_ids]
+        order = [i for i, ok in enumerate(valid) if ok] + [i for i, ok in enumerate(valid) if not ok]
+        remap = np.empty(len(order), dtype=np.int64)
+        remap[order] = np.arange(len(order))
+        incidence = sparse.csr_matrix(
+            (np.array(vals, dtype=np.float64), (np.array(rows, dtype=np.int64), remap[np.array(cols, dtype=np.int64)])),
+            shape=(len(rxn_ids), len(met_ids))
+        )
+        incidence.sort_indices()
+        return cls(incidence, rxn_ids, [met_ids[i] for i in order])
+
+    def edges_by_enzyme(self, is_currency_metabolite, clean=True):
+        """
+        Substrate -> reaction and reaction -> product edges of every reaction with at
+        least one non-currency metabolite, in reaction then metabolite order.
+        Metabolite ids are passed through clean_met_name() when `clean` is set.
+        """
+        met_ids = np.array(self.met_ids, dtype=object)
+        keep = ~is_currency_metabolite.match_array(met_ids.astype(str))
+        labels = np.array([clean_met_name(met) for met in self.met_ids] if clean else self.met_ids, dtype=object)
+        indptr, indices, data = self.incidence.indptr, self.incidence.indices, self.incidence.data
+
+        edges_by_enzyme = {}
+        for j, reac in enumerate(self.rxn_ids):
+            cols = indices[indptr[j]:indptr[j + 1]]
+            coefs = data[indptr[j]:indptr[j + 1]]
+            mask = keep[cols] & (coefs != 0)
+            if not mask.any():
+                continue
+            edges_by_enzyme[reac] = [
+                (label, reac) if coef < 0 else (reac, label)
+                for label, coef in zip(labels[cols[mask]].tolist(), coefs[mask].tolist())
+            ]
+        return edges_by_enzyme
+
+
+def msgpack_default(obj):
+    """Converts what jsonify would serialize but msgpack cannot (numpy, sets)."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
+
+class ApiRequest(Request):
+    """Request whose JSON accessors also read MessagePack bodies, so routes need no change."""
+
+    @property
+    def is_msgpack(self):
+        return self.mimetype in MSGPACK_MIMETYPES
+
+    @property
+    def is_json(self):
+        return super().is_json or self.is_msgpack
+
+    def get_json(self, force=False, silent=False, cache=True):
+        start = time.perf_counter()
+        try:
+            return self._decode_json(force=force, silent=silent, cache=cache)
+        finally:
+            record_phase("parse", time.perf_counter() - start)
+
+    def _decode_json(self, force=False, silent=False, cache=True):
+        if not self.is_msgpack:
+            return super().get_json(force=force, silent=silent, cache=cache)
+        if msgpack is None:
+            if silent:
+                return None
+            raise UnsupportedMediaType("MessagePack bodies need the msgpack package on the server")
+        body = getattr(self, "_msgpack_body", None)
+        if body is None:
+            try:
+                body = msgpack.unpackb(self.get_data(cache=cache), raw=False, strict_map_key=False)
+            except Exception as e:
+                if silent:
+                    return None
+                raise BadRequest(f"Failed to decode MessagePack body: {e}")
+            if cache:
+                self._msgpack_body = body
+        return body
+
+
+def response_mimetype(offers=(JSON_MIMETYPE, MSGPACK_MIMETYPES[0])):
+    """The offered mimetype the client's Accept header prefers; JSON for */* or none."""
+    if not has_request_context():
+        return JSON_MIMETYPE
+    if msgpack is None:
+        offers = [m for m in offers if m not in MSGPACK_MIMETYPES]
+    return request.accept_mimetypes.best_match(offers, default=JSON_MIMETYPE)
+
+
+class ApiJSONProvider(DefaultJSONProvider):
+    """jsonify() that answers in MessagePack when the client's Accept prefers it."""
+
+    def response(self, *args, **kwargs):
+        if response_mimetype() in MSGPACK_MIMETYPES:
+            obj = self._prepare_response_obj(args, kwargs)
+            response = self._app.response_class(
+                msgpack.packb(obj, default=msgpack_default, use_bin_type=True),
+                mimetype=MSGPACK_MIMETYPES[0]
+            )
+        else:
+            response = super().response(*args, **kwargs)
+        response.vary.add("Accept")
+        return response
+
+
+app.request_class = ApiRequest
+app.json = ApiJSONProvider(app)
+
+
+def arrow_response(frame, **metadata):
+    """
+    A DataFrame as an Arrow IPC stream; scalar results (objective value, ...)
+    travel as JSON-encoded schema metadata under navifluX.* keys.
+    """
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    # pandas' own schema metadata is dropped; it is often larger than the data
+    table = table.replace_schema_metadata({
+        f"navifluX.{key}".encode(): json.dumps(value).encode() for key, value in metadata.items()
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = app.response_class(sink.getvalue().to_pybytes(), mimetype=ARROW_STREAM_MIMETYPE)
+    response.vary.add("Accept")
+    return response
+
+
+def columnar_response(payload, frame, **metadata):
+    """
+    jsonify(payload), or the same result as an Arrow IPC table when the client
+    asks for Arrow; `frame` and `metadata` carry the payload in columnar form.
+    The request's diagnostics are added to both when the client asks for them.
+    """
+    if wants_diagnostics():
+        payload = {**payload, "diagnostics": request_diagnostics()}
+        metadata = {**metadata, "diagnostics": payload["diagnostics"]}
+    with phase("serialize"):
+        if response_mimetype((JSON_MIMETYPE, MSGPACK_MIMETYPES[0], ARROW_STREAM_MIMETYPE)) == ARROW_STREAM_MIMETYPE:
+            return arrow_response(frame, **metadata)
+        return jsonify(payload)
+
+
+def record_phase(name, seconds):
+    """Adds time spent in a request phase; outside a request it is not recorded."""
+    if has_request_context():
+        timings = g.setdefault("timings", {})
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextlib.contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+def request_lp_stats():
+    """LPStats of the solves this request runs in the server process itself."""
+    if "lp_stats" not in g:
+        g.lp_stats = LPStats()
+    return g.lp_stats
+
+
+def wants_diagnostics():
+    """Whether the client asked for a diagnostics block: `diagnostics: true` in the body or query."""
+    if request.args.get("diagnostics") == "true":
+        return True
+    data = request.get_json(silent=True) if request.is_json else None
+    return isinstance(data, dict) and data.get("diagnostics") is True
+
+
+def request_diagnostics():
+    """
+    Phase timings so far (the serialize phase is still to come), and the LP
+    statistics of the request's solves, both in process and on the solver pool.
+    """
+    lps = LPStats()
+    if "lp_stats" in g:
+        lps.merge(g.lp_stats)
+    for stats in g.get("job_lp_stats", []):
+        lps.merge(stats)
+    return {
+        "timings": dict(g.get("timings", {})),
+        "cached": g.get("result_cached", False),
+        **lps.as_dict()
+    }
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Publishes the request's phases as Server-Timing and adds them to the endpoint metrics."""
+    timings = g.get("timings", {})
+    if timings:
+        response.headers["Server-Timing"] = ", ".join(
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()
+        )
+    endpoint = request.endpoint or "unmatched"
+    with metrics_lock:
+        metrics = endpoint_metrics.setdefault(endpoint, {"requests": 0, "errors": 0, "phases": {}})
+        metrics["requests"] += 1
+        metrics["errors"] += response.status_code >= 400
+        for name, seconds in timings.items():
+            metrics["phases"].setdefault(name, Histogram(phase_buckets)).observe(seconds)
+        if "lp_stats" in g:
+            lp_totals.merge(g.lp_stats)
+    return response
+
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+@app.after_request
+def compress_and_tag(response):
+    """
+    Compresses complete 200 responses of at least compress_min_bytes with
+    brotli or gzip as Accept-Encoding allows. GET and HEAD responses also get a
+    strong ETag derived from their content, and a matching If-None-Match is
+    answered with 304. Each encoding is its own representation, so it gets its
+    own ETag; compressed bodies are cached by that tag so repeated views are not
+    compressed again. Routes that know their content by a key tag it with
+    tag_content() instead, which also answers 304 before the body is built.
+    POST analyses have already run by the time the body exists, so they are
+    not tagged: a 304 there would only save bandwidth.
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or request.method not in ("GET", "HEAD", "POST") or "Content-Encoding" in response.headers):
+        return response
+
+    body = response.get_data()
+    encoding = None
+    if len(body) >= compress_min_bytes and (response.mimetype in COMPRESSIBLE_MIMETYPES or response.mimetype.startswith("text/")):
+        encoding = request.accept_encodings.best_match(["br", "gzip"] if brotli is not None else ["gzip"])
+    digest = g.get("content_tag") or hashlib.blake2b(body, digest_size=16).hexdigest()
+    etag = digest if encoding is None else f"{digest}-{encoding}"
+    response.vary.add("Accept-Encoding")
+    conditional = request.method in ("GET", "HEAD")
+
+    if conditional and request.if_none_match.contains_weak(etag):
+        not_modified = app.response_class(status=304)
+        not_modified.set_etag(etag)
+        not_modified.headers["Vary"] = response.headers["Vary"]
+        return not_modified
+
+    if encoding is not None:
+        compressed = compressed_bodies.get(etag)
+        if compressed is None:
+            compressed = compress_body(body, encoding)
+            compressed_bodies.put(etag, compressed, len(compressed))
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+    if conditional:
+        response.set_etag(etag)
+    return response
+
+
+def tag_content(key):
+    """
+    For a GET route whose content is fully determined by `key` (an upload hash,
+    a session version): tags the response with `key` and the negotiated format
+    in place of a digest of the body, and returns the 304 when If-None-Match
+    already holds that tag, or None when the body has to be built.
+    """
+    tag = hashlib.blake2b(f"{key}\n{response_mimetype()}".encode(), digest_size=16).hexdigest()
+    g.content_tag = tag
+    for etag in (tag, f"{tag}-br", f"{tag}-gzip"):
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            response.vary.update(("Accept", "Accept-Encoding"))
+            return response
+    return None
+
+
+def deletion_frame(df):
+    """Deletion result with the id sets as lists, which Arrow can hold."""
+    return df.assign(ids=df["ids"].map(list)).reset_index(drop=True)
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by the total size of its
+    entries. Callers give each entry's size in bytes when storing it; an entry
+    larger than the whole budget is not stored.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, size)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        with self.lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return False
+            self.entries[key] = (value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+            return True
+
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            self._remove(key)
+            return default if entry is None else entry[0]
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+compressed_bodies = LRUCache(64 * 2**20)  # ETag -> compressed response body
+upload_cache = LRUCache(upload_cache_bytes)  # sha256:extension -> response payload as JSON
+model_sessions = LRUCache(session_cache_bytes)  # session id -> ModelSession
+result_cache = LRUCache(result_cache_bytes)  # result key -> encode_result() bytes
+
+
+class GeneRuleError(Exception):
+    """A gene-reaction rule built from modelData was rejected by cobra."""
+
+
+def build_cobra_model(modelData, is_currency_metabolite, genes=True, strict_genes=False):
+    """
+    Builds a cobra Model from the visualizer's per-pathway modelData. Gene rules
+    are set when `genes` is true; a rule cobra rejects drops its reaction, or
+    raises GeneRuleError when `strict_genes` is set.
+    """
+    model = Model('new_model')
+    for path in modelData:
+        pathData = modelData[path]
+        metabolites = {}
+        for met_id, arr in pathData['metabolites'].items():
+            name, formula, compt, crossref, weight = arr
+            crossrefdict = {"chebi": crossref}
+            metabolites[met_id] = Metabolite(id=met_id, name=name, compartment=met_id.split('_')[-1], formula=formula)
+            metabolites[met_id].annotation = crossrefdict
+        all_edges = pathData['edges'] + pathData['currency_edges']
+        currency_mets = set()
+        for a, b in all_edges:
+            for met in [a, b]:
+                if is_currency_metabolite(met):
+                    currency_mets.add(met)
+
+        for met_id in currency_mets:
+            if met_id not in metabolites:
+                metabolites[met_id] = Metabolite(id=met_id, name=met_id, compartment=met_id.split('_')[-1])
+
+        reaction_edges = defaultdict(list)
+        for src, tgt in all_edges:
+            if src in pathData['enzymes']:  # enzyme → metabolite (product)
+                reaction_edges[src].append((None, tgt))
+            elif tgt in pathData['enzymes']:  # metabolite (substrate) → enzyme
+                reaction_edges[tgt].append((src, None))
+
+        gene_list = pathData.get("genes", {})
+
+        for enzyme_id, edge_list in reaction_edges.items():
+            reaction = Reaction(enzyme_id)
+            enzyme_info = pathData['enzymes'].get(enzyme_id, [])
+
+            reaction.name = enzyme_info[0] if len(enzyme_info) > 0 else enzyme_id
+            reaction.lower_bound = enzyme_info[2]
+            reaction.upper_bound = enzyme_info[3]
+            rxn_annotation = pathData["enzyme_crossref"][enzyme_id]
+            cobra_annotation = {key_map[k]: v for k, v in rxn_annotation.items() if k in key_map}
+            reaction.annotation = cobra_annotation
+
+            actual_stoichiometry = pathData["stoichiometry"][enzyme_id]
+            model_stoichiometry = {}
+            for src, tgt in edge_list:
+                if src:
+                    model_stoichiometry[metabolites[src]] = actual_stoichiometry[src]
+                if tgt:
+                    model_stoichiometry[metabolites[tgt]] = actual_stoichiometry[tgt]
+
+            reaction.add_metabolites(model_stoichiometry)
+
+            reaction.subsystem = enzyme_info[4]
+
+            gene = list({g.strip() for g in gene_list.get(enzyme_id, []) if g.strip()}) if genes else []
+            if gene:
+                rule = "(" + " or ".join(gene) + ")" if len(gene) > 1 else f'( {gene[0]} )'
+
+                if reaction.gene_reaction_rule != rule:
+                    try:
+                        reaction.gene_reaction_rule = rule
+                    except Exception as e:
+                        if strict_genes:
+                            raise GeneRuleError(rule) from e
+                        continue
+
+            model.add_reactions([reaction])
+
+    return model
+
+
+def set_attribute(obj, attr, value):
+    """Sets a plain attribute of a model object, undoably inside a cobra model context."""
+    context = get_context(obj)
+    if context:
+        context(functools.partial(setattr, obj, attr, getattr(obj, attr)))
+    setattr(obj, attr, value)
+
+
+def apply_model_patch(model, operations):
+    """
+    Applies edit operations to a cobra model in place, in order. Each operation
+    is a dict with an `op` and the `id` it targets:
+
+    add_reaction / update_reaction: name, subsystem, metabolites ({id: coefficient},
+        0 removes a metabolite; unknown ids are created), lower_bound, upper_bound,
+        gene_reaction_rule
+    remove_reaction
+    add_metabolite / update_metabolite: name, formula, compartment
+    remove_metabolite
+
+    Raises KeyError for unknown ids and ValueError for malformed operations.
+    """
+    for operation in operations:
+        op = operation.get('op')
+        item_id = operation.get('id')
+        if not isinstance(item_id, str) or not item_id.strip():
+            raise ValueError(f'Operation {op} needs an id')
+
+        if op == 'add_metabolite':
+            if item_id in model.metabolites:
+                raise ValueError(f'Metabolite {item_id} already exists')
+            model.add_metabolites([Metabolite(id=item_id, name=item_id, compartment=item_id.split('_')[-1])])
+            op = 'update_metabolite'
+        elif op == 'remove_metabolite':
+            model.remove_metabolites([model.metabolites.get_by_id(item_id)])
+            continue
+        elif op == 'add_reaction':
+            if item_id in model.reactions:
+                raise ValueError(f'Reaction {item_id} already exists')
+            reaction = Reaction(item_id, name=item_id)
+            model.add_reactions([reaction])
+            op = 'update_reaction'
+        elif op == 'remove_reaction':
+            model.remove_reactions([model.reactions.get_by_id(item_id)])
+            continue
+
+        if op == 'update_metabolite':
+            metabolite = model.metabolites.get_by_id(item_id)
+            for attr in ('name', 'formula', 'compartment'):
+                if attr in operation:
+                    set_attribute(metabolite, attr, operation[attr])
+
+        elif op == 'update_reaction':
+            reaction = model.reactions.get_by_id(item_id)
+            for attr in ('name', 'subsystem'):
+                if attr in operation:
+                    set_attribute(reaction, attr, operation[attr])
+            if 'metabolites' in operation:
+                new_mets = [
+                    Metabolite(id=met_id, name=met_id, compartment=met_id.split('_')[-1])
+                    for met_id in operation['metabolites'] if met_id not in model.metabolites
+                ]
+                model.add_metabolites(new_mets)
+                # Set coefficients as differences to the current ones: cobra can
+                # only undo combined additions for metabolites new to the reaction.
+                current = {met.id: coef for met, coef in reaction.metabolites.items()}
+                changes = {}
+                for met_id, coef in operation['metabolites'].items():
+                    delta = float(coef) - current.get(met_id, 0.0)
+                    if delta != 0:
+                        changes[model.metabolites.get_by_id(met_id)] = delta
+                reaction.add_metabolites(changes)
+            if 'lower_bound' in operation or 'upper_bound' in operation:
+                reaction.bounds = (
+                    float(operation.get('lower_bound', reaction.lower_bound)),
+                    float(operation.get('upper_bound', reaction.upper_bound))
+                )
+            if 'gene_reaction_rule' in operation:
+                reaction.gene_reaction_rule = operation['gene_reaction_rule'] or ''
+
+        else:
+            raise ValueError(f'Unknown operation: {op}')
+
+
+def remove_orphan_genes(model):
+    """
+    Drops genes no reaction refers to any more (replaced rules, removed reactions),
+    which would otherwise show up in gene deletions unlike in a freshly built model.
+    """
+    orphans = [gene for gene in model.genes if not gene.reactions]
+    if orphans:
+        cobra.manipulation.remove_genes(model, orphans, remove_reactions=False)
+
+
+class ModelSession:
+    """
+    A compiled visualizer model held between requests: the cobra Model, its
+    sparse stoichiometric matrix and the catalog it belongs to. The version
+    increases with every edit; requests on one session are serialized by `lock`.
+    """
+
+    def __init__(self, model, database, mixed=False):
+        self.id = uuid.uuid4().hex
+        self.version = 1
+        self.database = database
+        self.mixed = mixed
+        self.model = model
+        self.lock = threading.RLock()
+        self.compiled = None
+        self.digest = None
+
+    def structure_digest(self):
+        """model_structure_digest() of the current model, computed once per version."""
+        if self.digest is None:
+            self.digest = model_structure_digest(self.model)
+        return self.digest
+
+    def stoichiometry(self):
+        """(S, metabolite ids, reaction ids), compiled on first use after each edit."""
+        if self.compiled is None:
+            self.compiled = (
+                model_stoichiometry(self.model),
+                [m.id for m in self.model.metabolites],
+                [r.id for r in self.model.reactions]
+            )
+        return self.compiled
+
+    def graph(self):
+        """ModelGraph of the current model, for the graph endpoints."""
+        return ModelGraph.from_stoichiometry(*self.stoichiometry())
+
+    def footprint(self):
+        """
+        Estimated bytes the session keeps alive: the cobra objects with their
+        solver variables and constraints, and the stoichiometric nonzeros with
+        the compiled matrix (about 13 MB for iJO1366's 2583 reactions).
+        """
+        nonzeros = sum(len(reaction.metabolites) for reaction in self.model.reactions)
+        return (3000 * len(self.model.reactions) + 1500 * len(self.model.metabolites)
+                + 500 * len(self.model.genes) + 300 * nonzeros)
+
+    def edited(self):
+        """Marks the model as changed: bumps the version and drops the compiled matrix."""
+        self.version += 1
+        self.compiled = None
+        self.digest = None
+
+    def describe(self):
+        return {
+            'session_id': self.id,
+            'version': self.version,
+            'database': self.database,
+            'mixed_databases': self.mixed,
+            'reactions': len(self.model.reactions),
+            'metabolites': len(self.model.metabolites),
+            'genes': len(self.model.genes)
+        }
+
+
+def canonical_gpr(node):
+    """A GPR expression tree as nested lists with the operands of and/or sorted."""
+    if node is None:
+        return ""
+    if isinstance(node, ast.BoolOp):
+        return [type(node.op).__name__, sorted((canonical_gpr(value) for value in node.values), key=json.dumps)]
+    return node.id
+
+
+def model_structure_digest(model):
+    """
+    Hash of the reactions' stoichiometry, bounds and GPRs, independent of the
+    order of reactions, metabolites and GPR operands.
+    """
+    reactions = sorted(
+        (
+            reaction.id,
+            reaction.lower_bound,
+            reaction.upper_bound,
+            canonical_gpr(reaction.gpr.body),
+            sorted((met.id, coefficient) for met, coefficient in reaction.metabolites.items())
+        )
+        for reaction in model.reactions
+    )
+    canonical = json.dumps(reactions, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode(), digest_size=20).hexdigest()
+
+
+def model_fingerprint(model):
+    """
+    Canonical hash of everything a flux result depends on: the structure, the
+    objective and the solver. The structure part of the model of the request's
+    session is reused until the session is edited.
+    """
+    session = g.get('model_session') if has_request_context() else None
+    if session is not None and session.model is model:
+        structure = session.structure_digest()
+    else:
+        structure = model_structure_digest(model)
+    objective = sorted((r.id, coefficient) for r, coefficient in linear_reaction_coefficients(model).items())
+    canonical = json.dumps(
+        [result_cache_version, structure, model.objective_direction, model.solver.interface.__name__, objective],
+        separators=(",", ":")
+    )
+    return hashlib.blake2b(canonical.encode(), digest_size=20).hexdigest()
+
+
+def result_cache_key(model, flux_type, parameters):
+    canonical = json.dumps([model_fingerprint(model), flux_type, parameters], sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode(), digest_size=20).hexdigest()
+
+
+def result_cache_parameters(flux_type, processes, options):
+    """
+    The plan_flux_job() options plus whatever else decides a job's output.
+    Seeded samples depend on the chain size. Scenario fluxes depend on which
+    scenarios share a solver problem, set by `processes`: every solve starts
+    from the previous basis, and alternative optima are common.
+    """
+    parameters = dict(options)
+    if flux_type == 'sampling':
+        parameters['chain_size'] = sample_chain_size
+    elif flux_type == 'scenarios':
+        parameters['processes'] = processes
+    return parameters
+
+
+def result_cache_path(key):
+    return os.path.join(result_cache_dir, f"{key}.arrow")
+
+
+def encode_result(result):
+    """
+    A (payload, frame, metadata) result as an Arrow IPC stream: the frame is the
+    table and the payload and metadata travel as JSON schema metadata, so reading
+    a cached result back never runs code from the cache directory.
+    """
+    payload, frame, metadata = result
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"navifluX.payload": json.dumps(payload, default=msgpack_default).encode(),
+        b"navifluX.metadata": json.dumps(metadata, default=msgpack_default).encode()
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_result(body):
+    table = pa.ipc.open_stream(body).read_all()
+    schema_metadata = table.schema.metadata
+    return (
+        json.loads(schema_metadata[b"navifluX.payload"]),
+        table.to_pandas(),
+        json.loads(schema_metadata[b"navifluX.metadata"])
+    )
+
+
+def get_cached_result(key):
+    """A cached (payload, frame, metadata), from memory or from result_cache_dir; None on a miss."""
+    body = result_cache.get(key)
+    if body is None and result_cache_dir:
+        try:
+            with open(result_cache_path(key), "rb") as f:
+                body = f.read()
+            os.utime(result_cache_path(key))
+        except OSError:
+            return None
+        result_cache.put(key, body, len(body))
+    if body is None:
+        return None
+    try:
+        result = decode_result(body)
+    except Exception:
+        result_cache.pop(key)
+        return None
+    if has_request_context():
+        g.result_cached = True
+    return result
+
+
+def cache_result(key, result):
+    """
+    Stores a (payload, frame, metadata) result. Best effort: a result Arrow
+    cannot hold is not cached, and a full or read-only directory only means the
+    result is kept in memory.
+    """
+    try:
+        body = encode_result(result)
+    except (pa.ArrowException, TypeError, ValueError):
+        return
+    result_cache.put(key, body, len(body))
+    if not result_cache_dir or len(body) > result_cache_disk_bytes:
+        return
+    path = result_cache_path(key)
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.makedirs(result_cache_dir, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        prune_result_cache_dir()
+    except OSError:
+        pass
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def prune_result_cache_dir():
+    """Deletes the least recently used results until the directory fits result_cache_disk_bytes."""
+    with result_cache_dir_lock:
+        entries = []
+        with os.scandir(result_cache_dir) as scan:
+            for entry in scan:
+                if entry.name.endswith(".arrow"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= result_cache_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def uses_model_session(view):
+    """
+    Lets a JSON route run against a stored ModelSession: when the body names a
+    `session_id` (and optionally the `version` it expects), the session is held
+    locked for the request and exposed as g.model_session; otherwise
+    g.model_session is None and the route reads the model from the body.
+    The view runs inside a cobra model context, so changes it makes to the
+    session model (objective, bounds) are undone when it returns.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        data = request.get_json(silent=True) if request.is_json else None
+        session_id = data.get('session_id') if isinstance(data, dict) else None
+        if session_id is None:
+            g.model_session = None
+            return view(*args, **kwargs)
+
+        session = model_sessions.get(session_id)
+        if session is None:
+            return jsonify({'status': 'error', 'message': f'Unknown model session: {session_id}'}), 404
+        with session.lock:
+            expected = data.get('version')
+            if expected is not None and expected != session.version:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Model session is at version {session.version}, not {expected}',
+                    'version': session.version
+                }), 409
+            g.model_session = session
+            g.mixed_databases = session.mixed
+            with session.model:
+                return view(*args, **kwargs)
+    return wrapper
+
 
 def clean_cobra_model(model: Model, name="Cleaned_Model") -> Model:
         # Filter out invalid reactions, metabolites, and genes
@@ -146,22 +1545,16 @@ def clean_cobra_model(model: Model, name="Cleaned_Model") -> Model:
 def clean_met_name(name):
     return re.sub(r'\[.*?\]', '', name)
 
-def get_negative_enzymes(df, metabolite_name, db):
+def get_negative_enzymes(smat, metabolite_name, db):
     if (db == "BIGG"):
-        cleaned_metabolite = clean_met_name(metabolite_name)
-        cleaned_index_map = {clean_met_name(idx): idx for idx in df.index}
-        actual_index = cleaned_index_map.get(cleaned_metabolite)
-        if actual_index is None:
-            return [] 
-        row = df.loc[actual_index]
-        return row[(row < 0) | (row > 0)].index.tolist()
+        actual_index = smat.resolve(metabolite_name)
     elif (db == "KEGG"):
-        cleaned_index_map = {idx: idx for idx in df.index}
-        actual_index = cleaned_index_map.get(metabolite_name)
-        if actual_index is None:
-            return [] 
-        row = df.loc[actual_index]
-        return row[(row < 0) | (row > 0)].index.tolist()
+        actual_index = smat.resolve(metabolite_name, cleaned=False)
+    else:
+        return []
+    if actual_index is None:
+        return [] 
+    return smat.reactions_touching(actual_index)
 
 
 def sanitize(obj):
@@ -177,14 +1570,11 @@ def sanitize(obj):
     else:
         return obj
     
-def get_positive_enzymes(df, metabolite_name):
-    cleaned_metabolite = clean_met_name(metabolite_name)
-    cleaned_index_map = {clean_met_name(idx): idx for idx in df.index}
-    actual_index = cleaned_index_map.get(cleaned_metabolite)
+def get_positive_enzymes(smat, metabolite_name):
+    actual_index = smat.resolve(metabolite_name)
     if actual_index is None:
         return [] 
-    row = df.loc[actual_index]
-    return row[row > 0].index.tolist()
+    return list(smat.produced_by[actual_index])
 
 def find_crossrefs_mets(row, db):
     if db == "BIGG":
@@ -210,20 +1600,175 @@ def find_crossrefs_mets(row, db):
 
 
 
-def get_matching_enzymes(query, database):
-    if(database == "BIGG"):
-        cur_metabolites, smat, df, df2 = get_data(database)
-    elif(database == "KEGG"):
-         cur_metabolites, smat, df, df2 = get_data(database)
-    # _, _, df, _ = get_cached_data()
-    q = query.lower()
+class ReactionSearchIndex:
+    """
+    N-gram postings (lengths 1-3) over the pre-lowercased Abbreviation, Reaction
+    and Description columns of a catalog reactions table. Queries of up to three
+    characters are answered from the postings alone; longer ones intersect their
+    trigram postings and verify the few remaining candidates.
+    """
+
+    gram = 3
+
+    # relevance: abbreviation hits outrank description hits, which outrank equation hits
+    weights = {
+        "abbr": 40,
+        "abbr_prefix": 20,
+        "abbr_exact": 40,
+        "desc": 10,
+        "desc_word": 10,
+        "rxn": 5
+    }
+
+    def __init__(self, df):
+        self.abbreviations = df['Abbreviation'].tolist()
+        self.reactions = df['Reaction'].tolist()
+        self.descriptions = df['Description'].tolist()
+        # identifies the indexed table in the ETags of GET searches
+        self.digest = hashlib.blake2b(
+            json.dumps([self.abbreviations, self.reactions, self.descriptions], default=str).encode(),
+            digest_size=16
+        ).hexdigest()
+        self.abbr_text, self.rxn_text, self.desc_text = (
+            df[field].fillna("").astype(str).str.lower().tolist()
+            for field in ("Abbreviation", "Reaction", "Description")
+        )
+        self.abbr_len = np.array([len(a) for a in self.abbr_text], dtype=np.int32)
+        self.exact = defaultdict(list)
+        for row, abbr in enumerate(self.abbr_text):
+            self.exact[abbr].append(row)
+
+        postings = {key: defaultdict(list) for key in self.weights if key != "abbr_exact"}
+        for row in range(len(self.abbreviations)):
+            abbr, desc = self.abbr_text[row], self.desc_text[row]
+            for key, grams in (
+                ("abbr", self.grams(abbr)),
+                ("abbr_prefix", {abbr[:n] for n in range(1, min(len(abbr), self.gram) + 1)}),
+                ("desc", self.grams(desc)),
+                ("desc_word", {
+                    word[:n] for word in desc.split(" ") for n in range(1, min(len(word), self.gram) + 1)
+                }),
+                ("rxn", self.grams(self.rxn_text[row]))
+            ):
+                for g in grams:
+                    postings[key][g].append(row)
+        self.postings = {
+            key: {g: np.array(rows, dtype=np.int32) for g, rows in grams.items()}
+            for key, grams in postings.items()
+        }
+
+    def grams(self, text):
+        return {text[k:k + n] for n in range(1, self.gram + 1) for k in range(len(text) - n + 1)}
+
+    def lookup(self, key, q):
+        """
+        Rows whose field matches q, from postings (verified when q is long).
+        Prefix and word-start postings only go up to the gram length, so long
+        queries take their candidates from the field's substring postings.
+        """
+        if len(q) <= self.gram:
+            return self.postings[key].get(q, ())
+        postings = self.postings[{"abbr_prefix": "abbr", "desc_word": "desc"}.get(key, key)]
+        grams = sorted(
+            {q[k:k + self.gram] for k in range(len(q) - self.gram + 1)},
+            key=lambda g: len(postings.get(g, ()))
+        )
+        rows = postings.get(grams[0])
+        if rows is None:
+            return ()
+        for g in grams[1:]:
+            if len(rows) == 0:
+                return ()
+            rows = np.intersect1d(rows, postings.get(g, rows[:0]), assume_unique=True)
+        if key == "abbr":
+            return [row for row in rows.tolist() if q in self.abbr_text[row]]
+        if key == "abbr_prefix":
+            return [row for row in rows.tolist() if self.abbr_text[row].startswith(q)]
+        if key == "desc":
+            return [row for row in rows.tolist() if q in self.desc_text[row]]
+        if key == "desc_word":
+            word = " " + q
+            return [row for row in rows.tolist() if self.desc_text[row].startswith(q) or word in self.desc_text[row]]
+        return [row for row in rows.tolist() if q in self.rxn_text[row]]
+
+    def search(self, query):
+        """Row positions matching query as a substring, best match first."""
+        q = query.lower()
+        if not q:
+            return list(range(len(self.abbreviations)))
+        score = np.zeros(len(self.abbreviations), dtype=np.int32)
+        for key, weight in self.weights.items():
+            rows = self.exact.get(q, ()) if key == "abbr_exact" else self.lookup(key, q)
+            if len(rows):
+                score[rows] += weight
+        rows = np.flatnonzero(score)
+        order = np.lexsort((rows, self.abbr_len[rows], -score[rows]))
+        return rows[order].tolist()
+
+
+def get_search_index(database):
+    """Returns the ReactionSearchIndex for a catalog, building it on first use."""
+    index = search_indexes.get(database)
+    if index is None:
+        with catalog_locks[database]:
+            index = search_indexes.get(database)
+            if index is None:
+                _, _, df, _ = get_data(database)
+                tic = time.time()
+                index = search_indexes[database] = ReactionSearchIndex(df)
+                catalog_status[database]["index_seconds"] = round(time.time() - tic, 3)
+    return index
+
+
+def index_records(frame, key="Abbreviation"):
+    """
+    Maps each id in `key` to its row as a dict. The first row wins for duplicated
+    ids, matching what the previous `frame[frame[key] == id].iloc[0]` lookups saw.
+    """
+    unique = frame.drop_duplicates(subset=key, keep="first")
+    return dict(zip(unique[key], unique.to_dict("records")))
+
+
+def get_catalog_records(database):
+    """Returns the (reaction, metabolite) record indexes of a catalog, built on first use."""
+    records = catalog_records.get(database)
+    if records is None:
+        with catalog_locks[database]:
+            records = catalog_records.get(database)
+            if records is None:
+                _, _, df, df2 = get_data(database)
+                records = catalog_records[database] = (index_records(df), index_records(df2))
+    return records
 
-    mask_abbr = df['Abbreviation'].astype(str).str.lower().str.contains(q, na=False)
-    mask_rxn  = df['Reaction'].astype(str).str.lower().str.contains(q, na=False)
-    mask_desc = df['Description'].astype(str).str.lower().str.contains(q, na=False)
 
-    combined_mask = mask_abbr | mask_rxn | mask_desc
-    return df.loc[combined_mask, 'Abbreviation'].tolist()
+def warm_catalogs(databases=("BIGG", "KEGG")):
+    """
+    Loads the metabolite namespaces and each catalog with its currency matchers
+    and search index, so the first requests do not pay for parsing. Failures are
+    recorded in catalog_status and do not stop the remaining catalogs.
+    """
+    try:
+        get_met_namespaces()
+    except Exception:
+        pass
+    for db in databases:
+        try:
+            get_data(db)
+            get_currency_matcher(db)
+            get_currency_matcher(db, upload_currency_keywords)
+            get_search_index(db)
+            get_catalog_records(db)
+        except Exception as e:
+            catalog_status[db] = {**catalog_status[db], "state": "error", "error": str(e)}
+
+
+def catalogs_ready():
+    return all(status["state"] == "ready" for status in catalog_status.values())
+
+
+def get_matching_enzymes(query, database):
+    index = get_search_index(database)
+    return [index.abbreviations[row] for row in index.search(query)]
 
 
 def serialize_deletion_result(df):
@@ -247,36 +1792,943 @@ def serialize_deletion_result(df):
 
 
 
+class ModelCompression:
+    """
+    A smaller model with the same flux space as `model`, for the analyses that
+    allow it (fva, srd, sgd, sampling). Reactions that cannot carry flux at
+    steady state are dropped: zero bounds, or touching a metabolite that can
+    only be produced or only consumed (a dead end), which blocks whatever else
+    touches the metabolites of those reactions in turn. Two reactions that are
+    the only ones left at a metabolite are fully coupled and merge into one,
+    repeatedly, so linear chains become single reactions; their GPRs are
+    and-ed, since losing either reaction stops the chain. Every original
+    reaction maps to a kept reaction and the factor of its flux to that one's
+    (0 when blocked), which is how results are mapped back.
+    """
+
+    def __init__(self, model):
+        S = model_stoichiometry(model)
+        reactions = list(model.reactions)
+        metabolites = list(model.metabolites)
+        columns = [
+            dict(zip(S.indices[S.indptr[j]:S.indptr[j + 1]].tolist(), S.data[S.indptr[j]:S.indptr[j + 1]].tolist()))
+            for j in range(len(reactions))
+        ]
+        lower = [r.lower_bound for r in reactions]
+        upper = [r.upper_bound for r in reactions]
+        coefficients = {r.id: coefficient for r, coefficient in linear_reaction_coefficients(model).items()}
+        objective = [coefficients.get(r.id, 0.0) for r in reactions]
+        rules = [[r.gene_reaction_rule] if r.gene_reaction_rule else [] for r in reactions]
+        members = [{j: 1.0} for j in range(len(reactions))]  # kept reaction -> {original: factor}
+
+        active = {j for j in range(len(reactions)) if lower[j] != 0 or upper[j] != 0}
+        met_rxns = defaultdict(set)
+        for j in active:
+            for m in columns[j]:
+                met_rxns[m].add(j)
+        queue = deque(met_rxns)
+        queued = set(queue)
+
+        def enqueue(mets):
+            for m in mets:
+                if m not in queued:
+                    queued.add(m)
+                    queue.append(m)
+
+        def block(j):
+            active.discard(j)
+            for m in columns[j]:
+                met_rxns[m].discard(j)
+            enqueue(columns[j])
+
+        while queue:
+            m = queue.popleft()
+            queued.discard(m)
+            touching = sorted(met_rxns[m])
+            if not touching:
+                continue
+            produced = any(
+                (columns[j][m] > 0 and upper[j] > 0) or (columns[j][m] < 0 and lower[j] < 0) for j in touching
+            )
+            consumed = any(
+                (columns[j][m] < 0 and upper[j] > 0) or (columns[j][m] > 0 and lower[j] < 0) for j in touching
+            )
+            if not (produced and consumed):
+                for j in touching:
+                    block(j)
+                continue
+            if len(touching) != 2:
+                continue
+
+            # steady state at m: v_k = ratio * v_j
+            j, k = touching
+            ratio = -columns[j][m] / columns[k][m]
+            low, high = sorted((lower[k] / ratio, upper[k] / ratio))
+            low, high = max(lower[j], low), min(upper[j], high)
+            if low > high + model.tolerance:
+                # contradictory bounds: leave the chain to the solver
+                continue
+            merged = dict(columns[j])
+            for met, coefficient in columns[k].items():
+                merged[met] = merged.get(met, 0.0) + ratio * coefficient
+            merged = {met: coefficient for met, coefficient in merged.items() if abs(coefficient) > 1e-12}
+            for met in set(columns[j]) | set(columns[k]):
+                met_rxns[met].discard(j)
+                met_rxns[met].discard(k)
+            active.discard(k)
+            columns[j] = merged
+            for met in merged:
+                met_rxns[met].add(j)
+            lower[j], upper[j] = low, max(low, high)
+            objective[j] += ratio * objective[k]
+            members[j].update({i: factor * ratio for i, factor in members[k].items()})
+            rules[j] += rules[k]
+            enqueue(set(columns[k]) | set(merged))
+            if lower[j] == 0 and upper[j] == 0:
+                block(j)
+
+        kept = sorted(active)
+        self.original_ids = [r.id for r in reactions]
+        self.original_genes = [gene.id for gene in model.genes]
+        self.kept_ids = [reactions[j].id for j in kept]
+        self.lead = np.full(len(reactions), -1)
+        self.factor = np.zeros(len(reactions))
+        for position, j in enumerate(kept):
+            for i, factor in members[j].items():
+                self.lead[i] = position
+                self.factor[i] = factor
+
+        compressed = Model(model.id)
+        compressed.solver = model.solver.interface
+        compressed.tolerance = model.tolerance
+        new_metabolites = {}
+        new_reactions = []
+        for j in kept:
+            reaction = Reaction(reactions[j].id, name=reactions[j].name, subsystem=reactions[j].subsystem,
+                                lower_bound=lower[j], upper_bound=upper[j])
+            for m in columns[j]:
+                if m not in new_metabolites:
+                    met = metabolites[m]
+                    new_metabolites[m] = Metabolite(met.id, name=met.name, compartment=met.compartment)
+            reaction.add_metabolites({new_metabolites[m]: coefficient for m, coefficient in columns[j].items()})
+            if rules[j]:
+                reaction.gene_reaction_rule = rules[j][0] if len(rules[j]) == 1 else " and ".join(
+                    f"({rule})" for rule in rules[j]
+                )
+            new_reactions.append(reaction)
+        compressed.add_reactions(new_reactions)
+        compressed.objective = {
+            compressed.reactions.get_by_id(reactions[j].id): objective[j] for j in kept if objective[j]
+        }
+        compressed.objective_direction = model.objective_direction
+        self.model = compressed
+        self.stats = {
+            "reactions": len(reactions),
+            "compressed_reactions": len(kept),
+            "blocked_reactions": int((self.lead < 0).sum()),
+            "metabolites": len(metabolites),
+            "compressed_metabolites": len(new_metabolites)
+        }
+
+    def kept_reactions(self, reaction_ids):
+        """The kept reactions the given original reactions map to; KeyError for unknown ids."""
+        positions = pd.Index(self.original_ids).get_indexer(reaction_ids)
+        if (positions < 0).any():
+            raise KeyError(reaction_ids[int(np.argmin(positions))])
+        leads = self.lead[positions]
+        return list(dict.fromkeys(self.kept_ids[lead] for lead in leads if lead >= 0))
+
+    def fluxes(self, values):
+        """Original reaction fluxes from kept reaction fluxes (last axis, kept order)."""
+        values = np.asarray(values)
+        fluxes = np.where(self.lead >= 0, values[..., np.maximum(self.lead, 0)] * self.factor, 0.0)
+        return fluxes.astype(values.dtype, copy=False)
+
+    def expand(self, flux_type, result, reactions=None):
+        """A combined fva, srd or sgd result of the compressed model, for the original model."""
+        payload, frame, metadata = result
+        metadata = {**metadata, "compression": self.stats}
+        if flux_type == 'fva':
+            ids = self.original_ids if reactions is None else list(dict.fromkeys(reactions))
+            positions = pd.Index(self.original_ids).get_indexer(ids)
+            lead, factor = self.lead[positions], self.factor[positions]
+            kept = frame.set_index("reaction").reindex([self.kept_ids[max(i, 0)] for i in lead]) if len(self.kept_ids) else None
+            minimum = kept["minimum"].to_numpy() if kept is not None else np.zeros(len(ids))
+            maximum = kept["maximum"].to_numpy() if kept is not None else np.zeros(len(ids))
+            fva_result = pd.DataFrame({
+                "minimum": np.where(lead < 0, 0.0, np.where(factor >= 0, factor * minimum, factor * maximum)),
+                "maximum": np.where(lead < 0, 0.0, np.where(factor >= 0, factor * maximum, factor * minimum))
+            }, index=ids)
+            payload = {
+                **payload,
+                "minimum_flux": fva_result["minimum"].to_dict(),
+                "maximum_flux": fva_result["maximum"].to_dict(),
+                "compression": self.stats
+            }
+            return payload, fva_result.rename_axis("reaction").reset_index(), metadata
+
+        # deleting a blocked reaction, or a gene of blocked reactions only, changes nothing
+        wild_type = (metadata["objective_value"], "optimal")
+        outcome = {ids[0]: (growth, status) for ids, growth, status in zip(frame["ids"], frame["growth"], frame["status"])}
+        if flux_type == 'srd':
+            targets = self.original_ids
+            rows = [
+                outcome[self.kept_ids[lead]] if lead >= 0 else wild_type
+                for lead in self.lead
+            ]
+        else:
+            targets = self.original_genes
+            rows = [outcome.get(gene, wild_type) for gene in targets]
+        result = pd.DataFrame({
+            "ids": [{target} for target in targets],
+            "growth": [growth for growth, _ in rows],
+            "status": [status for _, status in rows]
+        })
+        payload = {
+            **payload,
+            flux_type: serialize_deletion_result(result),
+            "compression": self.stats
+        }
+        return payload, deletion_frame(result), metadata
+
+
+def get_solver_pool():
+    """The shared solver process pool, started on first use."""
+    global solver_pool
+    with solver_pool_lock:
+        if solver_pool is None:
+            # forkserver/spawn workers start from a clean interpreter and import
+            # flux_worker only, never the Flask app or its catalogs
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(["flux_worker"])
+            else:
+                context = multiprocessing.get_context("spawn")
+            solver_pool = ProcessPoolExecutor(max_workers=solver_workers, mp_context=context)
+        return solver_pool
+
+
+def reset_solver_pool(broken):
+    """Drops a pool whose workers died, so the next job starts a fresh one."""
+    global solver_pool
+    with solver_pool_lock:
+        if solver_pool is broken:
+            solver_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+class FluxJob:
+    """
+    A flux analysis split into tasks for the solver pool. At most `processes`
+    tasks are in flight at a time; progress counts finished work items (reactions
+    for FVA and reaction deletions, genes for gene deletions). `combine` turns the
+    task results, in task order, into (payload, frame, metadata) as
+    columnar_response() takes them.
+
+    Multi-stage analyses pass `followup`, called with the results once every task
+    is done, which returns the next tasks (or none). `stream` maps a finished
+    (task name, result) to a JSON-ready chunk, or None, for callers that read
+    results while the job runs.
+    """
+
+    def __init__(self, flux_type, model_bytes, tasks, combine, processes, followup=None, stream=None):
+        self.id = uuid.uuid4().hex
+        self.flux_type = flux_type
+        self.model_bytes = model_bytes
+        self.model_key = hashlib.blake2b(model_bytes, digest_size=16).hexdigest()
+        self.tasks = tasks  # [(task name, items, options)]
+        self.combine = combine
+        self.processes = max(1, min(processes, solver_workers))
+        self.state = "queued"  # queued, running, done, failed, cancelled
+        self.total = sum(max(len(items), 1) for _, items, _ in tasks)
+        self.done = 0
+        self.results = [None] * len(tasks)
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.followup = followup
+        self.stream = stream
+        self.chunks = []  # stream() output in completion order
+        self.lp_stats = LPStats()
+        self.next_task = 0
+        self.running = set()
+        # re-entrant: cancelling a future runs its done callback in this thread
+        self.lock = threading.RLock()
+        self.finished_event = threading.Event()
+
+    def start(self):
+        with self.lock:
+            self.state = "running"
+            if not self.tasks:
+                self._combine()
+            for _ in range(self.processes):
+                self._submit_next()
+        return self
+
+    def _submit_next(self):
+        if self.next_task >= len(self.tasks) or self.state != "running":
+            return
+        index = self.next_task
+        self.next_task += 1
+        task, items, options = self.tasks[index]
+        pool = get_solver_pool()
+        try:
+            future = pool.submit(flux_worker.run_task, self.model_key, self.model_bytes, task, items, options)
+        except BrokenProcessPool as e:
+            reset_solver_pool(pool)
+            self._finish("failed", error=f"Solver workers stopped: {e}")
+            return
+        self.running.add(future)
+        future.add_done_callback(functools.partial(self._task_done, index, max(len(items), 1), pool))
+
+    def _task_done(self, index, size, pool, future):
+        with self.lock:
+            self.running.discard(future)
+            if self.state != "running" or future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                if isinstance(error, BrokenProcessPool):
+                    reset_solver_pool(pool)
+                self._finish("failed", error=str(error) or type(error).__name__)
+                return
+            self.results[index], lp_stats = future.result()
+            self.lp_stats.merge(lp_stats)
+            self.done += size
+            if self.stream is not None:
+                try:
+                    chunk = self.stream(self.tasks[index][0], self.results[index])
+                except Exception as e:
+                    self._finish("failed", error=str(e))
+                    return
+                if chunk is not None:
+                    self.chunks.append(chunk)
+            if self.next_task < len(self.tasks):
+                self._submit_next()
+            elif not self.running and self.followup is not None:
+                self._follow_up()
+            elif not self.running:
+                self._combine()
+
+    def _combine(self):
+        try:
+            self.result = self.combine(self.results)
+            self._finish("done")
+        except Exception as e:
+            self._finish("failed", error=str(e))
+
+    def _follow_up(self):
+        followup, self.followup = self.followup, None
+        try:
+            tasks = followup(self.results)
+        except Exception as e:
+            self._finish("failed", error=str(e))
+            return
+        if not tasks:
+            self._combine()
+            return
+        self.tasks = self.tasks + tasks
+        self.results.extend([None] * len(tasks))
+        self.total += sum(max(len(items), 1) for _, items, _ in tasks)
+        for _ in range(self.processes):
+            self._submit_next()
+
+    def _finish(self, state, error=None):
+        self.state = state
+        self.error = error
+        self.finished = time.time()
+        self.model_bytes = None
+        self.results = None
+        for future in list(self.running):
+            future.cancel()
+        with metrics_lock:
+            lp_totals.merge(self.lp_stats)
+        self.finished_event.set()
+
+    def complete(self, result):
+        """Finishes a job that needs no solver work, such as one answered from the result cache."""
+        with self.lock:
+            self.result = result
+            self._finish("done")
+
+    def cancel(self):
+        """Stops handing out tasks; tasks already running finish and are discarded."""
+        with self.lock:
+            if self.state in ("queued", "running"):
+                self._finish("cancelled")
+
+    def wait(self, timeout=None):
+        return self.finished_event.wait(timeout)
+
+    def describe(self):
+        return {
+            'job_id': self.id,
+            'flux_type': self.flux_type,
+            'state': self.state,
+            'progress': {'done': self.done, 'total': self.total},
+            'created': self.created,
+            'finished': self.finished,
+            'error': self.error,
+            'diagnostics': self.lp_stats.as_dict()
+        }
+
+
+def chunked(items, processes, max_size=None):
+    """
+    Splits work items into about four tasks per process, for balance and
+    progress, and into tasks of at most `max_size` items when given.
+    """
+    size = max(1, math.ceil(len(items) / (4 * processes)))
+    if max_size is not None:
+        size = min(size, max_size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def parse_scenarios(model, scenarios, flux_type="fba"):
+    """
+    Normalizes batch scenarios to {"id", "bounds", "objective", "flux_type"},
+    trying each one on `model` so unknown reactions raise KeyError here rather
+    than in a worker; shape errors raise ValueError.
+    """
+    if not isinstance(scenarios, list) or not scenarios:
+        raise ValueError('scenarios must be a non-empty list of objects')
+    parsed = []
+    for position, scenario in enumerate(scenarios):
+        if not isinstance(scenario, dict):
+            raise ValueError('scenarios must be a non-empty list of objects')
+        bounds = scenario.get('bounds', [])
+        if not isinstance(bounds, list) or not all(isinstance(e, dict) for e in bounds):
+            raise ValueError(f'bounds of scenario {position} must be a list of objects')
+        scenario_type = scenario.get('flux_type', flux_type)
+        if scenario_type not in flux_worker.scenario_solvers:
+            raise ValueError(f'flux_type of scenario {position} must be one of fba, pfba, loopless')
+        parsed.append({
+            'id': str(scenario.get('id', position)),
+            'bounds': bounds,
+            'objective': scenario.get('objective'),
+            'flux_type': scenario_type
+        })
+        with model:
+            apply_bound_edits(model, bounds)
+            if scenario.get('objective') is not None:
+                model.objective = scenario['objective']
+    return parsed
+
+
+def parse_fva_options(data):
+    """
+    Targeted FVA parameters of a request body: the `reactions` to analyse,
+    `fraction_of_optimum`, `loopless` and `skip_fixed` (see plan_fva). Only
+    the ones given are returned; raises ValueError on bad values.
+    """
+    options = {}
+    if data.get('reactions') is not None:
+        reactions = data['reactions']
+        if not isinstance(reactions, list) or not reactions or not all(isinstance(r, str) for r in reactions):
+            raise ValueError('reactions must be a non-empty list of reaction ids')
+        options['reactions'] = reactions
+    if data.get('fraction_of_optimum') is not None:
+        fraction = data['fraction_of_optimum']
+        if isinstance(fraction, bool) or not isinstance(fraction, (int, float)) or not 0 <= fraction <= 1:
+            raise ValueError('fraction_of_optimum must be a number between 0 and 1')
+        options['fraction_of_optimum'] = fraction
+    for flag in ('loopless', 'skip_fixed'):
+        if data.get(flag) is not None:
+            if not isinstance(data[flag], bool):
+                raise ValueError(f'{flag} must be true or false')
+            options[flag] = data[flag]
+    return options
+
+
+def parse_sampling_options(data):
+    """
+    Sampling parameters of a request body: `n` samples, `thinning`, `method`
+    (optgp or achr), `seed`, `output` (quantiles or samples) and the
+    `quantiles` to report; raises ValueError on bad values.
+    """
+    def positive_int(name, default, limit):
+        value = data.get(name, default)
+        if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= limit:
+            raise ValueError(f'{name} must be an integer between 1 and {limit}')
+        return value
+
+    options = {
+        'n': positive_int('n', 1000, 100000),
+        'thinning': positive_int('thinning', 100, 10000),
+        'method': data.get('method', 'optgp'),
+        'output': data.get('output', 'quantiles')
+    }
+    if options['method'] not in ('optgp', 'achr'):
+        raise ValueError('method must be optgp or achr')
+    if options['output'] not in ('quantiles', 'samples'):
+        raise ValueError('output must be quantiles or samples')
+    if data.get('seed') is not None:
+        options['seed'] = positive_int('seed', None, 2**31 - 1)
+    if data.get('quantiles') is not None:
+        quantiles = data['quantiles']
+        if not isinstance(quantiles, list) or not quantiles or not all(
+            isinstance(q, (int, float)) and not isinstance(q, bool) and 0 <= q <= 1 for q in quantiles
+        ):
+            raise ValueError('quantiles must be a list of numbers between 0 and 1')
+        options['quantiles'] = quantiles
+    return options
+
+
+def parse_flux_options(data, flux_type):
+    """
+    The plan_flux_job() options of a calculate-flux or flux-jobs body: those of
+    fva and sampling, `growth_threshold` for drd and dgd, and `compress` for
+    the analyses that can run on a ModelCompression. Raises ValueError.
+    """
+    options = {}
+    if flux_type == 'fva':
+        options = parse_fva_options(data)
+    elif flux_type == 'sampling':
+        options = parse_sampling_options(data)
+    elif flux_type in ('drd', 'dgd') and data.get('growth_threshold') is not None:
+        growth_threshold = data['growth_threshold']
+        if isinstance(growth_threshold, bool) or not isinstance(growth_threshold, (int, float)) or not 0 <= growth_threshold <= 1:
+            raise ValueError('growth_threshold must be a fraction of the wild-type objective between 0 and 1')
+        options = {'growth_threshold': growth_threshold}
+
+    if data.get('compress') is not None:
+        if not isinstance(data['compress'], bool):
+            raise ValueError('compress must be true or false')
+        if data['compress']:
+            if flux_type not in ('fva', 'srd', 'sgd', 'sampling'):
+                raise ValueError('compress applies to fva, srd, sgd and sampling only')
+            if options.get('loopless'):
+                raise ValueError('compress cannot be combined with loopless')
+            options['compress'] = True
+    return options
+
+
+def plan_flux_job(model, flux_type, processes, compression=None, **options):
+    """
+    The worker tasks, result combiner and FluxJob hooks (followup, stream) of a
+    flux analysis on `model` (with its objective set), returning the same
+    payload as the synchronous calculate-flux. Scenario batches take `scenarios`
+    (see parse_scenarios) and optionally the `reactions` to report; double
+    deletions take an optional `growth_threshold`; sampling takes the
+    parse_sampling_options() options. With a ModelCompression, `model` is its
+    compressed model and the result is mapped back to the original reactions.
+    """
+    if compression is not None:
+        if flux_type == 'sampling':
+            return plan_sampling(model, processes, compression=compression, **options)
+        reactions = options.get('reactions')
+        if reactions is not None:
+            options = {**options, 'reactions': compression.kept_reactions(reactions)}
+        tasks, combine, hooks = plan_flux_job(model, flux_type, processes, **options)
+        return tasks, lambda results: compression.expand(flux_type, combine(results), reactions), hooks
+
+    if flux_type == 'fva':
+        return plan_fva(model, processes, **options)
+
+    if flux_type in ('srd', 'sgd'):
+        if flux_type == 'srd':
+            tasks = [('reaction_deletion', chunk, {}) for chunk in chunked([r.id for r in model.reactions], processes)]
+        else:
+            tasks = [('gene_deletion', chunk, {}) for chunk in chunked([g.id for g in model.genes], processes)]
+        objective_value = model.optimize().objective_value
+
+        def combine(results):
+            result = pd.concat(results, ignore_index=True)
+            return (
+                {
+                    flux_type: serialize_deletion_result(result),
+                    "objective_value": objective_value
+                },
+                deletion_frame(result),
+                {"objective_value": objective_value}
+            )
+        return tasks, combine, {}
+
+    if flux_type == 'loopless':
+        def combine(results):
+            objective_value, fluxes = results[0]
+            return (
+                {
+                    "objective_value": objective_value,
+                    "fluxes": fluxes.to_dict()
+                },
+                fluxes.rename("flux").rename_axis("reaction").reset_index(),
+                {"objective_value": objective_value}
+            )
+        return [('loopless', [], {})], combine, {}
+
+    if flux_type in ('drd', 'dgd'):
+        return plan_double_deletion(model, flux_type, processes, **options)
+
+    if flux_type == 'sampling':
+        return plan_sampling(model, processes, **options)
+
+    if flux_type == 'scenarios':
+        scenarios = options['scenarios']
+        reaction_ids = [r.id for r in model.reactions]
+        columns = options.get('reactions') or reaction_ids
+        positions = pd.Index(reaction_ids).get_indexer(columns)
+        if (positions < 0).any():
+            raise KeyError(columns[int(np.argmin(positions))])
+        tasks = [('scenarios', chunk, {}) for chunk in chunked(scenarios, processes)]
+
+        def combine(results):
+            rows = [row for result in results for row in result]
+            fluxes = np.vstack([row[2] for row in rows])[:, positions]
+            names = [scenario['id'] for scenario in scenarios]
+            objective_values = [row[0] for row in rows]
+            statuses = [row[1] for row in rows]
+            frame = pd.DataFrame(fluxes, columns=columns)
+            frame.insert(0, "solver_status", statuses)
+            frame.insert(0, "objective_value", objective_values)
+            frame.insert(0, "scenario", names)
+            return (
+                {
+                    "scenarios": names,
+                    "reactions": columns,
+                    "objective_value": objective_values,
+                    "solver_status": statuses,
+                    # rows follow `scenarios`, columns follow `reactions`
+                    "fluxes": np.where(np.isnan(fluxes), None, fluxes).tolist()
+                },
+                frame,
+                {}
+            )
+        return tasks, combine, {}
+
+    raise ValueError(f'flux_type {flux_type} does not run as a job')
+
+
+def plan_fva(model, processes, reactions=None, fraction_of_optimum=1.0, loopless=False, skip_fixed=False):
+    """
+    FVA over `reactions` (all by default). With `skip_fixed`, a reference pFBA
+    solution (made loop-free for loopless FVA) settles every bound it attains:
+    a reaction at its lower bound there has that bound as its minimum, one at
+    its upper bound has it as its maximum, and one with equal bounds is fixed.
+    Only the remaining directions are solved.
+    """
+    reaction_ids = [r.id for r in model.reactions] if reactions is None else list(dict.fromkeys(reactions))
+    fva_options = {'fraction_of_optimum': fraction_of_optimum, 'loopless': loopless}
+    settled = {}  # (reaction id, "minimum" or "maximum") -> flux
+    if skip_fixed:
+        fluxes = pfba(model).fluxes
+        if loopless:
+            fluxes = loopless_solution(model, fluxes=fluxes).fluxes
+        for reaction_id in reaction_ids:
+            reaction = model.reactions.get_by_id(reaction_id)
+            if fluxes[reaction_id] - reaction.lower_bound <= model.tolerance:
+                settled[(reaction_id, "minimum")] = reaction.lower_bound
+            if reaction.upper_bound - fluxes[reaction_id] <= model.tolerance:
+                settled[(reaction_id, "maximum")] = reaction.upper_bound
+        directions = [
+            (reaction_id, what)
+            for reaction_id in reaction_ids
+            for what in ("minimum", "maximum")
+            if (reaction_id, what) not in settled
+        ]
+        tasks = [('fva_directions', chunk, fva_options) for chunk in chunked(directions, processes)]
+    else:
+        for reaction_id in reaction_ids:
+            model.reactions.get_by_id(reaction_id)
+        tasks = [('fva', chunk, fva_options) for chunk in chunked(reaction_ids, processes)]
+
+    def combine(results):
+        if skip_fixed:
+            fva_result = pd.DataFrame(np.nan, index=reaction_ids, columns=["minimum", "maximum"])
+            for (reaction_id, what), value in settled.items():
+                fva_result.at[reaction_id, what] = value
+            for result in results:
+                for reaction_id, what, value in result:
+                    fva_result.at[reaction_id, what] = value
+        elif results:
+            fva_result = pd.concat(results).reindex(reaction_ids)
+        else:
+            fva_result = pd.DataFrame({"minimum": [], "maximum": []}, dtype=float)
+        payload = {
+            "minimum_flux": fva_result['minimum'].to_dict(),
+            "maximum_flux": fva_result['maximum'].to_dict()
+        }
+        metadata = {}
+        if skip_fixed:
+            payload["settled_by_reference"] = metadata["settled_by_reference"] = len(settled)
+        return payload, fva_result.rename_axis("reaction").reset_index(), metadata
+    return tasks, combine, {}
+
+
+def plan_double_deletion(model, flux_type, processes, growth_threshold=0.01):
+    """
+    Pairwise reaction (drd) or gene (dgd) deletion screen in two stages. Single
+    deletions run first; members whose single deletion leaves less than
+    `growth_threshold` of the wild-type objective are essential, and every pair
+    holding one is lethal as well, so it is not solved. Pairs of members that
+    carry no flux in the reference FBA keep that solution feasible, so they
+    grow as the wild type and are not solved either. The remaining pairs are
+    streamed back as they finish.
+    """
+    reference = model.optimize()
+    if reference.status != "optimal" or not reference.objective_value > 0:
+        raise ValueError('Double deletions need a model with a positive optimal objective value')
+    wild_type = reference.objective_value
+    active_reactions = set(reference.fluxes.index[reference.fluxes.abs() > model.tolerance])
+    if flux_type == 'drd':
+        kind, single_task = "reaction", 'reaction_deletion'
+        ids = [r.id for r in model.reactions]
+        active = active_reactions
+    else:
+        kind, single_task = "gene", 'gene_deletion'
+        ids = [gene.id for gene in model.genes]
+        active = {gene.id for gene in model.genes if any(r.id in active_reactions for r in gene.reactions)}
+    tasks = [(single_task, chunk, {}) for chunk in chunked(ids, processes)]
+    singles = len(tasks)
+    screen = {}
+
+    def followup(results):
+        single_growth = pd.concat(results)
+        growth = dict(zip(single_growth["ids"].map(lambda members: next(iter(members))), single_growth["growth"]))
+        viable = [i for i in ids if growth.get(i, np.nan) >= growth_threshold * wild_type]
+        pairs = [
+            (first, second)
+            for position, first in enumerate(viable)
+            for second in viable[position + 1:]
+            if first in active or second in active
+        ]
+        inactive = len(viable) - len(active.intersection(viable))
+        screen.update(
+            essential=[i for i in ids if not growth.get(i, np.nan) >= growth_threshold * wild_type],
+            pruned={
+                "essential_pairs": math.comb(len(ids), 2) - math.comb(len(viable), 2),
+                "zero_flux_pairs": math.comb(inactive, 2)
+            }
+        )
+        return [('double_deletion', chunk, {'kind': kind}) for chunk in chunked(pairs, processes, max_size=500)]
+
+    def stream(task, result):
+        return serialize_deletion_result(result) if task == 'double_deletion' else None
+
+    def combine(results):
+        pair_results = results[singles:]
+        result = pd.concat(pair_results, ignore_index=True) if pair_results else pd.DataFrame(
+            {"ids": [], "growth": [], "status": []}
+        )
+        return (
+            {
+                flux_type: serialize_deletion_result(result),
+                "objective_value": wild_type,
+                "essential": screen["essential"],
+                "pruned": screen["pruned"]
+            },
+            deletion_frame(result),
+            {"objective_value": wild_type, "essential": screen["essential"], "pruned": screen["pruned"]}
+        )
+    return tasks, combine, {'followup': followup, 'stream': stream}
+
+
+def plan_sampling(model, processes, n=1000, thinning=100, method="optgp", seed=None,
+                  output="quantiles", quantiles=(0.05, 0.25, 0.5, 0.75, 0.95), compression=None):
+    """
+    Flux sampling as independent chains of sample_chain_size samples (the
+    last one shorter), seeded seed, seed + 1, ...; each worker computes the
+    warmup points once and reuses them for its later chains. The chains do
+    not depend on the pool size, so a seed always gives the same samples.
+    The result is the per-reaction mean, standard deviation and `quantiles`
+    of all samples. With output "samples" the job also streams every chain's
+    samples as it finishes, and the Arrow result holds the full sample table
+    instead of the summary. With a ModelCompression, samples of its model are
+    mapped to the original reactions.
+    """
+    reaction_ids = compression.original_ids if compression is not None else [r.id for r in model.reactions]
+    expand = compression.fluxes if compression is not None else (lambda samples: samples)
+    if seed is None:
+        seed = int(np.random.default_rng().integers(2**31 - 2**20))
+    tasks = [
+        ('sample', draws, {'method': method, 'thinning': thinning, 'seed': seed + chain})
+        for chain, draws in enumerate(
+            range(start, min(start + sample_chain_size, n)) for start in range(0, n, sample_chain_size)
+        )
+    ]
+
+    def stream(task, result):
+        return {"reactions": reaction_ids, "samples": expand(result).tolist()}
+
+    def combine(results):
+        samples = expand(np.vstack(results))
+        summary = pd.DataFrame(
+            {"mean": samples.mean(axis=0), "std": samples.std(axis=0)},
+            index=reaction_ids
+        )
+        for q, values in zip(quantiles, np.quantile(samples, quantiles, axis=0)):
+            summary[f"q{q:g}"] = values
+        payload = {
+            "n_samples": len(samples),
+            "mean": summary["mean"].to_dict(),
+            "std": summary["std"].to_dict(),
+            "quantiles": {f"{q:g}": summary[f"q{q:g}"].to_dict() for q in quantiles}
+        }
+        metadata = {"n_samples": len(samples), "quantiles": list(quantiles)}
+        if compression is not None:
+            payload["compression"] = metadata["compression"] = compression.stats
+        if output == "samples":
+            return payload, pd.DataFrame(samples, columns=reaction_ids), metadata
+        return payload, summary.rename_axis("reaction").reset_index(), metadata
+    return tasks, combine, {'stream': stream} if output == "samples" else {}
+
+
+def submit_flux_job(model, flux_type, processes=None, register=True, **options):
+    """
+    Plans and starts a job for `model` as it is now; the model can change
+    afterwards. `processes` caps the workers the job uses at once (all by
+    default); `options` go to plan_flux_job(). Unregistered jobs are for
+    synchronous callers that wait on them.
+    """
+    processes = solver_workers if processes is None else int(processes)
+    shards = max(1, min(processes, solver_workers))
+    # unseeded sampling is meant to draw new samples every time
+    if flux_type == 'sampling' and options.get('seed') is None:
+        key = None
+    else:
+        key = result_cache_key(model, flux_type, result_cache_parameters(flux_type, shards, options))
+    cached = get_cached_result(key) if key is not None else None
+    if cached is not None:
+        # done at once; streams no chunks, the whole result is there
+        job = FluxJob(flux_type, b"", [], None, processes, stream=lambda task, result: None)
+        job.complete(cached)
+    else:
+        compression = ModelCompression(model) if options.pop('compress', False) else None
+        if compression is not None:
+            model = compression.model
+        # reference solves made while planning count as the request's own
+        with timed_lps(model, request_lp_stats() if has_request_context() else LPStats()):
+            tasks, combine, hooks = plan_flux_job(
+                model, flux_type, shards, compression=compression, **options
+            )
+        if key is not None:
+            combine = caching_combine(combine, key)
+        job = FluxJob(flux_type, pickle.dumps(model), tasks, combine, processes, **hooks)
+    if register:
+        with flux_jobs_lock:
+            expire_flux_jobs()
+            flux_jobs[job.id] = job
+    return job.start() if cached is None else job
+
+
+def caching_combine(combine, key):
+    def cached_combine(results):
+        result = combine(results)
+        cache_result(key, result)
+        return result
+    return cached_combine
+
+
+def run_flux_job(model, flux_type, processes=None, **options):
+    """Runs a flux analysis on the solver pool and waits; returns (payload, frame, metadata)."""
+    job = submit_flux_job(model, flux_type, processes, register=False, **options)
+    job.wait()
+    if has_request_context():
+        g.setdefault("job_lp_stats", []).append(job.lp_stats)
+    if job.state != "done":
+        raise RuntimeError(job.error or f"Job {job.state}")
+    return job.result
+
+
+def warm_solver_pool():
+    """Starts every solver worker now instead of on the first analysis."""
+    pool = get_solver_pool()
+    for future in [pool.submit(flux_worker.ping) for _ in range(solver_workers)]:
+        future.result()
+
+
+def expire_flux_jobs():
+    """Forgets jobs that finished more than job_ttl_seconds ago. Call with flux_jobs_lock held."""
+    cutoff = time.time() - job_ttl_seconds
+    for job_id in [job_id for job_id, job in flux_jobs.items() if job.finished is not None and job.finished < cutoff]:
+        del flux_jobs[job_id]
+
+
+def get_flux_job(job_id):
+    with flux_jobs_lock:
+        expire_flux_jobs()
+        return flux_jobs.get(job_id)
+
+
 @app.route("/", methods=['GET', 'POST'])
 def index():
     return "Hello flask"
 
 
+@app.route("/healthz", methods=['GET'])
+def healthz():
+    return jsonify({'status': 'ok'})
+
+
+@app.route("/readyz", methods=['GET'])
+def readyz():
+    ready = catalogs_ready()
+    return jsonify({
+        'status': 'ready' if ready else 'loading',
+        'catalogs': catalog_status
+    }), 200 if ready else 503
+
+
+def upload_response(body, cache_key):
+    """
+    An upload result kept as JSON, answered in the format the client's Accept
+    header negotiates: the JSON as is, or re-encoded by jsonify(). It names
+    the GET route that serves it again as its Content-Location.
+    """
+    if response_mimetype() != JSON_MIMETYPE:
+        response = jsonify(json.loads(body))
+    else:
+        response = app.response_class(body, mimetype=JSON_MIMETYPE)
+    response.vary.add("Accept")
+    response.headers["Content-Location"] = f"/api/v1/cobra-model/{cache_key.split(':')[0]}"
+    return response
+
+
+@app.route("/api/v1/cobra-model/<upload_hash>", methods=['GET'])
+def uploadedModel(upload_hash):
+    """
+    A model uploaded before, by the sha256 of its file, from the upload cache;
+    404 once it has been evicted. Tagged by the hash, so a client that has the
+    result gets a 304 without it being read or re-encoded.
+    """
+    for extension in (".xml", ".mat", ".json"):
+        cache_key = f"{upload_hash}:{extension}"
+        body = upload_cache.get(cache_key)
+        if body is not None:
+            return tag_content(f"upload\n{cache_key}") or upload_response(body, cache_key)
+    return jsonify({'status': 'error', 'message': f'Unknown upload: {upload_hash}'}), 404
+
+
 @app.route("/api/v1/cobra-model", methods=['GET', 'POST'])
 def analyseModel():
     
     uploaded_file = request.files['file']
     filename = uploaded_file.filename.lower()
+    content = uploaded_file.read()
 
-    temp_dir = tempfile.mkdtemp()
-    file_path = os.path.join(temp_dir, filename)
-    uploaded_file.save(file_path)
-
+    # The parser depends on the extension, so it is part of the content key.
+    cache_key = f"{hashlib.sha256(content).hexdigest()}:{os.path.splitext(filename)[1]}"
+    cached = upload_cache.get(cache_key)
+    if cached is not None:
+        return upload_response(cached, cache_key)
 
     try:
-        if filename.endswith('.xml'):
-            model = cobra.io.read_sbml_model(file_path)
-        elif filename.endswith('.mat'):
-            model = cobra.io.load_matlab_model(file_path)
-        elif filename.endswith('.json'):
-            model = cobra.io.load_json_model(file_path)
-        else:
-            return jsonify({'status': 'error', 'message' : "Unsupported file type"})
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, os.path.basename(filename))
+            with open(file_path, "wb") as f:
+                f.write(content)
+            if filename.endswith('.xml'):
+                model = cobra.io.read_sbml_model(file_path)
+            elif filename.endswith('.mat'):
+                model = cobra.io.load_matlab_model(file_path)
+            elif filename.endswith('.json'):
+                model = cobra.io.load_json_model(file_path)
+            else:
+                return jsonify({'status': 'error', 'message' : "Unsupported file type"})
 
-        # Stoichiometric matrix
-        S = cobra.util.create_stoichiometric_matrix(model)
-        S_df = pd.DataFrame(S, index=[m.id for m in model.metabolites],
-                            columns=[r.id for r in model.reactions])
+        # Stoichiometric matrix, nonzeros only
+        S = model_stoichiometry(model)
 
         # FBA
         # tic = time.time()
@@ -327,85 +2779,82 @@ def analyseModel():
         df1 = pd.merge(df1, gene_df, left_on="Abbreviation", right_on="reaction")
 
 
-        flag_met = metabolite_df2.iloc[0]['Abbreviation']
-        db = check_kegg_bigg(flag_met) 
+        classification = classify_metabolites(metabolite_df2['Abbreviation'])
+        db = classification["database"]
         if db is None:
             db = "Other"
 
-        cur_metabolites, _, _, _ = get_data(db)
-        
         if (db != "BIGG" and db != "KEGG"): 
             return jsonify({
                     'status': 'error',
                     'message': f'Reaction and Metabolites should belong to only one database either KEGG or BiGG'
                 }), 400
         
-        def is_currency_metabolite(met):
-            
-            currency_keywords = [
-                "h", "pi", "o2", "na1", "h2o", "co2", "atp", "adp",
-                "amp", "nad", "fad", "coa", "ppi", 
-                "nadh", "fadh", "nadp", "nadph"
-            ]
-            currency_keywords_final = cur_metabolites + currency_keywords
-            return any(met.lower().startswith(cur.lower()) for cur in currency_keywords_final)
+        is_currency_metabolite = get_currency_matcher(db, upload_currency_keywords)
 
+        reaction_rows = index_records(df1)
+        metabolite_rows = index_records(metabolite_df2)
         result = {}
 
-        for pathwayName in df1['Subsystem'].dropna().unique():
-            path_Df = df1[df1['Subsystem'] == pathwayName]
-            enzymes = path_Df['Abbreviation'].tolist()
-            path_smat = S_df[enzymes]
-            edges = []
-            currency_edges = []
+        # One pass over the nonzeros: each coefficient is tagged with its reaction,
+        # metabolite and subsystem, then stably sorted so every subsystem is one
+        # contiguous slice in reaction (column) order and metabolite (row) order.
+        met_ids = np.array([m.id for m in model.metabolites], dtype=object)
+        rxn_ids = np.array([r.id for r in model.reactions], dtype=object)
+        currency_mets = is_currency_metabolite.match_array(met_ids.astype(str))
+        subsystem_codes, subsystems = pd.factorize(df1.set_index('Abbreviation')['Subsystem'].reindex(rxn_ids))
+
+        nz_rxn = np.repeat(np.arange(len(rxn_ids)), np.diff(S.indptr))
+        nz_met = S.indices
+        nz_coef = S.data
+        nz_order = np.argsort(subsystem_codes[nz_rxn], kind='stable')
+        nz_bounds = np.searchsorted(subsystem_codes[nz_rxn][nz_order], np.arange(len(subsystems) + 1))
+        rxn_order = np.argsort(subsystem_codes, kind='stable')
+        rxn_bounds = np.searchsorted(subsystem_codes[rxn_order], np.arange(len(subsystems) + 1))
+
+        # substrate -> reaction -> product orientation of every nonzero
+        consumed = nz_coef < 0
+        nz_source = np.where(consumed, met_ids[nz_met], rxn_ids[nz_rxn])
+        nz_target = np.where(consumed, rxn_ids[nz_rxn], met_ids[nz_met])
+        nz_currency = currency_mets[nz_met]
+
+        for code, pathwayName in enumerate(subsystems):
+            part = nz_order[nz_bounds[code]:nz_bounds[code + 1]]
+            is_currency = nz_currency[part]
+            pairs = np.stack([nz_source[part], nz_target[part]], axis=1)
+            edges = pairs[~is_currency].tolist()
+            currency_edges = pairs[is_currency].tolist()
+            metabolite_names = np.unique(met_ids[nz_met[part[~is_currency]]])
+
             enzyme_info = {}
-            metabolite_names = []
             gene_info = {}
             enzyme_crossref = {}
             stoichiometry = {}
 
-            for reac in enzymes:
-                
-                stoichiometry[reac] = {}
-                for met in S_df.index:
-                    coef = S_df.at[met, reac]
-                    if coef == 0:
-                        continue
-
-                    edge = [met, reac] if coef < 0 else [reac, met]
-                    stoichiometry[reac][met] = coef
-                    
-
-                    if is_currency_metabolite(met):
-                        currency_edges.append(edge)
-                    else:
-                        edges.append(edge)
-                        metabolite_names.append(met)
+            for j in rxn_order[rxn_bounds[code]:rxn_bounds[code + 1]].tolist():
+                reac = rxn_ids[j]
+                start, end = S.indptr[j], S.indptr[j + 1]
+                stoichiometry[reac] = dict(zip(met_ids[S.indices[start:end]].tolist(), S.data[start:end].tolist()))
 
                 # Enzyme metadata
-                row = path_Df[path_Df['Abbreviation'] == reac]
-                desc = row['Description'].iloc[0] if not row.empty else reac
-                # flux = row['flux_solution'].iloc[0] if not row.empty else 0.0
+                row = reaction_rows[reac]
+                desc = row['Description']
+                # flux = row['flux_solution']
                 flux = "Not Calculated"
-                lower_bound = row['lower_bound'].iloc[0] if not row.empty else -1000.0
-                upper_bound = row['upper_bound'].iloc[0] if not row.empty else 1000.0
+                lower_bound = row['lower_bound']
+                upper_bound = row['upper_bound']
                 enzyme_info[reac] = [desc, flux, lower_bound, upper_bound, pathwayName]
-                gene_info[reac] = row["gene"].iloc[0]
-                enzyme_crossref[reac] = {"BIGG": row["bigg-crossref"].iloc[0], "KEGG": row["kegg-crossref"].iloc[0], "EC": row["ec-code"].iloc[0]}
+                gene_info[reac] = row["gene"]
+                enzyme_crossref[reac] = {"BIGG": row["bigg-crossref"], "KEGG": row["kegg-crossref"], "EC": row["ec-code"]}
+
 
-            
-            metabolite_names = np.unique(np.array(metabolite_names))
             final_metabolites = {}
             for met in metabolite_names:
-                row = metabolite_df2[metabolite_df2['Abbreviation'] == met]
-                formula = (
-                    row["Formula"].iloc[0]
-                    if not row.empty and "Formula" in row.columns
-                    else "None"
-                )
-                compartment = compartments.get(row['Compartment'].iloc[0], 'Cytoplasm')
-                desc = row['Name'].iloc[0] if not row.empty else met
-                chebi_crossref = row["Chebi-crossref"].iloc[0] if not row.empty else []
+                row = metabolite_rows[met]
+                formula = row["Formula"]
+                compartment = compartments.get(row['Compartment'], 'Cytoplasm')
+                desc = row['Name']
+                chebi_crossref = row["Chebi-crossref"]
                 final_metabolites[str(met)] = [desc, formula, compartment, chebi_crossref, 'No weight']
                 
             result[pathwayName] = {
@@ -421,14 +2870,195 @@ def analyseModel():
         response = {
             'state': 'success',
             'result': result,
-            'database': db
-            
+            'database': db,
+            'mixed_databases': classification["mixed"]
         }
-        return jsonify(response)
+        body = app.json.dumps(response).encode()
+        upload_cache.put(cache_key, body, len(body))
+        return upload_response(body, cache_key)
 
     except Exception as e:
         return f"Error loading model: {str(e)}", 500
     
+@app.route('/api/v1/model-sessions', methods=['POST'])
+def createModelSession():
+    """Compiles modelData once and keeps it server-side; analyses then pass the session_id."""
+    try:
+        if not request.is_json:
+            return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
+
+        data = request.get_json()
+        modelData = data.get('modelData', data.get('new_rxn'))
+        db, mixed = check_model_database(modelData)
+        if db not in ("BIGG", "KEGG"):
+            return jsonify({
+                    'status': 'error',
+                    'message': f'Metabolite should belong to only one database either KEGG or BiGG'
+                }), 400
+
+        try:
+            with phase("build"):
+                model = build_cobra_model(modelData, get_currency_matcher(db))
+        except KeyError as ke:
+            return jsonify({
+                    'status': 'error',
+                    'message': f'Invalid metabolite or enzyme reference: {str(ke)}'
+                }), 400
+
+        session = ModelSession(model, db, mixed)
+        if not model_sessions.put(session.id, session, session.footprint()):
+            return jsonify({'status': 'error', 'message': 'Model is too large to keep as a session'}), 413
+        return jsonify({'status': 'success', **session.describe()}), 201
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': 'Internal server error'
+        }), 500
+
+
+@app.route('/api/v1/model-sessions/<session_id>', methods=['GET', 'DELETE'])
+def modelSession(session_id):
+    if request.method == 'DELETE':
+        session = model_sessions.pop(session_id)
+    else:
+        session = model_sessions.get(session_id)
+    if session is None:
+        return jsonify({'status': 'error', 'message': f'Unknown model session: {session_id}'}), 404
+    return jsonify({'status': 'success', **session.describe()})
+
+
+@app.route('/api/v1/model-sessions/<session_id>', methods=['PATCH'])
+def patchModelSession(session_id):
+    """
+    Applies add/remove/update operations to a session's model in place, against
+    the version the client last saw, and returns the new version.
+    """
+    if not request.is_json:
+        return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
+
+    data = request.get_json()
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not all(isinstance(o, dict) for o in operations):
+        return jsonify({'status': 'error', 'message': 'operations must be a list of objects'}), 400
+
+    session = model_sessions.get(session_id)
+    if session is None:
+        return jsonify({'status': 'error', 'message': f'Unknown model session: {session_id}'}), 404
+
+    with session.lock:
+        if data.get('version') != session.version:
+            return jsonify({
+                'status': 'error',
+                'message': f'Model session is at version {session.version}, not {data.get("version")}',
+                'version': session.version
+            }), 409
+
+        # Rehearse inside a model context, which undoes everything on exit, so a
+        # failing operation leaves the session untouched; then apply for real.
+        try:
+            with session.model:
+                apply_model_patch(session.model, operations)
+        except KeyError as ke:
+            return jsonify({
+                    'status': 'error',
+                    'message': f'Invalid metabolite or enzyme reference: {str(ke)}'
+                }), 400
+        except Exception as e:
+            return jsonify({'status': 'error', 'message': f'Invalid operation: {str(e)}'}), 400
+        finally:
+            remove_orphan_genes(session.model)
+
+        try:
+            apply_model_patch(session.model, operations)
+            remove_orphan_genes(session.model)
+        except Exception as e:
+            # the rehearsal passed, so this is unexpected; the model may be partly edited
+            model_sessions.pop(session_id)
+            return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+        session.edited()
+        # re-weigh the session: the patch may have grown or shrunk the model
+        if not model_sessions.put(session_id, session, session.footprint()):
+            return jsonify({'status': 'error', 'message': 'Model is too large to keep as a session'}), 413
+        return jsonify({'status': 'success', 'applied': len(operations), **session.describe()})
+
+
+@app.route('/api/v1/model-sessions/<session_id>/optimize', methods=['POST'])
+def optimizeModelSession(session_id):
+    """
+    What-if re-solve: applies `bounds` edits and an optional `objective` to the
+    session's model for this call only and re-optimizes its existing solver
+    problem, which starts from the basis of the previous solve. The edits are
+    undone in place afterwards, so the session version does not change.
+    `flux_type` is fba (default) or pfba. A solve that is not optimal reports
+    its solver_status with null fluxes; one pfba cannot finish answers 422.
+    """
+    if not request.is_json:
+        return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
+
+    data = request.get_json()
+    edits = data.get('bounds', [])
+    flux_type = data.get('flux_type', 'fba')
+    if not isinstance(edits, list) or not all(isinstance(e, dict) for e in edits):
+        return jsonify({'status': 'error', 'message': 'bounds must be a list of objects'}), 400
+    if flux_type not in ('fba', 'pfba'):
+        return jsonify({'status': 'error', 'message': 'flux_type must be fba or pfba'}), 400
+
+    session = model_sessions.get(session_id)
+    if session is None:
+        return jsonify({'status': 'error', 'message': f'Unknown model session: {session_id}'}), 404
+
+    with session.lock:
+        expected = data.get('version')
+        if expected is not None and expected != session.version:
+            return jsonify({
+                'status': 'error',
+                'message': f'Model session is at version {session.version}, not {expected}',
+                'version': session.version
+            }), 409
+
+        model = session.model
+        try:
+            with model:
+                apply_bound_edits(model, edits)
+                if data.get('objective') is not None:
+                    model.objective = data['objective']
+                with phase("solve"), timed_lps(model, request_lp_stats()):
+                    try:
+                        solution = pfba(model) if flux_type == 'pfba' else model.optimize()
+                    except OptimizationError as e:
+                        return jsonify({
+                            'status': 'error',
+                            'message': str(e),
+                            'solver_status': model.solver.status,
+                            'version': session.version
+                        }), 422
+        except KeyError as ke:
+            return jsonify({
+                    'status': 'error',
+                    'message': f'Invalid metabolite or enzyme reference: {str(ke)}'
+                }), 400
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    # the primal values of a solve that is not optimal mean nothing: null
+    # fluxes in JSON and NaN in Arrow, as flux-scenarios reports them
+    optimal = solution.status == "optimal"
+    fluxes = solution.fluxes if optimal else pd.Series(np.nan, index=solution.fluxes.index, name="fluxes")
+    objective_value = solution.objective_value if optimal else None
+    return columnar_response(
+        {
+            "objective_value": objective_value,
+            "solver_status": solution.status,
+            "fluxes": fluxes.to_dict() if optimal else dict.fromkeys(fluxes.index),
+            "version": session.version
+        },
+        fluxes.rename("flux").rename_axis("reaction").reset_index(),
+        objective_value=objective_value,
+        solver_status=solution.status
+    )
+
+
 @app.route('/api/v1/add-reactions', methods=['POST']) 
 def addReactions():
     try:
@@ -450,15 +3080,7 @@ def addReactions():
                     'message': f'Metabolite should belong to only one database either KEGG or BiGG'
                 }), 400
             
-            def is_currency_metabolite(met):
-                
-                currency_keywords = [
-                    "h", "k", "pi", "cl", "o2", "na1", "h2o", "co2", "atp", "adp",
-                    "utp", "gtp", "gdp", "amp", "nad", "fad", "coa", "ppi", "nh4", "nh3",
-                    "acp", "thf", "crn", "nadh", "fadh", "nadp", "nadph"
-                ]
-                currency_keywords_final = cur_metabolites + currency_keywords
-                return any(met.lower().startswith(cur.lower()) for cur in currency_keywords_final)
+            is_currency_metabolite = get_currency_matcher(db)
 
             if not metabolite:
                 return {'status': 'error', 'message': 'Missing metabolite'}, 400
@@ -472,28 +3094,22 @@ def addReactions():
                         'result': {}
                     }), 200
 
-                filtered_smat = smat[result]
+                reaction_records, metabolite_records = get_catalog_records(db)
                 edges_by_enzyme = {}
                 currency_edges_by_enzyme = {}
                 metabolite_names_by_enzyme = {}
                 stoichiometry = {}
 
-                for reac in filtered_smat.columns:
+                for reac in result:
                     enzyme_edges = []
                     enzyme_currency_edges = []
                     metabolite_names = []
                     stoichiometry[reac] = {}
 
-                    for met in filtered_smat.index:
+                    for met, coef in smat.reaction_items(reac):
                         if(db == "KEGG"):
-                            cleaned_metabolite = clean_met_name(met)
-                            coef = filtered_smat.loc[met, reac]
-
-                            if coef == 0:
-                                continue
-
                             edge = [met, reac] if coef < 0 else [reac, met]
-                            stoichiometry[reac][met] = coef.item()
+                            stoichiometry[reac][met] = coef
 
                             if is_currency_metabolite(met):
                                 enzyme_currency_edges.append(edge)
@@ -501,14 +3117,9 @@ def addReactions():
                                 enzyme_edges.append(edge)
                                 metabolite_names.append(met)
                         elif (db == "BIGG"):
-                            cleaned_metabolite = clean_met_name(met)
-                            coef = filtered_smat.loc[met, reac]
-
-                            if coef == 0:
-                                continue
-
+                            cleaned_metabolite = clean_met_name(met)
                             edge = [cleaned_metabolite, reac] if coef < 0 else [reac, cleaned_metabolite]
-                            stoichiometry[reac][cleaned_metabolite] = coef.item()
+                            stoichiometry[reac][cleaned_metabolite] = coef
 
                             if is_currency_metabolite(cleaned_metabolite):
                                 enzyme_currency_edges.append(edge)
@@ -523,7 +3134,7 @@ def addReactions():
                         currency_edges_by_enzyme[reac] = enzyme_currency_edges
 
                 final = {}
-                for enzyme in filtered_smat.columns:
+                for enzyme in result:
                     try:
                         edges = edges_by_enzyme.get(enzyme, [])
                         currency_edges = currency_edges_by_enzyme.get(enzyme, [])
@@ -555,19 +3166,15 @@ def addReactions():
                         rxn_str = " + ".join(reactants) + " <==> " + " + ".join(products)
 
                         # Enzyme description
-                        desc_row = df[df['Abbreviation'] == enzyme]
-                        description = desc_row['Description'].iloc[0] if not desc_row.empty else enzyme
+                        desc_row = reaction_records.get(enzyme)
+                        description = desc_row['Description'] if desc_row is not None else enzyme
 
                         # Metabolite name mapping
                         metabolites = {}
                         for met in met_list:
-                            row = df2[df2['Abbreviation'] == met]
-                            desc = row['Description'].iloc[0] if not row.empty else met
-                            formula = (
-                                row["Formula"].iloc[0]
-                                if not row.empty and "Formula" in row.columns
-                                else "None"
-                            )
+                            row = metabolite_records.get(met)
+                            desc = row['Description'] if row is not None else met
+                            formula = row.get("Formula", "None") if row is not None else "None"
                             # chebi_crossref = find_crossrefs_mets(row, db)
                             chebi_crossref = []
                             metabolites[str(met)] = [desc, formula, 'Cytoplasm', chebi_crossref, 'No weight']
@@ -645,58 +3252,40 @@ def fillMissing():
                     'message': f'Metabolite should belong to only one database either KEGG or BiGG'
                 }), 400
 
-        def is_currency_metabolite(met):
-            currency_keywords = [
-                "h", "k", "pi", "cl", "o2", "na1", "h2o", "co2", "atp", "adp",
-                "utp", "gtp", "gdp", "amp", "nad", "fad", "coa", "ppi", "nh4", "nh3",
-                "acp", "thf", "crn", "nadh", "fadh", "nadp", "nadph"
-                ]
-            currency_keywords_final = cur_metabolites + currency_keywords
-            return any(met.lower().startswith(cur.lower()) for cur in currency_keywords_final)
+        is_currency_metabolite = get_currency_matcher(db1)
         
         try:
-            first = clean_met_name(metabolite[0])
-            second = clean_met_name(metabolite[1])
-            cleaned_index_map = {clean_met_name(idx): idx for idx in smat.index}
-            actual_index1 = cleaned_index_map.get(first)
-            actual_index2 = cleaned_index_map.get(second)
-                
-            row1 = smat.loc[actual_index1]
-            row2 = smat.loc[actual_index2]
+            actual_index1 = smat.resolve(metabolite[0])
+            actual_index2 = smat.resolve(metabolite[1])
+            if actual_index1 is None or actual_index2 is None:
+                raise KeyError(metabolite[0] if actual_index1 is None else metabolite[1])
 
-            if row1.empty or row2.empty:
+            if not smat.met_row(actual_index1) or not smat.met_row(actual_index2):
                 return jsonify({
                         'status': 'error',
                         'message': 'No enzymes found for this metabolite',
                         'result': {}
                 }), 200
                 
-            filtered_enzymes = []
-            for enz in row1.index:
-                if ((row1[enz] < 0) and (row2[enz] > 0)):
-                    filtered_enzymes.append(enz)
+            filtered_enzymes = smat.reactions_converting(actual_index1, actual_index2)
+            reaction_records, metabolite_records = get_catalog_records(db1)
 
-            filtered_smat = smat[filtered_enzymes]
             edges_by_enzyme = {}
             currency_edges_by_enzyme = {}
             metabolite_names_by_enzyme = {}
             stoichiometry = {}
 
-            for reac in filtered_smat.columns:
+            for reac in filtered_enzymes:
                 enzyme_edges = []
                 currency_edges = []
                 metabolite_names = []
                 stoichiometry[reac] = {}
 
-                for met in filtered_smat.index:
+                for met, coef in smat.reaction_items(reac):
                     if (db1 == "BIGG"):
                         cleaned_metabolite = clean_met_name(met)
-                        coef = filtered_smat.loc[met, reac]
-
-                        if coef == 0:
-                            continue
                         edge = [cleaned_metabolite, reac] if coef < 0 else [reac, cleaned_metabolite]
-                        stoichiometry[reac][cleaned_metabolite] = coef.item()
+                        stoichiometry[reac][cleaned_metabolite] = coef
 
                         if is_currency_metabolite(cleaned_metabolite):
                             currency_edges.append(edge)
@@ -704,14 +3293,9 @@ def fillMissing():
                             enzyme_edges.append(edge)
                             metabolite_names.append(cleaned_metabolite)
                     elif (db1 == "KEGG"):
-                        cleaned_metabolite = clean_met_name(met)
-                        coef = filtered_smat.loc[met, reac]
-
-                        if coef == 0:
-                            continue
                         edge = [met, reac] if coef < 0 else [reac, met]
 
-                        stoichiometry[reac][met] = coef.item()
+                        stoichiometry[reac][met] = coef
                         if is_currency_metabolite(met):
                             currency_edges.append(edge)
                         else:
@@ -725,7 +3309,7 @@ def fillMissing():
                     currency_edges_by_enzyme[reac] = currency_edges
 
             final = {}
-            for enzyme in filtered_smat.columns:
+            for enzyme in filtered_enzymes:
                 try:
                     edges = edges_by_enzyme.get(enzyme, [])
                     currency_edges = currency_edges_by_enzyme.get(enzyme, [])
@@ -753,17 +3337,13 @@ def fillMissing():
                                 products.append(formatted)
 
                     rxn_str = " + ".join(reactants) + " <==> " + " + ".join(products)
-                    desc_row = df[df['Abbreviation'] == enzyme]
-                    description = desc_row['Description'].iloc[0] if not desc_row.empty else enzyme
+                    desc_row = reaction_records.get(enzyme)
+                    description = desc_row['Description'] if desc_row is not None else enzyme
                     metabolites = {}
                     for met in met_list:
-                        row = df2[df2['Abbreviation'] == met]
-                        desc = row['Description'].iloc[0] if not row.empty else met
-                        formula = (
-                            row["Formula"].iloc[0]
-                            if not row.empty and "Formula" in row.columns
-                            else "None"
-                        )
+                        row = metabolite_records.get(met)
+                        desc = row['Description'] if row is not None else met
+                        formula = row.get("Formula", "None") if row is not None else "None"
                         chebi_crossref = []
                         metabolites[str(met)] = [desc, formula, 'Cytoplasm', chebi_crossref, 'No weight']
 
@@ -806,45 +3386,62 @@ def fillMissing():
             'message': 'Internal server error'
         }), 500
     
-@app.route("/api/v1/serve-query-table", methods=["POST"])
+def query_table_response(database, query, limit, offset):
+    """A page of the reactions matching `query` in a catalog, best match first."""
+    if (limit is not None and (not isinstance(limit, int) or limit < 1)) or not isinstance(offset, int) or offset < 0:
+        return jsonify({'status': 'error', 'message': 'limit must be a positive integer and offset a non-negative integer'}), 400
+
+    index = get_search_index(database)
+    if request.method == "GET":
+        cached = tag_content(json.dumps(["query", index.digest, query, limit, offset]))
+        if cached is not None:
+            return cached
+    matching_rows = index.search(query)
+
+    if not matching_rows:
+        return jsonify({'status': 'error', 'message': 'No results found for your query'}), 400
+
+    page = matching_rows[offset:offset + limit] if limit else matching_rows[offset:]
+
+    final = {}
+    for row in page:
+        final[index.abbreviations[row]] = {
+            'reaction': index.reactions[row],
+            'description': index.descriptions[row]
+        }
+
+    clean_data = sanitize(final)
+    next_offset = offset + len(page)
+
+    return jsonify({
+        'status': 'success',
+        'result': clean_data,
+        'order': [index.abbreviations[row] for row in page],
+        'total': len(matching_rows),
+        'next_offset': next_offset if next_offset < len(matching_rows) else None
+    })
+
+
+@app.route("/api/v1/serve-query-table", methods=["GET", "POST"])
 def serve_table():
+    """
+    Catalog reaction search. GET takes `db`, `query`, `limit` and `offset` as
+    query parameters and is tagged by the catalog and the query, so a repeated
+    search is answered with 304 before it runs.
+    """
     try:
+        if request.method == "GET":
+            return query_table_response(
+                request.args.get('db'),
+                request.args.get('query'),
+                request.args.get('limit', type=int),
+                request.args.get('offset', 0, type=int)
+            )
         if not request.is_json:
                 return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
         data = request.get_json()
-        query = data.get('query')
-        database = data.get('database')
-        
-
-        if(database == "BIGG"):
-            cur_metabolites, smat, df, df2 = get_data(database)
-        elif(database == "KEGG"):
-            cur_metabolites, smat, df, df2 = get_data(database)
-
-        matching_enzymes = get_matching_enzymes(query=query, database=database)
-
-        if not matching_enzymes:
-            return jsonify({'status': 'error', 'message': 'No results found for your query'}), 400
-        
-        enzymes_df = df[df["Abbreviation"].isin(matching_enzymes)]
-
-        final = {}
-        for i in range(len(enzymes_df)):
-            row = enzymes_df.iloc[i]
-            enzyme = row["Abbreviation"]
-            final[enzyme] = {
-                'reaction': row["Reaction"],
-                'description': row["Description"]
-            }
-
-        clean_data = sanitize(final)
-    
-        return jsonify({
-            'status': 'success',
-            'result': clean_data
-        })
+        return query_table_response(data.get('database'), data.get('query'), data.get('limit'), data.get('offset', 0))
 
-    
     except Exception as e:
         
         return jsonify({
@@ -863,38 +3460,27 @@ def addFullReactionsv2():
         elif(database == "KEGG"):
             cur_metabolites, smat, df, df2 = get_data(database)
 
-        def is_currency_metabolite(met):
-            currency_keywords = [
-                "h", "k", "pi", "cl", "o2", "na1", "h2o", "co2", "atp", "adp",
-                "utp", "gtp", "gdp", "amp", "nad", "fad", "coa", "ppi", "nh4", "nh3",
-                "acp", "thf", "crn", "nadh", "fadh", "nadp", "nadph"
-                ]
-            currency_keywords_final = cur_metabolites + currency_keywords
-            return any(met.lower().startswith(cur.lower()) for cur in currency_keywords_final)
+        is_currency_metabolite = get_currency_matcher(database)
         
         try:
-            filtered_smat = smat[selected_enzymes]
+            selected_stoichiometry = {reac: smat.reaction_items(reac) for reac in selected_enzymes}
+            reaction_records, metabolite_records = get_catalog_records(database)
             edges_by_enzyme = {}
             currency_edges_by_enzyme = {}
             metabolite_names_by_enzyme = {}
             stoichiometry = {}
 
-            for reac in filtered_smat.columns:
+            for reac, items in selected_stoichiometry.items():
                 enzyme_edges = []
                 enzyme_currency_edges = []
                 metabolite_names = []
                 stoichiometry[reac] = {}
 
-                for met in filtered_smat.index:
+                for met, coef in items:
                     if (database == "BIGG"):
                         cleaned_metabolite = clean_met_name(met)
-                        coef = filtered_smat.loc[met, reac]
-
-                        if coef == 0:
-                            continue
-
                         edge = [cleaned_metabolite, reac] if coef < 0 else [reac, cleaned_metabolite]
-                        stoichiometry[reac][cleaned_metabolite] = coef.item()
+                        stoichiometry[reac][cleaned_metabolite] = coef
 
                         if is_currency_metabolite(cleaned_metabolite):
                                 enzyme_currency_edges.append(edge)
@@ -902,14 +3488,8 @@ def addFullReactionsv2():
                             enzyme_edges.append(edge)
                             metabolite_names.append(cleaned_metabolite)
                     elif (database == "KEGG"):
-                        cleaned_metabolite = clean_met_name(met)
-                        coef = filtered_smat.loc[met, reac]
-
-                        if coef == 0:
-                            continue
-
                         edge = [met, reac] if coef < 0 else [reac, met]
-                        stoichiometry[reac][met] = coef.item()
+                        stoichiometry[reac][met] = coef
 
                         if is_currency_metabolite(met):
                                 enzyme_currency_edges.append(edge)
@@ -924,7 +3504,7 @@ def addFullReactionsv2():
                     currency_edges_by_enzyme[reac] = enzyme_currency_edges
 
             final = {}
-            for enzyme in filtered_smat.columns:
+            for enzyme in selected_stoichiometry:
                 try:
                     edges = edges_by_enzyme.get(enzyme, [])
                     currency_edges = currency_edges_by_enzyme.get(enzyme, [])
@@ -954,19 +3534,15 @@ def addFullReactionsv2():
 
                     rxn_str = " + ".join(reactants) + " <==> " + " + ".join(products)
                         # Enzyme description
-                    desc_row = df[df['Abbreviation'] == enzyme]
-                    description = desc_row['Description'].iloc[0] if not desc_row.empty else enzyme
+                    desc_row = reaction_records.get(enzyme)
+                    description = desc_row['Description'] if desc_row is not None else enzyme
 
                         # Metabolite name mapping
                     metabolites = {}
                     for met in met_list:
-                        row = df2[df2['Abbreviation'] == met]
-                        desc = row['Description'].iloc[0] if not row.empty else met
-                        formula = (
-                                row["Formula"].iloc[0]
-                                if not row.empty and "Formula" in row.columns
-                                else "None"
-                            )
+                        row = metabolite_records.get(met)
+                        desc = row['Description'] if row is not None else met
+                        formula = row.get("Formula", "None") if row is not None else "None"
                         # chebi_crossref = find_crossrefs_mets(row, db)
                         chebi_crossref = []
                         metabolites[str(met)] = [desc, formula, 'Cytoplasm', chebi_crossref, 'No weight']
@@ -1015,21 +3591,29 @@ def addFullReactionsv2():
   
 
 @app.route('/api/v1/calculate-flux', methods=['POST'])
+@uses_model_session
 def calculateFlux():
     try:
         if not request.is_json:
             return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
 
         data = request.get_json()
+        session = g.model_session
         modelData = data.get('new_rxn')
         flux_type = data.get('flux_type')
         objective_rxn = data.get("objective")
+        processes = data.get('processes')
+        if processes is not None and (not isinstance(processes, int) or processes < 1):
+            return jsonify({'status': 'error', 'message': 'processes must be a positive integer'}), 400
+        if flux_type in ('drd', 'dgd'):
+            return jsonify({
+                'status': 'error',
+                'message': f'{flux_type} screens run as background jobs: POST them to /api/v1/flux-jobs'
+            }), 400
+        if flux_type not in ('fba', 'pfba', 'loopless', 'fva', 'srd', 'sgd', 'sampling'):
+            return jsonify({'status': 'error', 'message': 'flux_type must be one of fba, pfba, loopless, fva, srd, sgd, sampling'}), 400
 
-        path_key = list(modelData.keys())[0]
-        path_obj = modelData[path_key]
-        firstmet = list(path_obj["metabolites"].keys())[0]
-
-        db = check_kegg_bigg(firstmet)
+        db = session.database if session else check_model_database(modelData)[0]
         if(db == "BIGG"):
             cur_metabolites, smat, df, df2 = get_data(db)
         elif(db == "KEGG"):
@@ -1040,129 +3624,46 @@ def calculateFlux():
                     'message': f'Metabolite should belong to only one database either KEGG or BiGG'
                 }), 400
 
-        def is_currency_metabolite(met):
-            currency_keywords = [
-                "h", "k", "pi", "cl", "o2", "na1", "h2o", "co2", "atp", "adp",
-                "utp", "gtp", "gdp", "amp", "nad", "fad", "coa", "ppi", "nh4", "nh3",
-                "acp", "thf", "crn", "nadh", "fadh", "nadp", "nadph"
-                ]
-            currency_keywords_final = cur_metabolites + currency_keywords
-            return any(met.lower().startswith(cur.lower()) for cur in currency_keywords_final)
+        is_currency_metabolite = get_currency_matcher(db)
         try:
-            model = Model('new_model')
-            for path in modelData:
-                pathData = modelData[path]
-                metabolites = {}
-                for met_id, arr in pathData['metabolites'].items():
-                    name, formula, compt, crossref, weight = arr
-                    crossrefdict = {"chebi": crossref}
-                    metabolites[met_id] = Metabolite(id=met_id, name=name, compartment=met_id.split('_')[-1], formula=formula)
-                    metabolites[met_id].annotation = crossrefdict
-                all_edges = pathData['edges'] + pathData['currency_edges']
-                currency_mets = set()
-                for a, b in all_edges:
-                    for met in [a, b]:
-                        if is_currency_metabolite(met):
-                            currency_mets.add(met)
-                for met_id in currency_mets:
-                    if met_id not in metabolites:
-                        metabolites[met_id] = Metabolite(id=met_id, name=met_id)
-
-                reaction_edges = defaultdict(list)
-                for src, tgt in all_edges:
-                    if src in pathData['enzymes']:  # enzyme → metabolite (product)
-                        reaction_edges[src].append((None, tgt))
-                    elif tgt in pathData['enzymes']:  # metabolite (substrate) → enzyme
-                        reaction_edges[tgt].append((src, None))
-
-                gene_list = pathData.get("genes", {})
-
-                for enzyme_id, edge_list in reaction_edges.items():
-                    reaction = Reaction(enzyme_id)
-                    enzyme_info = pathData['enzymes'].get(enzyme_id, [])
-                    
-
-                    reaction.name = enzyme_info[0] if len(enzyme_info) > 0 else enzyme_id
-                    reaction.lower_bound = enzyme_info[2] 
-                    reaction.upper_bound = enzyme_info[3] 
-                    rxn_annotation = pathData["enzyme_crossref"][enzyme_id]
-                    cobra_annotation = {key_map[k]: v for k, v in rxn_annotation.items() if k in key_map}
-                    reaction.annotation = cobra_annotation
-
-                    actual_stoichiometry = pathData["stoichiometry"][enzyme_id]
-                    model_stoichiometry = {}
-                    for src, tgt in edge_list:
-                        if src:
-                            model_stoichiometry[metabolites[src]] = actual_stoichiometry[src]
-                        if tgt:
-                            model_stoichiometry[metabolites[tgt]] = actual_stoichiometry[tgt]
-
-                    reaction.add_metabolites(model_stoichiometry)
-
-                    reaction.subsystem = enzyme_info[4]
-
-                    gene = list({g.strip() for g in gene_list.get(enzyme_id, []) if g.strip()})
-                    if gene:
-                        rule = "(" + " or ".join(gene) + ")" if len(gene) > 1 else f'( {gene[0]} )'
+            with phase("build"):
+                model = session.model if session else build_cobra_model(modelData, is_currency_metabolite)
 
-                        
-                        if reaction.gene_reaction_rule != rule:
-                            try:
-                                reaction.gene_reaction_rule = rule
-                            except Exception as e:
-                                continue
-                                
-
-                    model.add_reactions([reaction])
-
-            model.objective = objective_rxn
+                model.objective = objective_rxn
             # cleaned_model = clean_cobra_model(model)
 
-            if flux_type == 'loopless':
-                solution = loopless_solution(model)
-                return jsonify({
-                    "objective_value": solution.objective_value,
-                    "fluxes": solution.fluxes.to_dict()
-                })
-
-            elif flux_type == 'pfba':
-                solution = pfba(model)
-                return jsonify({
-                    "objective_value": solution.objective_value,
-                    "fluxes": solution.fluxes.to_dict()
-                })
-
-            elif flux_type == 'fba':
-                solution = model.optimize()
-                return jsonify({
-                    "objective_value": solution.objective_value,
-                    "fluxes": solution.fluxes.to_dict()
-                })
+            if flux_type in ('loopless', 'pfba', 'fba'):
+                with phase("solve"), timed_lps(model, request_lp_stats()):
+                    key = result_cache_key(model, flux_type, {})
+                    result = get_cached_result(key)
+                    if result is None:
+                        if flux_type == 'loopless':
+                            solution = loopless_solution(model)
+                        elif flux_type == 'pfba':
+                            solution = pfba(model)
+                        else:
+                            solution = model.optimize()
+                        result = (
+                            {
+                                "objective_value": solution.objective_value,
+                                "fluxes": solution.fluxes.to_dict()
+                            },
+                            solution.fluxes.rename("flux").rename_axis("reaction").reset_index(),
+                            {"objective_value": solution.objective_value}
+                        )
+                        cache_result(key, result)
+                payload, frame, metadata = result
+                return columnar_response(payload, frame, **metadata)
             
-            elif flux_type == 'fva':
-                # You can adjust fraction_of_optimum if needed (default: 1.0)
-                fva_result = flux_variability_analysis(model, fraction_of_optimum=1.0)
-
-                return jsonify({
-                    "minimum_flux": fva_result['minimum'].to_dict(),
-                    "maximum_flux": fva_result['maximum'].to_dict()
-                })
-
-            elif flux_type == 'srd':
-                result = single_reaction_deletion(model)
-                solution = model.optimize()
-                return jsonify({
-                    "srd": serialize_deletion_result(result),
-                    "objective_value": solution.objective_value
-                })
-
-            elif flux_type == 'sgd':
-                result = single_gene_deletion(model)
-                solution = model.optimize()
-                return jsonify({
-                    "sgd": serialize_deletion_result(result),
-                    "objective_value": solution.objective_value
-                })
+            elif flux_type in ('fva', 'srd', 'sgd', 'sampling'):
+                try:
+                    options = parse_flux_options(data, flux_type)
+                except ValueError as e:
+                    return jsonify({'status': 'error', 'message': str(e)}), 400
+                # sharded across the solver pool, at most `processes` workers at once
+                with phase("solve"):
+                    payload, frame, metadata = run_flux_job(model, flux_type, processes, **options)
+                return columnar_response(payload, frame, **metadata)
 
         except KeyError as ke:
                 return jsonify({
@@ -1185,22 +3686,226 @@ def calculateFlux():
         }), 500
 
 
+@app.route('/api/v1/flux-scenarios', methods=['POST'])
+@uses_model_session
+def fluxScenarios():
+    """
+    Solves one model under many scenarios in a single call. Each scenario has
+    `bounds` edits, an optional `objective` and `flux_type` (fba, pfba or
+    loopless; the body's `flux_type` by default) and an optional `id`.
+    Scenarios are spread over the solver pool and the reply is a scenario x
+    reaction flux matrix, limited to `reactions` when given.
+    """
+    try:
+        if not request.is_json:
+            return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
+
+        data = request.get_json()
+        session = g.model_session
+        modelData = data.get('new_rxn')
+        objective_rxn = data.get("objective")
+        processes = data.get('processes')
+        reactions = data.get('reactions')
+        if processes is not None and (not isinstance(processes, int) or processes < 1):
+            return jsonify({'status': 'error', 'message': 'processes must be a positive integer'}), 400
+        if reactions is not None and (not isinstance(reactions, list) or not all(isinstance(r, str) for r in reactions)):
+            return jsonify({'status': 'error', 'message': 'reactions must be a list of reaction ids'}), 400
+
+        db = session.database if session else check_model_database(modelData)[0]
+        if db not in ("BIGG", "KEGG"):
+            return jsonify({
+                    'status': 'error',
+                    'message': f'Metabolite should belong to only one database either KEGG or BiGG'
+                }), 400
+
+        is_currency_metabolite = get_currency_matcher(db)
+        try:
+            with phase("build"):
+                model = session.model if session else build_cobra_model(modelData, is_currency_metabolite)
+                if objective_rxn is not None:
+                    model.objective = objective_rxn
+            scenarios = parse_scenarios(model, data.get('scenarios'), data.get('flux_type', 'fba'))
+            with phase("solve"):
+                payload, frame, metadata = run_flux_job(
+                    model, 'scenarios', processes, scenarios=scenarios, reactions=reactions
+                )
+        except KeyError as ke:
+            return jsonify({
+                    'status': 'error',
+                    'message': f'Invalid metabolite or enzyme reference: {str(ke)}'
+                }), 400
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        return columnar_response(payload, frame, **metadata)
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': 'Internal server error'
+        }), 500
+
+
+@app.route('/api/v1/flux-jobs', methods=['POST'])
+@uses_model_session
+def submitFluxJob():
+    """
+    Starts fva, srd, sgd, loopless, sampling, a double deletion screen (drd,
+    dgd) or a scenario batch in the background. Takes the calculate-flux body
+    (the flux-scenarios body for scenarios, whose scenarios default to fba; an
+    optional `growth_threshold` for drd and dgd) plus an optional `processes`
+    limit and answers 202 with the job id.
+    """
+    try:
+        if not request.is_json:
+            return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
+
+        data = request.get_json()
+        session = g.model_session
+        modelData = data.get('new_rxn')
+        flux_type = data.get('flux_type')
+        objective_rxn = data.get("objective")
+        processes = data.get('processes')
+
+        if flux_type not in ('fva', 'srd', 'sgd', 'drd', 'dgd', 'loopless', 'sampling', 'scenarios'):
+            return jsonify({'status': 'error', 'message': 'flux_type must be one of fva, srd, sgd, drd, dgd, loopless, sampling, scenarios'}), 400
+        if processes is not None and (not isinstance(processes, int) or processes < 1):
+            return jsonify({'status': 'error', 'message': 'processes must be a positive integer'}), 400
+
+        db = session.database if session else check_model_database(modelData)[0]
+        if db not in ("BIGG", "KEGG"):
+            return jsonify({
+                    'status': 'error',
+                    'message': f'Metabolite should belong to only one database either KEGG or BiGG'
+                }), 400
+
+        is_currency_metabolite = get_currency_matcher(db)
+        try:
+            with phase("build"):
+                model = session.model if session else build_cobra_model(modelData, is_currency_metabolite)
+                model.objective = objective_rxn
+            if flux_type == 'scenarios':
+                options = {
+                    'scenarios': parse_scenarios(model, data.get('scenarios')),
+                    'reactions': data.get('reactions')
+                }
+            else:
+                options = parse_flux_options(data, flux_type)
+            job = submit_flux_job(model, flux_type, processes, **options)
+        except KeyError as ke:
+            return jsonify({
+                    'status': 'error',
+                    'message': f'Invalid metabolite or enzyme reference: {str(ke)}'
+                }), 400
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        return jsonify({'status': 'success', **job.describe()}), 202
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': 'Internal server error'
+        }), 500
+
+
+@app.route('/api/v1/flux-jobs/<job_id>', methods=['GET', 'DELETE'])
+def fluxJob(job_id):
+    """Job state and progress, with the result once done; DELETE cancels the job."""
+    job = get_flux_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'Unknown job: {job_id}'}), 404
+    if request.method == 'DELETE':
+        job.cancel()
+    response = {'status': 'success', **job.describe()}
+    if job.state == "done":
+        response['result'] = job.result[0]
+    return jsonify(response)
+
+
+@app.route('/api/v1/flux-jobs/<job_id>/result', methods=['GET'])
+def fluxJobResult(job_id):
+    """The finished job's result exactly as calculate-flux returns it, Arrow included."""
+    job = get_flux_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'Unknown job: {job_id}'}), 404
+    if job.state != "done":
+        return jsonify({'status': 'error', 'message': f'Job is {job.state}', **job.describe()}), 409
+    g.job_lp_stats = [job.lp_stats]
+    payload, frame, metadata = job.result
+    return columnar_response(payload, frame, **metadata)
+
+
+@app.route('/api/v1/flux-jobs/<job_id>/chunks', methods=['GET'])
+def fluxJobChunks(job_id):
+    """
+    Partial results of a streaming job (drd, dgd, sampling with output
+    "samples") in the order they finished, from `offset` on; poll again from
+    `next_offset` until the job is done.
+    """
+    job = get_flux_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'Unknown job: {job_id}'}), 404
+    if job.stream is None:
+        return jsonify({'status': 'error', 'message': f'{job.flux_type} jobs do not stream partial results'}), 409
+    offset = request.args.get('offset', 0, type=int)
+    if offset < 0:
+        return jsonify({'status': 'error', 'message': 'offset must be a non-negative integer'}), 400
+    with job.lock:
+        chunks = job.chunks[offset:]
+        response = {'status': 'success', **job.describe()}
+    return jsonify({**response, 'chunks': chunks, 'next_offset': offset + len(chunks)})
+
+
+@app.route('/api/v1/metrics', methods=['GET'])
+def serverMetrics():
+    """
+    Counters since the server started: requests, errors and phase time
+    histograms per endpoint, the time, iterations and statuses of every LP
+    solved, flux jobs by state, and the caches' sizes and hit rates.
+    """
+    with metrics_lock:
+        endpoints = {
+            endpoint: {
+                "requests": metrics["requests"],
+                "errors": metrics["errors"],
+                "phases": {name: histogram.as_dict() for name, histogram in metrics["phases"].items()}
+            }
+            for endpoint, metrics in endpoint_metrics.items()
+        }
+        lps = lp_totals.as_dict()
+    with flux_jobs_lock:
+        jobs = {}
+        for job in flux_jobs.values():
+            jobs[job.state] = jobs.get(job.state, 0) + 1
+    return jsonify({
+        'status': 'success',
+        'uptime': time.time() - metrics_started,
+        'endpoints': endpoints,
+        'lps': lps,
+        'jobs': jobs,
+        'solver_workers': solver_workers,
+        'caches': {
+            'uploads': upload_cache.stats(),
+            'model_sessions': model_sessions.stats(),
+            'results': result_cache.stats(),
+            'compressed_bodies': compressed_bodies.stats()
+        }
+    })
+
+
 @app.route('/api/v1/calculate-centrality', methods=['POST'])
+@uses_model_session
 def calculateCentrality():
     try:
         if not request.is_json:
             return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
 
         data = request.get_json()
+        session = g.model_session
         modelData = data.get('new_rxn')
         selectedCentralities = data.get('selectedCentralities')
-        path_key = list(modelData.keys())[0]
-        path_obj = modelData[path_key]
-
-        firstmet = list(path_obj["metabolites"].keys())[0]
-        
-
-        db = check_kegg_bigg(firstmet)
+        db = session.database if session else check_model_database(modelData)[0]
         if(db == "BIGG"):
             cur_metabolites, smat, df, df2 = get_data(db)
         elif(db == "KEGG"):
@@ -1211,66 +3916,10 @@ def calculateCentrality():
                     'message': f'Metabolite should belong to only one database either KEGG or BiGG'
                 }), 400
         
-        def is_currency_metabolite(met):
-            currency_keywords = [
-                "h", "k", "pi", "cl", "o2", "na1", "h2o", "co2", "atp", "adp",
-                "utp", "gtp", "gdp", "amp", "nad", "fad", "coa", "ppi", "nh4", "nh3",
-                "acp", "thf", "crn", "nadh", "fadh", "nadp", "nadph"
-                ]
-            currency_keywords_final = cur_metabolites + currency_keywords
-            return any(met.lower().startswith(cur.lower()) for cur in currency_keywords_final)
+        is_currency_metabolite = get_currency_matcher(db)
         
         try:
-            model = Model('new_model')
-            for path in modelData:
-                pathData = modelData[path]
-                metabolites = {}
-                for met_id, arr in pathData['metabolites'].items():
-                    name, formula, compt, crossref, weight = arr
-                    crossrefdict = {"chebi": crossref}
-                    metabolites[met_id] = Metabolite(id=met_id, name=name, compartment=met_id.split('_')[-1], formula=formula)
-                    metabolites[met_id].annotation = crossrefdict
-                all_edges = pathData['edges'] + pathData['currency_edges']
-                currency_mets = set()
-                for a, b in all_edges:
-                    for met in [a, b]:
-                        if is_currency_metabolite(met):
-                            currency_mets.add(met)
-
-                for met_id in currency_mets:
-                    if met_id not in metabolites:
-                        metabolites[met_id] = Metabolite(id=met_id, name=met_id, compartment=met_id.split('_')[-1])
-
-                reaction_edges = defaultdict(list)
-                for src, tgt in all_edges:
-                    if src in pathData['enzymes']:  # enzyme → metabolite (product)
-                        reaction_edges[src].append((None, tgt))
-                    elif tgt in pathData['enzymes']:  # metabolite (substrate) → enzyme
-                        reaction_edges[tgt].append((src, None))
-
-                for enzyme_id, edge_list in reaction_edges.items():
-                    reaction = Reaction(enzyme_id)
-                    enzyme_info = pathData['enzymes'].get(enzyme_id, [])
-                    reaction.name = enzyme_info[0] if len(enzyme_info) > 0 else enzyme_id
-                    reaction.lower_bound = enzyme_info[2] 
-                    reaction.upper_bound = enzyme_info[3] 
-                    rxn_annotation = pathData["enzyme_crossref"][enzyme_id]
-                    cobra_annotation = {key_map[k]: v for k, v in rxn_annotation.items() if k in key_map}
-                    reaction.annotation = cobra_annotation
-                    actual_stoichiometry = pathData["stoichiometry"][enzyme_id]
-                    model_stoichiometry = {}
-                    for src, tgt in edge_list:
-                        if src:
-                            model_stoichiometry[metabolites[src]] = actual_stoichiometry[src]
-                        if tgt:
-                            model_stoichiometry[metabolites[tgt]] = actual_stoichiometry[tgt]
-                            
-                    reaction.add_metabolites(model_stoichiometry)
-
-                    reaction.subsystem = enzyme_info[4]
-                    model.add_reactions([reaction])
-
-            cleaned_model = clean_cobra_model(model)
+            graph = session.graph() if session else ModelGraph.from_model_data(modelData, is_currency_metabolite)
 
         except KeyError as ke:
                 return jsonify({
@@ -1286,39 +3935,9 @@ def calculateCentrality():
                     }), 500
 
         try:
-            S = cobra.util.create_stoichiometric_matrix(cleaned_model)
-            S_df = pd.DataFrame(S, index=[m.id for m in cleaned_model.metabolites],
-                            columns=[r.id for r in cleaned_model.reactions])
-            metabolites = list(S_df.index)
-            filtered_metabolites = [
-                    m for m in metabolites
-                    if not is_currency_metabolite(m)
-                ]
-            filtered_smat = S_df.loc[filtered_metabolites]
-            edges_by_enzyme = {}
-            for reac in filtered_smat.columns:
-                enzyme_edges = []
-                for met in filtered_smat.index:
-                    if (db == "BIGG"):
-                        cleaned_metabolite = clean_met_name(met)
-                        coef = filtered_smat.loc[met, reac]
-                            
-                        if coef < 0:
-                            enzyme_edges.append((cleaned_metabolite, reac))
-                        elif coef > 0:
-                            enzyme_edges.append((reac, cleaned_metabolite))
-                    elif (db == "KEGG"):
-                        cleaned_metabolite = clean_met_name(met)
-                        coef = filtered_smat.loc[met, reac]
-                            
-                        if coef < 0:
-                            enzyme_edges.append((met, reac))
-                        elif coef > 0:
-                            enzyme_edges.append((reac, met))
-
-                if enzyme_edges:
-                    edges_by_enzyme[reac] = enzyme_edges
+            edges_by_enzyme = graph.edges_by_enzyme(is_currency_metabolite, clean=(db == "BIGG"))
 
+            reaction_records, _ = get_catalog_records(db)
             final = {}
             rmn = []
             for enzyme, edges in edges_by_enzyme.items():
@@ -1333,8 +3952,8 @@ def calculateCentrality():
                             reactants.append(first)
                         
                     rxn_str = ' + '.join(reactants) + ' <==> ' + ' + '.join(products)
-                    desc_row = df[df['Abbreviation'] == enzyme]
-                    description = desc_row['Description'].iloc[0] if not desc_row.empty else enzyme
+                    desc_row = reaction_records.get(enzyme)
+                    description = desc_row['Description'] if desc_row is not None else enzyme
                     final[enzyme] = {
                             'edges': edges,
                             'reaction': rxn_str, 
@@ -1402,18 +4021,10 @@ def calculateCentrality():
         }), 500
 
 
-@app.route('/api/v1/download-edge-lists', methods=['POST'])
-def downloadEdgeList():
+def edge_lists_response(session, modelData):
+    """Metabolite, reaction and reaction-metabolite networks of a session's model or of modelData."""
     try:
-        if not request.is_json:
-            return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
-
-        data = request.get_json()
-        modelData = data['modelData']
-        path_key = list(modelData.keys())[0]
-        path_obj = modelData[path_key]
-        firstmet = list(path_obj["metabolites"].keys())[0]
-        db = check_kegg_bigg(firstmet)
+        db = session.database if session else check_model_database(modelData)[0]
         if(db == "BIGG"):
             cur_metabolites, smat, df, df2 = get_data(db)
         elif(db == "KEGG"):
@@ -1424,72 +4035,11 @@ def downloadEdgeList():
                     'message': f'Metabolite should belong to only one database either KEGG or BiGG'
                 }), 400
         
-        def is_currency_metabolite(met):
-            currency_keywords = [
-                "h", "k", "pi", "cl", "o2", "na1", "h2o", "co2", "atp", "adp",
-                "utp", "gtp", "gdp", "amp", "nad", "fad", "coa", "ppi", "nh4","nh3",
-                "acp", "thf", "crn", "nadh", "fadh", "nadp", "nadph"
-                ]
-            currency_keywords_final = cur_metabolites + currency_keywords
-            return any(met.lower().startswith(cur.lower()) for cur in currency_keywords_final)
+        is_currency_metabolite = get_currency_matcher(db)
         
         try:
-            model = Model('new_model')
-            for path in modelData:
-                pathData = modelData[path]
-                metabolites = {}
-                for met_id, arr in pathData['metabolites'].items():
-                    name, formula, compt, crossref, weight = arr
-                    crossrefdict = {"chebi": crossref}
-                    metabolites[met_id] = Metabolite(id=met_id, name=name, compartment=met_id.split('_')[-1], formula=formula)
-                    metabolites[met_id].annotation = crossrefdict
-                all_edges = pathData['edges'] + pathData['currency_edges']
-                currency_mets = set()
-                for a, b in all_edges:
-                    for met in [a, b]:
-                        if is_currency_metabolite(met):
-                            currency_mets.add(met)
-
-                for met_id in currency_mets:
-                    if met_id not in metabolites:
-                        metabolites[met_id] = Metabolite(id=met_id, name=met_id, compartment=met_id.split('_')[-1])
-
-                reaction_edges = defaultdict(list)
-                for src, tgt in all_edges:
-                    if src in pathData['enzymes']:  # enzyme → metabolite (product)
-                        reaction_edges[src].append((None, tgt))
-                    elif tgt in pathData['enzymes']:  # metabolite (substrate) → enzyme
-                        reaction_edges[tgt].append((src, None))
-
-                for enzyme_id, edge_list in reaction_edges.items():
-                    reaction = Reaction(enzyme_id)
-                    enzyme_info = pathData['enzymes'].get(enzyme_id, [])
-                    
-
-                    reaction.name = enzyme_info[0] if len(enzyme_info) > 0 else enzyme_id
-
-                    reaction.lower_bound = enzyme_info[2] 
-                    reaction.upper_bound = enzyme_info[3] 
-                    rxn_annotation = pathData["enzyme_crossref"][enzyme_id]
-                    cobra_annotation = {key_map[k]: v for k, v in rxn_annotation.items() if k in key_map}
-                    reaction.annotation = cobra_annotation
-                    actual_stoichiometry = pathData["stoichiometry"][enzyme_id]
-                    model_stoichiometry = {}
-                    for src, tgt in edge_list:
-                        if src:
-                            model_stoichiometry[metabolites[src]] = actual_stoichiometry[src]
-                        if tgt:
-                            model_stoichiometry[metabolites[tgt]] = actual_stoichiometry[tgt]
-                            
-                    reaction.add_metabolites(model_stoichiometry)
-
-                    reaction.subsystem = enzyme_info[4]
-                    model.add_reactions([reaction])
-
-            cleaned_model = clean_cobra_model(model)
+            graph = session.graph() if session else ModelGraph.from_model_data(modelData, is_currency_metabolite)
 
-                
-            
         except KeyError as ke:
                 return jsonify({
                         'status': 'error',
@@ -1504,30 +4054,9 @@ def downloadEdgeList():
                     }), 500
 
         try:
-            S = cobra.util.create_stoichiometric_matrix(cleaned_model)
-            S_df = pd.DataFrame(S, index=[m.id for m in cleaned_model.metabolites],
-                            columns=[r.id for r in cleaned_model.reactions])
-            metabolites = list(S_df.index)
-            filtered_metabolites = [
-                    m for m in metabolites
-                    if not is_currency_metabolite(m)
-                ]
-            filtered_smat = S_df.loc[filtered_metabolites]
-            edges_by_enzyme = {}
-            for reac in filtered_smat.columns:
-                enzyme_edges = []
-                for met in filtered_smat.index:
-                    cleaned_metabolite = clean_met_name(met)
-                    coef = filtered_smat.loc[met, reac]
-                        
-                    if coef < 0:
-                        enzyme_edges.append((cleaned_metabolite, reac))
-                    elif coef > 0:
-                        enzyme_edges.append((reac, cleaned_metabolite))
-                    
-                if enzyme_edges:
-                    edges_by_enzyme[reac] = enzyme_edges
+            edges_by_enzyme = graph.edges_by_enzyme(is_currency_metabolite)
 
+            reaction_records, _ = get_catalog_records(db)
             final = {}
             rmn = []
             for enzyme, edges in edges_by_enzyme.items():
@@ -1542,8 +4071,8 @@ def downloadEdgeList():
                             reactants.append(first)
                         
                     rxn_str = ' + '.join(reactants) + ' <==> ' + ' + '.join(products)
-                    desc_row = df[df['Abbreviation'] == enzyme]
-                    description = desc_row['Description'].iloc[0] if not desc_row.empty else enzyme
+                    desc_row = reaction_records.get(enzyme)
+                    description = desc_row['Description'] if desc_row is not None else enzyme
                     final[enzyme] = {
                             'edges': edges,
                             'reaction': rxn_str, 
@@ -1639,6 +4168,42 @@ def downloadEdgeList():
             'message': 'Internal server error'
         }), 500
 
+
+@app.route('/api/v1/download-edge-lists', methods=['POST'])
+@uses_model_session
+def downloadEdgeList():
+    try:
+        if not request.is_json:
+            return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
+
+        data = request.get_json()
+        return edge_lists_response(g.model_session, data.get('modelData'))
+
+    except Exception as e:
+       
+        return jsonify({
+            'status': 'error',
+            'message': 'Internal server error'
+        }), 500
+
+
+@app.route('/api/v1/model-sessions/<session_id>/edge-lists', methods=['GET'])
+def sessionEdgeLists(session_id):
+    """
+    download-edge-lists for a model session. Tagged by the session id and
+    version, so while the session is unchanged a client that has the networks
+    gets a 304 without them being built.
+    """
+    session = model_sessions.get(session_id)
+    if session is None:
+        return jsonify({'status': 'error', 'message': f'Unknown model session: {session_id}'}), 404
+    with session.lock:
+        cached = tag_content(f"edge-lists\n{session.id}\n{session.version}")
+        if cached is not None:
+            return cached
+        g.mixed_databases = session.mixed
+        return edge_lists_response(session, None)
+
 def perform_gsea(ranks_series, gmt_dict):
     pre_res = gp.prerank(
                 rnk=ranks_series,
@@ -1650,6 +4215,7 @@ def perform_gsea(ranks_series, gmt_dict):
     )
     return pre_res
 @app.route("/api/v1/gene-set-enrichment-analysis", methods=["POST"])
+@uses_model_session
 def gsea():
     try:
         # data = request.get_json()
@@ -1660,18 +4226,15 @@ def gsea():
             return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
 
         data = request.get_json()
-        modelData = data['modelData']
+        session = g.model_session
+        modelData = data.get('modelData')
         ranksData = data['filedata']
         minsize = data["minsize"]
         maxsize = data["maxsize"]
         permutations = data["permutations"]
 
         ranks = pd.DataFrame(ranksData, columns=["Reaction", "Rank"])
-        path_key = list(modelData.keys())[0]
-        path_obj = modelData[path_key]
-
-        firstmet = list(path_obj["metabolites"].keys())[0]
-        db = check_kegg_bigg(firstmet)
+        db = session.database if session else check_model_database(modelData)[0]
         if(db == "BIGG"):
             cur_metabolites, smat, df, df2 = get_data(db)
         elif(db == "KEGG"):
@@ -1682,82 +4245,16 @@ def gsea():
                     'message': f'Metabolite should belong to only one database either KEGG or BiGG'
                 }), 400
         
-        def is_currency_metabolite(met):
-            currency_keywords = [
-                "h", "k", "pi", "cl", "o2", "na1", "h2o", "co2", "atp", "adp",
-                "utp", "gtp", "gdp", "amp", "nad", "fad", "coa", "ppi", "nh4","nh3",
-                "acp", "thf", "crn", "nadh", "fadh", "nadp", "nadph"
-                ]
-            currency_keywords_final = cur_metabolites + currency_keywords
-            return any(met.lower().startswith(cur.lower()) for cur in currency_keywords_final)
+        is_currency_metabolite = get_currency_matcher(db)
         
         try:
-            model = Model('new_model')
-            for path in modelData:
-                pathData = modelData[path]
-                metabolites = {}
-                for met_id, arr in pathData['metabolites'].items():
-                    name, formula, compt, crossref, weight = arr
-                    crossrefdict = {"chebi": crossref}
-                    metabolites[met_id] = Metabolite(id=met_id, name=name, compartment=met_id.split('_')[-1], formula=formula)
-                    metabolites[met_id].annotation = crossrefdict
-                all_edges = pathData['edges'] + pathData['currency_edges']
-                currency_mets = set()
-                for a, b in all_edges:
-                    for met in [a, b]:
-                        if is_currency_metabolite(met):
-                            currency_mets.add(met)
-
-                for met_id in currency_mets:
-                    if met_id not in metabolites:
-                        metabolites[met_id] = Metabolite(id=met_id, name=met_id, compartment=met_id.split('_')[-1])
-
-                reaction_edges = defaultdict(list)
-                gene_list = pathData.get("genes", {})
-                for src, tgt in all_edges:
-                    if src in pathData['enzymes']:  # enzyme → metabolite (product)
-                        reaction_edges[src].append((None, tgt))
-                    elif tgt in pathData['enzymes']:  # metabolite (substrate) → enzyme
-                        reaction_edges[tgt].append((src, None))
-
-                for enzyme_id, edge_list in reaction_edges.items():
-                    reaction = Reaction(enzyme_id)
-                    enzyme_info = pathData['enzymes'].get(enzyme_id, [])
-                    
-                    reaction.name = enzyme_info[0] if len(enzyme_info) > 0 else enzyme_id
-
-                    reaction.lower_bound = enzyme_info[2] 
-                    reaction.upper_bound = enzyme_info[3] 
-                    rxn_annotation = pathData["enzyme_crossref"][enzyme_id]
-                    cobra_annotation = {key_map[k]: v for k, v in rxn_annotation.items() if k in key_map}
-                    reaction.annotation = cobra_annotation
-                    actual_stoichiometry = pathData["stoichiometry"][enzyme_id]
-                    model_stoichiometry = {}
-                    for src, tgt in edge_list:
-                        if src:
-                            model_stoichiometry[metabolites[src]] = actual_stoichiometry[src]
-                        if tgt:
-                            model_stoichiometry[metabolites[tgt]] = actual_stoichiometry[tgt]
-                            
-                    reaction.add_metabolites(model_stoichiometry)
-
-                    reaction.subsystem = enzyme_info[4]
-                    gene = list({g.strip() for g in gene_list.get(enzyme_id, []) if g.strip()})
-                    if gene:
-                        rule = "(" + " or ".join(gene) + ")" if len(gene) > 1 else f'( {gene[0]} )'
-
-                        
-                        if reaction.gene_reaction_rule != rule:
-                            try:
-                                reaction.gene_reaction_rule = rule
-                            except Exception as e:
-                                return jsonify({
-                                    'status': 'error',
-                                    'message': 'Gene Rule Error'
-                                }), 500
-                                
+            model = session.model if session else build_cobra_model(modelData, is_currency_metabolite, strict_genes=True)
 
-                    model.add_reactions([reaction])
+        except GeneRuleError:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Gene Rule Error'
+                }), 500
 
         except KeyError as ke:
                 return jsonify({
@@ -1775,30 +4272,14 @@ def gsea():
        
 
         try:
-            S = cobra.util.create_stoichiometric_matrix(model)
-            S_df = pd.DataFrame(S, index=[m.id for m in model.metabolites],
-                            columns=[r.id for r in model.reactions])
-            metabolites = list(S_df.index)
-            filtered_metabolites = [
-                    m for m in metabolites
-                    if not is_currency_metabolite(m)
-                ]
-            filtered_smat = S_df.loc[filtered_metabolites]
-            edges_by_enzyme = {}
-            for reac in filtered_smat.columns:
-                enzyme_edges = []
-                for met in filtered_smat.index:
-                    cleaned_metabolite = clean_met_name(met)
-                    coef = filtered_smat.loc[met, reac]
-                        
-                    if coef < 0:
-                        enzyme_edges.append((cleaned_metabolite, reac))
-                    elif coef > 0:
-                        enzyme_edges.append((reac, cleaned_metabolite))
-                    
-                if enzyme_edges:
-                    edges_by_enzyme[reac] = enzyme_edges
+            if session is None:
+                graph = ModelGraph.from_stoichiometry(
+                    model_stoichiometry(model), [m.id for m in model.metabolites], [r.id for r in model.reactions])
+            else:
+                graph = session.graph()
+            edges_by_enzyme = graph.edges_by_enzyme(is_currency_metabolite)
 
+            reaction_records, _ = get_catalog_records(db)
             final = {}
             rmn = []
             for enzyme, edges in edges_by_enzyme.items():
@@ -1813,8 +4294,8 @@ def gsea():
                             reactants.append(first)
                         
                     rxn_str = ' + '.join(reactants) + ' <==> ' + ' + '.join(products)
-                    desc_row = df[df['Abbreviation'] == enzyme]
-                    description = desc_row['Description'].iloc[0] if not desc_row.empty else enzyme
+                    desc_row = reaction_records.get(enzyme)
+                    description = desc_row['Description'] if desc_row is not None else enzyme
                     final[enzyme] = {
                             'edges': edges,
                             'reaction': rxn_str, 
@@ -1969,6 +4450,7 @@ def gsea():
         }), 500
     
 @app.route("/api/v1/over-representation-analysis", methods=["POST"])
+@uses_model_session
 def ora():
     try:
         # data = request.get_json()
@@ -1979,16 +4461,11 @@ def ora():
             return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
 
         data = request.get_json()
-        modelData = data['modelData']
+        session = g.model_session
+        modelData = data.get('modelData')
         reactions = data['reactions']
 
-        path_key = list(modelData.keys())[0]
-        path_obj = modelData[path_key]
-
-        firstmet = list(path_obj["metabolites"].keys())[0]
-        
-
-        db = check_kegg_bigg(firstmet)
+        db = session.database if session else check_model_database(modelData)[0]
         if(db == "BIGG"):
             cur_metabolites, smat, df, df2 = get_data(db)
         elif(db == "KEGG"):
@@ -1999,80 +4476,10 @@ def ora():
                     'message': f'Metabolite should belong to only one database either KEGG or BiGG'
                 }), 400
         
-        def is_currency_metabolite(met):
-            currency_keywords = [
-                "h", "k", "pi", "cl", "o2", "na1", "h2o", "co2", "atp", "adp",
-                "utp", "gtp", "gdp", "amp", "nad", "fad", "coa", "ppi", "nh4","nh3",
-                "acp", "thf", "crn", "nadh", "fadh", "nadp", "nadph"
-                ]
-            currency_keywords_final = cur_metabolites + currency_keywords
-            return any(met.lower().startswith(cur.lower()) for cur in currency_keywords_final)
+        is_currency_metabolite = get_currency_matcher(db)
         
         try:
-            model = Model('new_model')
-            for path in modelData:
-                pathData = modelData[path]
-                metabolites = {}
-                for met_id, arr in pathData['metabolites'].items():
-                    name, formula, compt, crossref, weight = arr
-                    crossrefdict = {"chebi": crossref}
-                    metabolites[met_id] = Metabolite(id=met_id, name=name, compartment=met_id.split('_')[-1], formula=formula)
-                    metabolites[met_id].annotation = crossrefdict
-                all_edges = pathData['edges'] + pathData['currency_edges']
-                currency_mets = set()
-                for a, b in all_edges:
-                    for met in [a, b]:
-                        if is_currency_metabolite(met):
-                            currency_mets.add(met)
-
-                for met_id in currency_mets:
-                    if met_id not in metabolites:
-                        metabolites[met_id] = Metabolite(id=met_id, name=met_id, compartment=met_id.split('_')[-1])
-
-                reaction_edges = defaultdict(list)
-                gene_list = pathData.get("genes", {})
-                for src, tgt in all_edges:
-                    if src in pathData['enzymes']:  # enzyme → metabolite (product)
-                        reaction_edges[src].append((None, tgt))
-                    elif tgt in pathData['enzymes']:  # metabolite (substrate) → enzyme
-                        reaction_edges[tgt].append((src, None))
-
-                for enzyme_id, edge_list in reaction_edges.items():
-                    reaction = Reaction(enzyme_id)
-                    enzyme_info = pathData['enzymes'].get(enzyme_id, [])
-                    
-
-                    reaction.name = enzyme_info[0] if len(enzyme_info) > 0 else enzyme_id
-
-                    reaction.lower_bound = enzyme_info[2] 
-                    reaction.upper_bound = enzyme_info[3] 
-                    rxn_annotation = pathData["enzyme_crossref"][enzyme_id]
-                    cobra_annotation = {key_map[k]: v for k, v in rxn_annotation.items() if k in key_map}
-                    reaction.annotation = cobra_annotation
-                    actual_stoichiometry = pathData["stoichiometry"][enzyme_id]
-                    model_stoichiometry = {}
-                    for src, tgt in edge_list:
-                        if src:
-                            model_stoichiometry[metabolites[src]] = actual_stoichiometry[src]
-                        if tgt:
-                            model_stoichiometry[metabolites[tgt]] = actual_stoichiometry[tgt]
-                            
-                    reaction.add_metabolites(model_stoichiometry)
-
-                    reaction.subsystem = enzyme_info[4]
-                    gene = list({g.strip() for g in gene_list.get(enzyme_id, []) if g.strip()})
-                    if gene:
-                        rule = "(" + " or ".join(gene) + ")" if len(gene) > 1 else f'( {gene[0]} )'
-
-                        
-                        if reaction.gene_reaction_rule != rule:
-                            try:
-                                reaction.gene_reaction_rule = rule
-                            except Exception as e:
-                                continue
-                                
-
-                    model.add_reactions([reaction])
+            model = session.model if session else build_cobra_model(modelData, is_currency_metabolite)
 
             
 
@@ -2147,20 +4554,18 @@ def ora():
     
 
 @app.route('/api/v1/download-model-test', methods=['POST'])
+@uses_model_session
 def downloadModelTest():
     try:
         if not request.is_json:
                 return jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400
 
         data = request.get_json()
+        session = g.model_session
         modelData = data.get('new_rxn')
         file_type = data.get('file_type')
         objective = data.get('objective')
-        path_key = list(modelData.keys())[0]
-        path_obj = modelData[path_key]
-        firstmet = list(path_obj["metabolites"].keys())[0]
-        
-        db = check_kegg_bigg(firstmet)
+        db = session.database if session else check_model_database(modelData)[0]
         if(db == "BIGG"):
             cur_metabolites, smat, df, df2 = get_data(db)
         elif(db == "KEGG"):
@@ -2171,80 +4576,10 @@ def downloadModelTest():
                     'message': f'Metabolite should belong to only one database either KEGG or BiGG'
                 }), 400
 
-        def is_currency_metabolite(met):
-            currency_keywords = [
-                "h", "k", "pi", "cl", "o2", "na1", "h2o", "co2", "atp", "adp",
-                "utp", "gtp", "gdp", "amp", "nad", "fad", "coa", "ppi", "nh4", "nh3", 
-                "acp", "thf", "crn", "nadh", "fadh", "nadp", "nadph"
-                ]
-            currency_keywords_final = cur_metabolites + currency_keywords
-            return any(met.lower().startswith(cur.lower()) for cur in currency_keywords_final)
+        is_currency_metabolite = get_currency_matcher(db)
         
         try:
-            model = Model('new_model')
-            for path in modelData:
-                pathData = modelData[path]
-                metabolites = {}
-                for met_id, arr in pathData['metabolites'].items():
-                    name, formula, compt, crossref, weight = arr
-                    crossrefdict = {"chebi": crossref}
-                    metabolites[met_id] = Metabolite(id=met_id, name=name, compartment=met_id.split('_')[-1], formula=formula)
-                    metabolites[met_id].annotation = crossrefdict
-
-                all_edges = pathData['edges'] + pathData['currency_edges']
-                currency_mets = set()
-                for a, b in all_edges:
-                    for met in [a, b]:
-                        if is_currency_metabolite(met):
-                            currency_mets.add(met)
-
-                for met_id in currency_mets:
-                    if met_id not in metabolites:
-                        metabolites[met_id] = Metabolite(id=met_id, name=met_id, compartment=met_id.split('_')[-1])
-
-                reaction_edges = defaultdict(list)
-                for src, tgt in all_edges:
-                    if src in pathData['enzymes']:  # enzyme → metabolite (product)
-                        reaction_edges[src].append((None, tgt))
-                    elif tgt in pathData['enzymes']:  # metabolite (substrate) → enzyme
-                        reaction_edges[tgt].append((src, None))
-
-
-                gene_list = pathData.get("genes", {})
-
-                for enzyme_id, edge_list in reaction_edges.items():
-                    reaction = Reaction(enzyme_id)
-                    enzyme_info = pathData['enzymes'].get(enzyme_id, [])
-            
-                    reaction.name = enzyme_info[0] if len(enzyme_info) > 0 else enzyme_id
-                    reaction.lower_bound = enzyme_info[2] 
-                    reaction.upper_bound = enzyme_info[3] 
-                    rxn_annotation = pathData["enzyme_crossref"][enzyme_id]
-                    cobra_annotation = {key_map[k]: v for k, v in rxn_annotation.items() if k in key_map}
-                    reaction.annotation = cobra_annotation
-                    actual_stoichiometry = pathData["stoichiometry"][enzyme_id]
-                    model_stoichiometry = {}
-                    for src, tgt in edge_list:
-                        if src:
-                            model_stoichiometry[metabolites[src]] = actual_stoichiometry[src]
-                        if tgt:
-                            model_stoichiometry[metabolites[tgt]] = actual_stoichiometry[tgt]
-                            
-                    reaction.add_metabolites(model_stoichiometry)
-
-                    reaction.subsystem = enzyme_info[4]
-
-                    gene = list({g.strip() for g in gene_list.get(enzyme_id, []) if g.strip()})
-                    if gene:
-                        rule = "(" + " or ".join(gene) + ")" if len(gene) > 1 else f'( {gene[0]} )'
-
-                        if reaction.gene_reaction_rule != rule:
-                            try:
-                                reaction.gene_reaction_rule = rule
-                            except Exception as e:
-                                continue
-
-                    model.add_reactions([reaction])
+            model = session.model if session else build_cobra_model(modelData, is_currency_metabolite)
 
             # cleaned_model = clean_cobra_model(model)
             if (objective != 'No Reaction'):
@@ -2344,5 +4679,15 @@ def download_gsea():
         return jsonify({"status": "error", "message": str(e)}), 500
     
 
+# Warm the catalogs in the background as soon as the app is imported, so the
+# server can accept /healthz while /readyz reports load progress. Solver workers
+# re-import the main script as __mp_main__ when it is app.py; they skip this.
+# NAVIFLUX_WARM_SOLVERS=0 leaves the solver pool to start on the first analysis.
+if os.environ.get("NAVIFLUX_PRELOAD", "1") != "0" and __name__ != "__mp_main__":
+    threading.Thread(target=warm_catalogs, name="catalog-warmup", daemon=True).start()
+    if os.environ.get("NAVIFLUX_WARM_SOLVERS", "1") != "0":
+        threading.Thread(target=warm_solver_pool, name="solver-warmup", daemon=True).start()
+
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
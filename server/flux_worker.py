@@ -0,0 +1,335 @@
+"""
+Solver tasks run in the server's pool of worker processes.
+
+Kept apart from app.py so the workers import cobra only, not the Flask app and
+its catalogs. Each task receives the pickled model it works on; a worker keeps
+the last few models it unpickled, so the shards of one analysis pay for that
+once per worker.
+"""
+import pickle
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from cobra.exceptions import OptimizationError
+from cobra.flux_analysis import flux_variability_analysis, pfba, single_reaction_deletion, single_gene_deletion
+from cobra.flux_analysis.loopless import loopless_solution, loopless_fva_iter
+from cobra.util.solver import check_solver_status
+from optlang.symbolics import Zero
+from cobra.sampling import ACHRSampler, OptGPSampler
+
+model_limit = 4
+models = OrderedDict()  # model key -> cobra Model
+warmups = weakref.WeakKeyDictionary()  # cached cobra Model -> sampler warmup points
+
+# upper bounds, in seconds, of the LP time histogram buckets (plus one for slower)
+lp_buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Counts of observed durations per bucket, with their number and total."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.seconds = 0.0
+
+    def observe(self, seconds):
+        position = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        self.counts[position] += 1
+        self.count += 1
+        self.seconds += seconds
+
+    def merge(self, other):
+        """Adds a histogram, or its as_dict(), with the same buckets."""
+        other = other if isinstance(other, dict) else other.as_dict()
+        self.counts = [a + b for a, b in zip(self.counts, other["counts"])]
+        self.count += other["count"]
+        self.seconds += other["seconds"]
+
+    def as_dict(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "count": self.count, "seconds": self.seconds}
+
+
+class LPStats:
+    """Solve times, simplex iterations and solver statuses of a number of LPs."""
+
+    def __init__(self):
+        self.times = Histogram(lp_buckets)
+        self.iterations = 0
+        self.statuses = {}
+
+    def record(self, seconds, iterations, status):
+        self.times.observe(seconds)
+        self.iterations += iterations or 0
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def merge(self, other):
+        """Adds an LPStats, or its as_dict()."""
+        other = other if isinstance(other, dict) else other.as_dict()
+        self.times.merge(other["times"])
+        self.iterations += other["iterations"]
+        for status, count in other["statuses"].items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+    def as_dict(self):
+        return {"lps": self.times.count, "times": self.times.as_dict(), "iterations": self.iterations,
+                "statuses": dict(self.statuses)}
+
+
+def solver_iterations(solver):
+    """
+    Simplex iterations so far of an optlang problem. None when the interface
+    does not report them (only glpk, gurobi and cplex do); LPStats then counts
+    the LP without adding to its iterations.
+    """
+    interface = type(solver).__module__
+    try:
+        if interface.endswith("glpk_interface"):
+            import swiglpk
+            return swiglpk.glp_get_it_cnt(solver.problem)
+        if interface.endswith("gurobi_interface"):
+            return int(solver.problem.IterCount)
+        if interface.endswith("cplex_interface"):
+            return solver.problem.solution.progress.get_num_iterations()
+    except Exception:
+        return None
+    return None
+
+
+@contextmanager
+def timed_lps(model, stats):
+    """Records every LP solved on `model`'s own solver problem into `stats` while active."""
+    solver = model.solver
+    optimize = solver.optimize
+    shadowed = vars(solver).get("optimize")  # an enclosing timed_lps()
+
+    def timed_optimize():
+        before = solver_iterations(solver)
+        start = time.perf_counter()
+        status = optimize()
+        elapsed = time.perf_counter() - start
+        after = solver_iterations(solver)
+        stats.record(elapsed, after - before if before is not None and after is not None else None, status)
+        return status
+
+    solver.optimize = timed_optimize
+    try:
+        yield stats
+    finally:
+        if shadowed is None:
+            del solver.optimize
+        else:
+            solver.optimize = shadowed
+
+
+def load_model(model_key, model_bytes):
+    model = models.get(model_key)
+    if model is None:
+        model = models[model_key] = pickle.loads(model_bytes)
+        while len(models) > model_limit:
+            models.popitem(last=False)
+    else:
+        models.move_to_end(model_key)
+    return model
+
+
+def apply_bound_edits(model, edits):
+    """
+    Sets reaction bounds from [{"id", "lower_bound", "upper_bound"}] edits (either
+    bound may be left out); undoable inside a cobra model context.
+    """
+    for edit in edits:
+        reaction = model.reactions.get_by_id(edit['id'])
+        reaction.bounds = (
+            float(edit.get('lower_bound', reaction.lower_bound)),
+            float(edit.get('upper_bound', reaction.upper_bound))
+        )
+
+
+def fva(model, reactions, fraction_of_optimum=1.0, loopless=False):
+    return flux_variability_analysis(
+        model,
+        reaction_list=reactions,
+        fraction_of_optimum=fraction_of_optimum,
+        loopless=loopless,
+        processes=1
+    )
+
+
+def fva_directions(model, directions, fraction_of_optimum=1.0, loopless=False):
+    """
+    FVA over single (reaction id, "minimum" or "maximum") directions, set up as
+    cobra's flux_variability_analysis() does; returns (id, direction, value).
+    """
+    prob = model.problem
+    model.slim_optimize(error_value=None, message="There is no optimal solution for the chosen objective!")
+    if model.solver.objective.direction == "max":
+        old_objective = prob.Variable("fva_old_objective", lb=fraction_of_optimum * model.solver.objective.value)
+    else:
+        old_objective = prob.Variable("fva_old_objective", ub=fraction_of_optimum * model.solver.objective.value)
+    model.add_cons_vars([
+        old_objective,
+        prob.Constraint(
+            model.solver.objective.expression - old_objective, lb=0, ub=0, name="fva_old_objective_constraint"
+        )
+    ])
+    model.objective = Zero
+    values = []
+    for what in ("minimum", "maximum"):
+        model.solver.objective.direction = what[:3]
+        for reaction_id in [reaction_id for reaction_id, direction in directions if direction == what]:
+            reaction = model.reactions.get_by_id(reaction_id)
+            model.solver.objective.set_linear_coefficients({reaction.forward_variable: 1, reaction.reverse_variable: -1})
+            model.slim_optimize()
+            check_solver_status(model.solver.status)
+            value = loopless_fva_iter(model, reaction) if loopless else model.solver.objective.value
+            values.append((reaction_id, what, np.nan if value is None else value))
+            model.solver.objective.set_linear_coefficients({reaction.forward_variable: 0, reaction.reverse_variable: 0})
+    return values
+
+
+def reaction_deletion(model, reactions):
+    return single_reaction_deletion(model, reaction_list=reactions, processes=1)
+
+
+def gene_deletion(model, genes):
+    return single_gene_deletion(model, gene_list=genes, processes=1)
+
+
+def double_deletion(model, pairs, kind="reaction"):
+    """
+    Growth with both members of each (id, id) pair knocked out, in the shape
+    of cobra's double deletion results (ids, growth, status).
+    """
+    objects = model.reactions if kind == "reaction" else model.genes
+    growth = []
+    statuses = []
+    for first, second in pairs:
+        with model:
+            objects.get_by_id(first).knock_out()
+            objects.get_by_id(second).knock_out()
+            growth.append(model.slim_optimize(error_value=np.nan))
+            statuses.append(model.solver.status)
+    return pd.DataFrame({
+        "ids": [{first, second} for first, second in pairs],
+        "growth": growth,
+        "status": statuses
+    })
+
+
+class CachedWarmup:
+    """
+    Sampler that starts from warmup points computed by an earlier chain on the
+    same model, instead of solving 2 LPs per reaction again.
+    """
+
+    def __init__(self, model, warmup, **kwargs):
+        self.cached_warmup = warmup
+        super().__init__(model, **kwargs)
+
+    def generate_fva_warmup(self):
+        if self.cached_warmup is None:
+            super().generate_fva_warmup()
+        else:
+            self.warmup = self.cached_warmup
+            self.n_warmup = self.warmup.shape[0]
+
+
+class ACHRChain(CachedWarmup, ACHRSampler):
+    pass
+
+
+class OptGPChain(CachedWarmup, OptGPSampler):
+    pass
+
+
+def sample(model, draws, method="optgp", thinning=100, seed=None):
+    """
+    One sampling chain of len(draws) flux samples, as an array in model
+    reaction order. The warmup points are kept for the next chain on the model.
+    """
+    warmup = warmups.get(model)
+    source = model
+    if warmup is None:
+        # The cached model's solver starts from whatever basis earlier tasks
+        # left, and where FVA has alternative optima that changes the warmup
+        # points, and so the samples. A rebuilt solver problem starts the same
+        # on every worker.
+        source = model.copy()
+        source._solver = source.solver.interface.Model.clone(source.solver)
+    if method == "optgp":
+        sampler = OptGPChain(source, warmup, thinning=thinning, processes=1, seed=seed)
+    else:
+        sampler = ACHRChain(source, warmup, thinning=thinning, seed=seed)
+    warmups[model] = sampler.warmup
+    return sampler.sample(len(draws)).to_numpy()
+
+
+def loopless(model, items):
+    solution = loopless_solution(model)
+    return solution.objective_value, solution.fluxes
+
+
+scenario_solvers = {
+    "fba": lambda model: model.optimize(),
+    "pfba": pfba,
+    "loopless": loopless_solution
+}
+
+
+def scenarios(model, items):
+    """
+    Solves each scenario ({"bounds", "objective", "flux_type"}) in turn on the
+    same solver problem, undoing its edits before the next one, so every solve
+    starts from the previous basis. Returns (objective value, status, fluxes in
+    model reaction order) per scenario; NaN fluxes when it is not optimal.
+    """
+    rows = []
+    for scenario in items:
+        with model:
+            apply_bound_edits(model, scenario['bounds'])
+            if scenario.get('objective') is not None:
+                model.objective = scenario['objective']
+            try:
+                solution = scenario_solvers[scenario['flux_type']](model)
+            except OptimizationError:
+                solution = None
+            if solution is None or solution.status != "optimal":
+                status = solution.status if solution is not None else model.solver.status
+                rows.append((None, status, np.full(len(model.reactions), np.nan)))
+            else:
+                rows.append((solution.objective_value, solution.status, solution.fluxes.to_numpy()))
+    return rows
+
+
+tasks = {
+    "fva": fva,
+    "fva_directions": fva_directions,
+    "reaction_deletion": reaction_deletion,
+    "gene_deletion": gene_deletion,
+    "double_deletion": double_deletion,
+    "loopless": loopless,
+    "sample": sample,
+    "scenarios": scenarios
+}
+
+
+def run_task(model_key, model_bytes, task, items, options):
+    """
+    Runs one shard of an analysis; changes it makes to the cached model are
+    undone. Returns the result and the LPStats.as_dict() of its LPs.
+    """
+    model = load_model(model_key, model_bytes)
+    with model, timed_lps(model, LPStats()) as stats:
+        result = tasks[task](model, items, **options)
+    return result, stats.as_dict()
+
+
+def ping():
+    """No-op task, submitted once per worker to start the pool ahead of use."""
+    return True
@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_MODELS = os.path.join(SERVER_DIR, "..", "data", "TEST")
+
+# The app reads its catalogs from ./../data; caches and snapshots go to a
+# scratch directory, and nothing is warmed in the background.
+os.chdir(SERVER_DIR)
+sys.path.insert(0, SERVER_DIR)
+scratch = tempfile.mkdtemp(prefix="navifluX-tests-")
+os.environ.setdefault("NAVIFLUX_PRELOAD", "0")
+os.environ.setdefault("NAVIFLUX_SOLVER_WORKERS", "3")
+os.environ.setdefault("NAVIFLUX_WEB_WORKERS", "1")
+os.environ.setdefault("NAVIFLUX_SNAPSHOT_DIR", os.path.join(scratch, "snapshots"))
+os.environ.setdefault("NAVIFLUX_RESULT_CACHE_DIR", os.path.join(scratch, "result-cache"))
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    import app
+    return app
+
+
+@pytest.fixture(scope="session")
+def core_model():
+    """The e_coli_core test model, growing: the .mat file's own objective is ATPM."""
+    import cobra
+    model = cobra.io.load_matlab_model(os.path.join(TEST_MODELS, "e_coli_core.mat"))
+    model.objective = "BIOMASS_Ecoli_core_w_GAM"
+    return model
+
+
+@pytest.fixture(scope="session")
+def catalogs(app_module):
+    """Skips tests that need the full catalogs when their source files are not present."""
+    missing = [path for paths in app_module.catalog_sources.values() for path in paths if not os.path.exists(path)]
+    if missing:
+        pytest.skip(f"catalog files missing: {', '.join(missing)}")
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture(scope="session")
+def core_model_data(app_module, catalogs):
+    """The visualizer modelData of the e_coli_core test model, as the upload endpoint returns it."""
+    client = app_module.app.test_client()
+    with open(os.path.join(TEST_MODELS, "e_coli_core.mat"), "rb") as f:
+        response = client.post(
+            "/api/v1/cobra-model",
+            data={"file": (f, "e_coli_core.mat")},
+            content_type="multipart/form-data"
+        )
+    assert response.status_code == 200
+    return response.get_json()["result"]
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def uncached(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "get_cached_result", lambda key: None)
+
+
+@pytest.fixture(scope="module")
+def blocked(app_module, core_model):
+    """Reactions compression drops as blocked; the test model closes fructose and glutamine uptake, among others."""
+    compression = app_module.ModelCompression(core_model)
+    ids = [rid for rid, lead in zip(compression.original_ids, compression.lead) if lead < 0]
+    assert ids and compression.stats["compressed_reactions"] < compression.stats["reactions"]
+    return ids
+
+
+def both(app_module, model, flux_type, **options):
+    return (
+        app_module.run_flux_job(model, flux_type, 3, **options),
+        app_module.run_flux_job(model, flux_type, 3, compress=True, **options)
+    )
+
+
+def test_compressed_fva_matches(app_module, core_model, blocked, uncached):
+    (payload, frame, _), (compressed_payload, compressed_frame, metadata) = both(
+        app_module, core_model, "fva", fraction_of_optimum=0.9
+    )
+    assert metadata["compression"]["blocked_reactions"] == len(blocked)
+    assert list(compressed_frame["reaction"]) == [r.id for r in core_model.reactions]
+    for what in ("minimum", "maximum"):
+        assert compressed_frame[what].to_numpy() == pytest.approx(frame[what].to_numpy(), abs=1e-6)
+        assert compressed_payload[f"{what}_flux"] == pytest.approx(payload[f"{what}_flux"], abs=1e-6)
+        assert all(compressed_payload[f"{what}_flux"][rid] == 0 for rid in blocked)
+
+
+def test_compressed_subset_fva_keeps_blocked_reactions(app_module, core_model, blocked, uncached):
+    reactions = ["PGI", blocked[0], "SUCDi", blocked[-1]]
+    (_, frame, _), (_, compressed_frame, _) = both(app_module, core_model, "fva", reactions=reactions)
+    assert list(compressed_frame["reaction"]) == reactions
+    assert compressed_frame[["minimum", "maximum"]].to_numpy() == pytest.approx(
+        frame[["minimum", "maximum"]].to_numpy(), abs=1e-6
+    )
+    assert (compressed_frame.set_index("reaction").loc[[blocked[0], blocked[-1]]] == 0).all().all()
+
+
+@pytest.mark.parametrize("flux_type", ["srd", "sgd"])
+def test_compressed_deletions_match(app_module, core_model, blocked, uncached, flux_type):
+    (_, frame, metadata), (_, compressed_frame, _) = both(app_module, core_model, flux_type)
+    growth = {ids[0]: value for ids, value in zip(frame["ids"], frame["growth"])}
+    compressed_growth = {ids[0]: value for ids, value in zip(compressed_frame["ids"], compressed_frame["growth"])}
+    targets = [r.id for r in core_model.reactions] if flux_type == "srd" else [g.id for g in core_model.genes]
+    assert set(compressed_growth) == set(targets)
+    assert [compressed_growth[t] for t in targets] == pytest.approx([growth[t] for t in targets], abs=1e-6, nan_ok=True)
+    if flux_type == "srd":
+        # deleting a blocked reaction leaves the wild type growing
+        assert [compressed_growth[rid] for rid in blocked] == pytest.approx(
+            [metadata["objective_value"]] * len(blocked), abs=1e-6
+        )
+
+
+def test_compressed_samples_stay_in_the_flux_space(app_module, core_model, blocked, uncached):
+    _, samples, metadata = app_module.run_flux_job(
+        core_model, "sampling", 3, n=200, thinning=10, seed=7, output="samples", compress=True
+    )
+    # the chains run on a different model, so the draws differ; they must still be
+    # steady states of the original model within its bounds
+    assert list(samples.columns) == [r.id for r in core_model.reactions]
+    assert metadata["compression"]["blocked_reactions"] == len(blocked)
+    fluxes = samples.to_numpy()
+    S = app_module.model_stoichiometry(core_model)
+    assert np.abs(S @ fluxes.T).max() < 1e-6
+    lower = np.array([r.lower_bound for r in core_model.reactions])
+    upper = np.array([r.upper_bound for r in core_model.reactions])
+    assert (fluxes >= lower - 1e-6).all() and (fluxes <= upper + 1e-6).all()
+    assert (samples[blocked] == 0).all().all()
+
+    _, summary, _ = app_module.run_flux_job(core_model, "sampling", 3, n=200, thinning=10, seed=7, compress=True)
+    summary = summary.set_index("reaction")
+    assert list(summary.index) == [r.id for r in core_model.reactions]
+    assert summary["mean"].to_numpy() == pytest.approx(fluxes.mean(axis=0), abs=1e-9)
+    assert (summary.loc[blocked] == 0).all().all()
@@ -0,0 +1,49 @@
+OBJECTIVE = "BIOMASS_Ecoli_core_w_GAM"
+
+
+def metrics(client):
+    response = client.get("/api/v1/metrics")
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_fba_diagnostics_count_its_lps(app_module, client, core_model_data, monkeypatch):
+    monkeypatch.setattr(app_module, "get_cached_result", lambda key: None)
+    before = metrics(client)
+    response = client.post("/api/v1/calculate-flux", json={
+        "new_rxn": core_model_data, "flux_type": "fba", "objective": OBJECTIVE, "diagnostics": True
+    })
+    assert response.status_code == 200
+    diagnostics = response.get_json()["diagnostics"]
+    assert diagnostics["lps"] >= 1
+    assert diagnostics["statuses"]["optimal"] >= 1
+    assert diagnostics["iterations"] > 0
+    assert diagnostics["cached"] is False
+    assert {"parse", "build", "solve"} <= set(diagnostics["timings"])
+    assert "solve;dur=" in response.headers["Server-Timing"]
+
+    after = metrics(client)
+    assert after["lps"]["lps"] >= before["lps"]["lps"] + diagnostics["lps"]
+    assert after["lps"]["statuses"]["optimal"] > before["lps"]["statuses"].get("optimal", 0)
+    requests = after["endpoints"]["calculateFlux"]["requests"]
+    assert requests == before["endpoints"].get("calculateFlux", {"requests": 0})["requests"] + 1
+
+
+def test_diagnostics_are_opt_in(client, core_model_data):
+    response = client.post("/api/v1/calculate-flux", json={
+        "new_rxn": core_model_data, "flux_type": "fba", "objective": OBJECTIVE
+    })
+    assert response.status_code == 200
+    assert "diagnostics" not in response.get_json()
+
+
+def test_timed_lps_restores_the_solver(app_module, core_model):
+    from flux_worker import LPStats, timed_lps
+    model = core_model.copy()
+    with timed_lps(model, LPStats()) as outer:
+        with timed_lps(model, LPStats()) as inner:
+            model.slim_optimize()
+        model.slim_optimize()
+    assert inner.as_dict()["lps"] == 1
+    assert outer.as_dict()["lps"] == 2
+    assert "optimize" not in vars(model.solver)
@@ -0,0 +1,54 @@
+import math
+
+import numpy as np
+import pytest
+from cobra.flux_analysis import double_gene_deletion, double_reaction_deletion
+
+THRESHOLD = 0.01
+
+
+def pair_growth(frame):
+    """Growth by pair of distinct members (cobra's screens also knock out each member alone)."""
+    return {
+        frozenset(ids): 0.0 if np.isnan(growth) else growth
+        for ids, growth in zip(frame["ids"], frame["growth"]) if len(set(ids)) == 2
+    }
+
+
+@pytest.mark.parametrize("flux_type, screen, members", [
+    ("drd", double_reaction_deletion, lambda model: [r.id for r in model.reactions]),
+    ("dgd", double_gene_deletion, lambda model: [g.id for g in model.genes]),
+])
+def test_pruned_screen_matches_the_exhaustive_one(app_module, core_model, monkeypatch, flux_type, screen, members):
+    monkeypatch.setattr(app_module, "get_cached_result", lambda key: None)
+    payload, frame, _ = app_module.run_flux_job(core_model, flux_type, 3, growth_threshold=THRESHOLD)
+    expected = pair_growth(screen(core_model, processes=1))
+    solved = pair_growth(frame)
+    wild_type = payload["objective_value"]
+    essential = set(payload["essential"])
+    ids = members(core_model)
+
+    assert wild_type == pytest.approx(core_model.slim_optimize())
+    assert len(expected) == math.comb(len(ids), 2)
+    assert set(solved) <= set(expected)
+    pruned = len(expected) - len(solved)
+    assert pruned > 0
+    assert pruned == payload["pruned"]["essential_pairs"] + payload["pruned"]["zero_flux_pairs"]
+
+    for pair, growth in expected.items():
+        if pair in solved:
+            assert solved[pair] == pytest.approx(growth, abs=1e-6), pair
+        elif pair & essential:
+            # a lethal member makes the pair lethal
+            assert growth < THRESHOLD * wild_type, pair
+        else:
+            # neither member carries reference flux: the wild type survives
+            assert growth == pytest.approx(wild_type, abs=1e-6), pair
+
+
+def test_calculate_flux_points_double_deletions_to_jobs(client, core_model_data):
+    response = client.post("/api/v1/calculate-flux", json={
+        "new_rxn": core_model_data, "flux_type": "drd", "objective": "BIOMASS_Ecoli_core_w_GAM"
+    })
+    assert response.status_code == 400
+    assert "/api/v1/flux-jobs" in response.get_json()["message"]
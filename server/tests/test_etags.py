@@ -0,0 +1,85 @@
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import TEST_MODELS
+
+
+def refuse(*args, **kwargs):
+    raise AssertionError("the body was built for a 304")
+
+
+def revalidate(client, url, response, **headers):
+    return client.get(url, headers={"If-None-Match": response.headers["ETag"], **headers})
+
+
+@pytest.fixture
+def bigg_index(app_module, monkeypatch):
+    """The BiGG search index over the reaction table alone, which is all searches need."""
+    index = app_module.ReactionSearchIndex(pd.read_csv("./../data/BiGG/reactions.csv", index_col=0))
+    monkeypatch.setitem(app_module.search_indexes, "BIGG", index)
+    return index
+
+
+def test_get_search_matches_post_and_revalidates(client, bigg_index, monkeypatch):
+    url = "/api/v1/serve-query-table?db=BIGG&query=kinase&limit=20&offset=10"
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.get_json() == client.post("/api/v1/serve-query-table", json={
+        "database": "BIGG", "query": "kinase", "limit": 20, "offset": 10
+    }).get_json()
+    # another page is another resource
+    assert client.get(url.replace("offset=10", "offset=30")).headers["ETag"] != response.headers["ETag"]
+
+    monkeypatch.setattr(bigg_index, "search", refuse)
+    not_modified = revalidate(client, url, response)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == response.headers["ETag"]
+
+
+def test_get_search_tags_each_encoding(client, bigg_index):
+    url = "/api/v1/serve-query-table?db=BIGG&query=a"
+    gzipped = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"].strip('"').endswith("-gzip")
+    assert revalidate(client, url, gzipped, **{"Accept-Encoding": "gzip"}).status_code == 304
+    assert client.get(url, headers={"Accept": "application/msgpack"}).headers["ETag"] != gzipped.headers["ETag"]
+
+
+def test_uploaded_model_is_served_by_hash(app_module, client, catalogs, monkeypatch):
+    with open(os.path.join(TEST_MODELS, "e_coli_core.mat"), "rb") as f:
+        uploaded = client.post(
+            "/api/v1/cobra-model", data={"file": (f, "e_coli_core.mat")}, content_type="multipart/form-data"
+        )
+    url = uploaded.headers["Content-Location"]
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.get_json() == uploaded.get_json()
+
+    monkeypatch.setattr(app_module, "upload_response", refuse)
+    assert revalidate(client, url, response).status_code == 304
+    assert client.get("/api/v1/cobra-model/" + "0" * 64).status_code == 404
+
+
+def test_session_edge_lists_follow_the_version(app_module, client, core_model_data, monkeypatch):
+    session = client.post("/api/v1/model-sessions", json={"modelData": core_model_data}).get_json()
+    url = f"/api/v1/model-sessions/{session['session_id']}/edge-lists"
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.get_json() == client.post(
+        "/api/v1/download-edge-lists", json={"session_id": session["session_id"]}
+    ).get_json()
+
+    with monkeypatch.context() as patched:
+        patched.setattr(app_module, "edge_lists_response", refuse)
+        assert revalidate(client, url, response).status_code == 304
+
+    client.patch(f"/api/v1/model-sessions/{session['session_id']}", json={
+        "operations": [{"op": "remove_reaction", "id": "PGI"}], "version": session["version"]
+    })
+    changed = revalidate(client, url, response)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != response.headers["ETag"]
+    assert changed.get_json() != response.get_json()
+    assert client.get("/api/v1/model-sessions/unknown/edge-lists").status_code == 404
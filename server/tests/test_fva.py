@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+from cobra.flux_analysis import flux_variability_analysis
+
+REACTIONS = [
+    "PGI", "PFK", "FBA", "PYK", "ATPM", "EX_glc__D_e", "EX_o2_e", "CS", "SUCDi", "FRD7",
+    "ME1", "PPCK", "ACALD", "FORt2", "NADH16", "PFL", "EX_ac_e", "GLNabc", "THD2", "PGI"
+]
+
+
+@pytest.fixture(scope="module")
+def model(core_model):
+    # cobra's loopless FVA fails on e_coli_core with its ATP maintenance demand
+    model = core_model.copy()
+    model.reactions.get_by_id("ATPM").lower_bound = 0
+    return model
+
+
+@pytest.mark.parametrize("skip_fixed", [False, True])
+@pytest.mark.parametrize("loopless", [False, True])
+@pytest.mark.parametrize("fraction", [1.0, 0.9])
+def test_subset_fva_matches_cobra(app_module, model, monkeypatch, skip_fixed, loopless, fraction):
+    monkeypatch.setattr(app_module, "get_cached_result", lambda key: None)
+    payload, frame, metadata = app_module.run_flux_job(
+        model, "fva", 3,
+        reactions=REACTIONS, fraction_of_optimum=fraction, loopless=loopless, skip_fixed=skip_fixed
+    )
+    expected = flux_variability_analysis(
+        model, reaction_list=list(dict.fromkeys(REACTIONS)), fraction_of_optimum=fraction, loopless=loopless, processes=1
+    )
+    assert list(frame["reaction"]) == list(dict.fromkeys(REACTIONS))
+    result = frame.set_index("reaction")
+    if loopless:
+        # cobra's loopless FVA removes loops from the warm-started solution, so a reaction in a
+        # loop (SUCDi at 0.9) can come out differently depending on what was solved before it;
+        # accept cobra's answer for the reaction run alone as well as in the full list
+        alone = pd.concat([
+            flux_variability_analysis(
+                model, reaction_list=[reaction_id], fraction_of_optimum=fraction, loopless=True, processes=1
+            )
+            for reaction_id in expected.index
+        ])
+        differs = ((result[["minimum", "maximum"]] - expected).abs() > 1e-6).any(axis=1)
+        expected.loc[differs] = alone.loc[differs]
+    for what in ("minimum", "maximum"):
+        assert result[what].to_numpy() == pytest.approx(expected[what].to_numpy(), abs=1e-6)
+        assert payload[f"{what}_flux"] == pytest.approx(expected[what].to_dict(), abs=1e-6)
+    if skip_fixed:
+        # the reference solution settles the directions at a bound; they are never solved
+        assert metadata["settled_by_reference"] > 0
+    else:
+        assert "settled_by_reference" not in metadata
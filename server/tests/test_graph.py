@@ -0,0 +1,64 @@
+import cobra
+import networkx as nx
+import pandas as pd
+import pytest
+
+CENTRALITIES = {
+    "degree": nx.degree_centrality,
+    "betweenness": nx.betweenness_centrality,
+    "eigenvector": lambda G: nx.eigenvector_centrality(G, max_iter=1000, tol=1e-06),
+    "pagerank": nx.pagerank
+}
+
+
+@pytest.fixture(scope="module")
+def currency(app_module):
+    """The per-request currency test the graph endpoints used before they shared a compiled matcher."""
+    cur_metabolites = app_module.get_data("BIGG")[0]
+    keywords = list(cur_metabolites) + list(app_module.currency_keywords)
+    return lambda met: any(met.lower().startswith(cur.lower()) for cur in keywords)
+
+
+def reference_edges(app_module, model_data, currency, clean):
+    """Edges by reaction from the cleaned cobra model's dense stoichiometric matrix."""
+    model = app_module.clean_cobra_model(app_module.build_cobra_model(model_data, currency, genes=False))
+    S = pd.DataFrame(
+        cobra.util.create_stoichiometric_matrix(model),
+        index=[m.id for m in model.metabolites], columns=[r.id for r in model.reactions]
+    )
+    S = S.loc[[met for met in S.index if not currency(met)]]
+    edges_by_enzyme = {}
+    for reac in S.columns:
+        edges = []
+        for met in S.index:
+            label = app_module.clean_met_name(met) if clean else met
+            if S.loc[met, reac] < 0:
+                edges.append((label, reac))
+            elif S.loc[met, reac] > 0:
+                edges.append((reac, label))
+        if edges:
+            edges_by_enzyme[reac] = edges
+    return edges_by_enzyme
+
+
+@pytest.mark.parametrize("clean", [True, False])
+def test_compiled_edges_match_the_cobra_model(app_module, core_model_data, currency, clean):
+    matcher = app_module.get_currency_matcher("BIGG")
+    graph = app_module.ModelGraph.from_model_data(core_model_data, matcher)
+    assert graph.edges_by_enzyme(matcher, clean=clean) == reference_edges(app_module, core_model_data, currency, clean)
+
+
+@pytest.mark.parametrize("centrality", list(CENTRALITIES))
+def test_centrality_matches_networkx(app_module, client, core_model_data, currency, centrality):
+    G = nx.DiGraph()
+    for edges in reference_edges(app_module, core_model_data, currency, clean=True).values():
+        G.add_edges_from(edges)
+    expected = CENTRALITIES[centrality](G)
+
+    response = client.post("/api/v1/calculate-centrality", json={
+        "new_rxn": core_model_data, "selectedCentralities": centrality
+    })
+    assert response.status_code == 200
+    result = {row["node"]: row[centrality] for row in response.get_json()["result"]}
+    assert result.keys() == expected.keys()
+    assert result == pytest.approx(expected, abs=1e-9)
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+
+@pytest.fixture
+def uncached(app_module, monkeypatch):
+    """Jobs run on the solver pool instead of finishing at once from the result cache."""
+    monkeypatch.setattr(app_module, "get_cached_result", lambda key: None)
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_cancelled_job_stops(app_module, client, core_model, uncached):
+    job = app_module.submit_flux_job(core_model, "srd", 1)
+    assert job.state == "running"
+
+    response = client.delete(f"/api/v1/flux-jobs/{job.id}")
+    assert response.status_code == 200
+    cancelled = response.get_json()
+    assert cancelled["state"] == "cancelled"
+    assert cancelled["progress"]["done"] < cancelled["progress"]["total"]
+
+    # the task that was running when the job was cancelled finishes and is discarded
+    time.sleep(2)
+    later = client.get(f"/api/v1/flux-jobs/{job.id}").get_json()
+    assert later["state"] == "cancelled"
+    assert later["progress"] == cancelled["progress"]
+    assert client.get(f"/api/v1/flux-jobs/{job.id}/result").status_code == 409
+
+
+def test_finished_jobs_expire(app_module, client, core_model, uncached):
+    job = app_module.submit_flux_job(core_model, "srd", 1)
+    client.delete(f"/api/v1/flux-jobs/{job.id}")
+    assert client.get(f"/api/v1/flux-jobs/{job.id}").status_code == 200
+
+    job.finished = time.time() - app_module.job_ttl_seconds - 1
+    for path in ("", "/result"):
+        assert client.get(f"/api/v1/flux-jobs/{job.id}{path}").status_code == 404
+    assert job.id not in app_module.flux_jobs
+
+
+def test_cancelled_screen_stops_streaming(app_module, client, core_model, uncached):
+    job = app_module.submit_flux_job(core_model, "dgd", 1, growth_threshold=0.01)
+    wait_for(lambda: job.chunks)
+
+    assert client.delete(f"/api/v1/flux-jobs/{job.id}").get_json()["state"] == "cancelled"
+    streamed = client.get(f"/api/v1/flux-jobs/{job.id}/chunks").get_json()
+    assert streamed["state"] == "cancelled"
+    assert streamed["chunks"]
+
+    time.sleep(2)
+    later = client.get(f"/api/v1/flux-jobs/{job.id}/chunks", query_string={"offset": streamed["next_offset"]})
+    assert later.get_json()["chunks"] == []
+    assert later.get_json()["next_offset"] == streamed["next_offset"]
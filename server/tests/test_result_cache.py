@@ -0,0 +1,88 @@
+import pytest
+
+
+def key(app_module, model, flux_type="fva", processes=2, **options):
+    return app_module.result_cache_key(
+        model, flux_type, app_module.result_cache_parameters(flux_type, processes, options)
+    )
+
+
+def test_equal_models_share_a_key(app_module, core_model):
+    assert key(app_module, core_model) == key(app_module, core_model.copy())
+
+
+def test_gpr_operand_order_does_not_matter(app_module, core_model):
+    model = core_model.copy()
+    reaction = model.reactions.get_by_id("PFK")
+    genes = sorted(gene.id for gene in reaction.genes)
+    reaction.gene_reaction_rule = " or ".join(genes)
+    forward = key(app_module, model)
+    reaction.gene_reaction_rule = " or ".join(reversed(genes))
+    assert key(app_module, model) == forward
+
+
+@pytest.mark.parametrize("change", [
+    lambda model: setattr(model.reactions.get_by_id("ATPM"), "lower_bound", 0),
+    lambda model: setattr(model, "objective", "PYK"),
+    lambda model: setattr(model.objective, "direction", "min"),
+    lambda model: model.remove_reactions([model.reactions.get_by_id("PGI")]),
+    lambda model: setattr(model.reactions.get_by_id("PFK"), "gene_reaction_rule", "b3916"),
+])
+def test_model_changes_change_the_key(app_module, core_model, change):
+    model = core_model.copy()
+    before = key(app_module, model)
+    change(model)
+    assert key(app_module, model) != before
+
+
+def test_options_and_analysis_are_part_of_the_key(app_module, core_model):
+    assert key(app_module, core_model, "fva") != key(app_module, core_model, "srd")
+    assert key(app_module, core_model, fraction_of_optimum=0.9) != key(app_module, core_model, fraction_of_optimum=1.0)
+    # option order is not
+    assert (key(app_module, core_model, "sampling", n=10, seed=1)
+            == key(app_module, core_model, "sampling", seed=1, n=10))
+
+
+def test_pool_size_matters_only_where_it_changes_the_result(app_module, core_model, monkeypatch):
+    assert key(app_module, core_model, "fva", processes=1) == key(app_module, core_model, "fva", processes=3)
+    assert (key(app_module, core_model, "sampling", processes=1, seed=1)
+            == key(app_module, core_model, "sampling", processes=3, seed=1))
+    assert (key(app_module, core_model, "scenarios", processes=1, scenarios=[])
+            != key(app_module, core_model, "scenarios", processes=3, scenarios=[]))
+
+    seeded = key(app_module, core_model, "sampling", seed=1)
+    monkeypatch.setattr(app_module, "sample_chain_size", 100)
+    assert key(app_module, core_model, "sampling", seed=1) != seeded
+
+
+def test_results_round_trip_through_the_cache(app_module, core_model, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "result_cache_dir", str(tmp_path))
+    model = core_model.copy()
+    model.reactions.get_by_id("ATPM").lower_bound = 1.5
+    first = app_module.run_flux_job(model, "fva", 2)
+    cache_key = key(app_module, model, "fva")
+    assert (tmp_path / f"{cache_key}.arrow").exists()
+
+    app_module.result_cache.pop(cache_key)
+    assert app_module.get_cached_result(cache_key) is not None  # read back from disk
+    again = app_module.run_flux_job(model, "fva", 1)
+    assert again[0] == first[0]
+    assert again[1].equals(first[1])
+
+
+@pytest.mark.parametrize("flux_type, options", [
+    ("fva", {"reactions": ["PGI", "PFK"]}),
+    ("srd", {}),
+    ("dgd", {"growth_threshold": 0.01}),
+    ("sampling", {"n": 20, "thinning": 10, "seed": 1, "output": "samples"}),
+    ("scenarios", {"scenarios": [{"id": "off", "bounds": [{"id": "ATPM", "lower_bound": 500}]}]}),
+])
+def test_cached_results_answer_like_fresh_ones(app_module, core_model, monkeypatch, flux_type, options):
+    monkeypatch.setattr(app_module, "get_cached_result", lambda key: None)
+    if flux_type == "scenarios":
+        options = {"scenarios": app_module.parse_scenarios(core_model, options["scenarios"])}
+    result = app_module.run_flux_job(core_model, flux_type, 2, **options)
+    payload, frame, metadata = app_module.decode_result(app_module.encode_result(result))
+    with app_module.app.test_request_context():
+        assert app_module.app.json.dumps(payload) == app_module.app.json.dumps(result[0])
+        assert app_module.arrow_response(frame, **metadata).data == app_module.arrow_response(result[1], **result[2]).data
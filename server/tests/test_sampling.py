@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from cobra.flux_analysis import flux_variability_analysis
+
+
+@pytest.fixture
+def uncached(app_module, monkeypatch):
+    """Samples are computed every time instead of coming from the result cache."""
+    monkeypatch.setattr(app_module, "get_cached_result", lambda key: None)
+
+
+def draw(app_module, model, processes, **options):
+    _, frame, metadata = app_module.run_flux_job(
+        model, "sampling", processes, n=600, thinning=10, seed=7, output="samples", **options
+    )
+    return frame, metadata
+
+
+def test_seeded_samples_do_not_depend_on_the_pool_size(app_module, core_model, uncached):
+    assert app_module.solver_workers >= 3
+    one, _ = draw(app_module, core_model, 1)
+    three, _ = draw(app_module, core_model, 3)
+    assert one.shape == (600, len(core_model.reactions))
+    np.testing.assert_array_equal(one.to_numpy(), three.to_numpy())
+
+
+def test_seeded_samples_repeat(app_module, core_model, uncached):
+    first, _ = draw(app_module, core_model, 2, method="achr")
+    second, _ = draw(app_module, core_model, 2, method="achr")
+    np.testing.assert_array_equal(first.to_numpy(), second.to_numpy())
+
+
+def test_samples_keep_double_precision(app_module, core_model, uncached):
+    samples, _ = draw(app_module, core_model, 2)
+    assert set(samples.dtypes) == {np.dtype(np.float64)}
+    fva = flux_variability_analysis(core_model, fraction_of_optimum=0)
+    tolerance = 1e-6
+    assert (samples.min() >= fva["minimum"] - tolerance).all()
+    assert (samples.max() <= fva["maximum"] + tolerance).all()
+
+
+def test_different_seeds_draw_different_samples(app_module, core_model, uncached):
+    _, frame, _ = app_module.run_flux_job(core_model, "sampling", 2, n=100, thinning=10, seed=8, output="samples")
+    seven, _ = draw(app_module, core_model, 2)
+    assert not np.array_equal(frame.to_numpy(), seven.to_numpy()[:100])
+
+
+def test_samples_do_not_depend_on_earlier_solves(core_model):
+    """A worker's cached model keeps the solver basis of the tasks it ran before."""
+    import flux_worker
+    fresh, used = core_model.copy(), core_model.copy()
+    with used:
+        used.objective = "EX_ac_e"
+        used.optimize()
+    used.optimize()
+    np.testing.assert_array_equal(
+        flux_worker.sample(fresh, range(50), "achr", thinning=10, seed=3),
+        flux_worker.sample(used, range(50), "achr", thinning=10, seed=3)
+    )
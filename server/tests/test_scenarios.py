@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+SCENARIOS = [
+    {"id": "base"},
+    {"id": "anaerobic", "bounds": [{"id": "EX_o2_e", "lower_bound": 0}]},
+    {"id": "infeasible", "bounds": [{"id": "ATPM", "lower_bound": 500}]},
+    {"id": "base again"},
+    {"id": "infeasible pfba", "bounds": [{"id": "ATPM", "lower_bound": 500}], "flux_type": "pfba"},
+    {"id": "glucose limited", "bounds": [{"id": "EX_glc__D_e", "lower_bound": -5}], "flux_type": "pfba"},
+    {"id": "acetate", "objective": "EX_ac_e"},
+    {"id": "base last"}
+]
+
+
+def expected(model, scenario):
+    with model:
+        for edit in scenario.get("bounds", []):
+            model.reactions.get_by_id(edit["id"]).lower_bound = edit["lower_bound"]
+        if scenario.get("objective"):
+            model.objective = scenario["objective"]
+        solution = model.optimize()
+        return solution.objective_value if solution.status == "optimal" else None
+
+
+@pytest.mark.parametrize("processes", [1, 3])
+def test_scenarios_are_solved_independently(app_module, core_model, monkeypatch, processes):
+    monkeypatch.setattr(app_module, "get_cached_result", lambda key: None)
+    model = core_model.copy()
+    scenarios = app_module.parse_scenarios(model, SCENARIOS)
+    payload, frame, _ = app_module.run_flux_job(model, "scenarios", processes, scenarios=scenarios)
+
+    assert payload["scenarios"] == [scenario["id"] for scenario in SCENARIOS]
+    assert list(frame["scenario"]) == payload["scenarios"]
+    for row, scenario in enumerate(SCENARIOS):
+        value = expected(core_model, scenario)
+        if value is None:
+            # infeasible: no objective value, null fluxes in JSON and NaN in Arrow
+            assert payload["objective_value"][row] is None
+            assert payload["solver_status"][row] == "infeasible"
+            assert all(flux is None for flux in payload["fluxes"][row])
+            assert np.isnan(frame.iloc[row, 3:].to_numpy(dtype=float)).all()
+        else:
+            # pfba reports the total flux as its objective value; compare the objective reaction
+            objective = scenario.get("objective", "BIOMASS_Ecoli_core_w_GAM")
+            flux = payload["fluxes"][row][payload["reactions"].index(objective)]
+            assert flux == pytest.approx(value, abs=1e-6), scenario["id"]
+            assert payload["solver_status"][row] == "optimal"
+            assert not np.isnan(frame.iloc[row, 3:].to_numpy(dtype=float)).any()
+
+    # the edits of one scenario never leak into the next, or into the model
+    base = payload["fluxes"][0]
+    for name in ("base again", "base last"):
+        assert payload["fluxes"][payload["scenarios"].index(name)] == pytest.approx(base, abs=1e-6)
+    assert model.reactions.get_by_id("ATPM").lower_bound == core_model.reactions.get_by_id("ATPM").lower_bound
+    assert model.slim_optimize() == pytest.approx(core_model.slim_optimize())
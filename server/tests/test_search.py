@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope="module")
+def indexes(app_module):
+    """Search indexes over the reaction tables alone, which is all they need."""
+    return {
+        "BIGG": app_module.ReactionSearchIndex(pd.read_csv("./../data/BiGG/reactions.csv", index_col=0)),
+        "KEGG": app_module.ReactionSearchIndex(pd.read_csv("./../data/KEGG/kegg_reactions.tsv", sep="\t"))
+    }
+
+
+def linear_ranking(index, query):
+    """The search order by scanning every catalog row, as the index should rank it."""
+    q = query.lower()
+    weights = index.weights
+    ranked = []
+    for row, (abbr, rxn, desc) in enumerate(zip(index.abbr_text, index.rxn_text, index.desc_text)):
+        score = (
+            weights["abbr"] * (q in abbr)
+            + weights["abbr_prefix"] * abbr.startswith(q)
+            + weights["abbr_exact"] * (abbr == q)
+            + weights["desc"] * (q in desc)
+            + weights["desc_word"] * (desc.startswith(q) or " " + q in desc)
+            + weights["rxn"] * (q in rxn)
+        )
+        if score:
+            ranked.append((-score, len(abbr), row))
+    return [row for _, _, row in sorted(ranked)]
+
+
+@pytest.mark.parametrize("database, query", [
+    ("KEGG", "R0001"),
+    ("KEGG", "kinase"),
+    ("KEGG", "C00022"),
+    ("KEGG", "r"),
+    ("BIGG", "pfk"),
+    ("BIGG", "pyruvate"),
+    ("BIGG", "phosphofructokinase"),
+    ("BIGG", "atp_c"),
+    ("BIGG", "glucose 6"),
+    ("BIGG", "Kinase"),
+])
+def test_search_ranks_like_a_linear_scan(indexes, database, query):
+    index = indexes[database]
+    assert index.search(query) == linear_ranking(index, query)
+
+
+def test_search_matches_the_substring_scan(indexes):
+    df = pd.read_csv("./../data/BiGG/reactions.csv", index_col=0)
+    q = "kinase"
+    expected = set(df.loc[
+        df["Abbreviation"].astype(str).str.lower().str.contains(q, regex=False, na=False)
+        | df["Reaction"].astype(str).str.lower().str.contains(q, regex=False, na=False)
+        | df["Description"].astype(str).str.lower().str.contains(q, regex=False, na=False),
+        "Abbreviation"
+    ])
+    index = indexes["BIGG"]
+    assert {index.abbreviations[row] for row in index.search(q)} == expected
+
+
+def test_long_queries_rank_prefix_and_word_start_hits_first(indexes):
+    index = indexes["KEGG"]
+    rows = index.search("R0001")
+    prefixed = [row for row in rows if index.abbr_text[row].startswith("r0001")]
+    assert prefixed and rows[:len(prefixed)] == prefixed
+
+    rows = index.search("kinase")
+    word_start = [row for row in rows if index.desc_text[row].startswith("kinase") or " kinase" in index.desc_text[row]]
+    assert word_start
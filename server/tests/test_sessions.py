@@ -0,0 +1,153 @@
+import pytest
+
+OBJECTIVE = "BIOMASS_Ecoli_core_w_GAM"
+INFEASIBLE = [{"id": "ATPM", "lower_bound": 500, "upper_bound": 1000}]
+
+
+@pytest.fixture
+def session(client, core_model_data):
+    response = client.post("/api/v1/model-sessions", json={"modelData": core_model_data})
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def optimize(client, session, **body):
+    return client.post(f"/api/v1/model-sessions/{session['session_id']}/optimize", json={"objective": OBJECTIVE, **body})
+
+
+def patch(client, session, operations, version):
+    return client.patch(
+        f"/api/v1/model-sessions/{session['session_id']}",
+        json={"operations": operations, "version": version}
+    )
+
+
+def test_optimize_reports_an_optimal_solve(client, session):
+    response = optimize(client, session)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["solver_status"] == "optimal"
+    assert body["objective_value"] == pytest.approx(0.8739, abs=1e-3)
+
+
+def test_infeasible_fba_returns_null_fluxes(client, session):
+    response = optimize(client, session, bounds=INFEASIBLE)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["solver_status"] == "infeasible"
+    assert body["objective_value"] is None
+    assert set(body["fluxes"].values()) == {None}
+
+
+def test_infeasible_pfba_is_a_json_error(client, session):
+    response = optimize(client, session, bounds=INFEASIBLE, flux_type="pfba")
+    assert response.status_code == 422
+    body = response.get_json()
+    assert body["status"] == "error"
+    assert body["solver_status"] == "infeasible"
+
+
+def test_optimize_edits_are_undone(client, session):
+    optimize(client, session, bounds=INFEASIBLE, flux_type="pfba")
+    response = optimize(client, session)
+    assert response.get_json()["solver_status"] == "optimal"
+    assert response.get_json()["version"] == session["version"]
+
+
+@pytest.mark.parametrize("body, status", [
+    ({"bounds": [{"id": "NOT_A_REACTION", "lower_bound": 0}]}, 400),
+    ({"bounds": "ATPM"}, 400),
+    ({"flux_type": "fva"}, 400),
+    ({"version": 99}, 409),
+])
+def test_optimize_rejects_bad_requests(client, session, body, status):
+    response = optimize(client, session, **body)
+    assert response.status_code == status
+    assert response.get_json()["status"] == "error"
+
+
+def test_optimize_unknown_session(client):
+    response = client.post("/api/v1/model-sessions/unknown/optimize", json={"objective": OBJECTIVE})
+    assert response.status_code == 404
+
+
+def test_patch_applies_against_the_current_version(client, session):
+    response = patch(client, session, [{"op": "update_reaction", "id": "ATPM", "lower_bound": 0}], session["version"])
+    assert response.status_code == 200
+    assert response.get_json()["version"] == session["version"] + 1
+
+    stale = patch(client, session, [{"op": "remove_reaction", "id": "ATPM"}], session["version"])
+    assert stale.status_code == 409
+    assert stale.get_json()["version"] == session["version"] + 1
+
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "remove_reaction", "id": "NOT_A_REACTION"}],
+    [{"op": "add_reaction", "id": "PGI"}],
+    [{"op": "update_reaction", "id": "PGI", "lower_bound": 0}, {"op": "add_metabolite"}],
+])
+def test_failed_patch_leaves_the_session_untouched(client, session, operations):
+    response = patch(client, session, operations, session["version"])
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+    described = client.get(f"/api/v1/model-sessions/{session['session_id']}").get_json()
+    assert described["version"] == session["version"]
+    assert described["reactions"] == session["reactions"]
+
+
+ATP_SOURCE = {"adp_c": -1, "pi_c": -1, "h_c": -1, "atp_c": 1, "h2o_c": 1}
+
+
+def growth(client, session):
+    response = client.post("/api/v1/calculate-flux", json={
+        "session_id": session["session_id"], "flux_type": "fba", "objective": OBJECTIVE
+    })
+    assert response.status_code == 200
+    return response.get_json()["objective_value"]
+
+
+def test_added_and_updated_reactions_change_the_solution(client, session):
+    baseline = growth(client, session)
+    added = patch(client, session, [
+        {"op": "add_reaction", "id": "ATP_SOURCE", "metabolites": ATP_SOURCE, "lower_bound": 0, "upper_bound": 1000}
+    ], session["version"])
+    assert added.status_code == 200
+    assert added.get_json()["reactions"] == session["reactions"] + 1
+    assert growth(client, session) > baseline + 0.1
+
+    closed = patch(client, session, [{"op": "update_reaction", "id": "ATP_SOURCE", "upper_bound": 0}], session["version"] + 1)
+    assert closed.status_code == 200
+    assert closed.get_json()["version"] == session["version"] + 2
+    assert growth(client, session) == pytest.approx(baseline, abs=1e-6)
+
+
+def test_failed_patch_keeps_the_solution(client, session):
+    baseline = growth(client, session)
+    response = patch(client, session, [
+        {"op": "update_reaction", "id": "ATPM", "lower_bound": 0},
+        {"op": "add_reaction", "id": "ATP_SOURCE", "metabolites": ATP_SOURCE, "upper_bound": 1000},
+        {"op": "remove_reaction", "id": "NOT_A_REACTION"}
+    ], session["version"])
+    assert response.status_code == 400
+    assert growth(client, session) == pytest.approx(baseline, abs=1e-9)
+    assert client.get(f"/api/v1/model-sessions/{session['session_id']}").get_json()["version"] == session["version"]
+
+
+def test_session_is_weighed_by_its_model(app_module, session):
+    stored, weight = app_module.model_sessions.entries[session["session_id"]]
+    assert weight == stored.footprint()
+    assert weight > 100 * 2**10
+
+
+def test_session_weight_follows_the_model(app_module, client, session):
+    def weight():
+        return app_module.model_sessions.entries[session["session_id"]][1]
+
+    before = weight()
+    assert before > 100 * 2**10
+    patch(client, session, [
+        {"op": "add_reaction", "id": "ATP_SOURCE", "metabolites": ATP_SOURCE, "upper_bound": 1000}
+    ], session["version"])
+    assert weight() > before
+    patch(client, session, [{"op": "remove_reaction", "id": "ATP_SOURCE"}], session["version"] + 1)
+    assert weight() == before
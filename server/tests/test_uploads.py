@@ -0,0 +1,54 @@
+import hashlib
+import json
+import os
+
+import msgpack
+import pytest
+
+from conftest import TEST_MODELS
+
+MSGPACK = "application/msgpack"
+
+
+def upload(client, name, accept=None):
+    with open(os.path.join(TEST_MODELS, name), "rb") as f:
+        return client.post(
+            "/api/v1/cobra-model",
+            data={"file": (f, name)},
+            content_type="multipart/form-data",
+            headers={"Accept": accept} if accept else {}
+        )
+
+
+def decode(response):
+    if response.mimetype == MSGPACK:
+        return msgpack.unpackb(response.data, raw=False)
+    return json.loads(response.data)
+
+
+@pytest.fixture
+def fresh_upload(app_module, catalogs):
+    """Drops the test model's cached upload, so the first upload in a test parses it."""
+    with open(os.path.join(TEST_MODELS, "e_coli_core.mat"), "rb") as f:
+        app_module.upload_cache.pop(f"{hashlib.sha256(f.read()).hexdigest()}:.mat")
+    return "e_coli_core.mat"
+
+
+@pytest.mark.parametrize("first, second", [(MSGPACK, "application/json"), ("application/json", MSGPACK)])
+def test_cached_upload_is_encoded_for_each_client(client, fresh_upload, first, second):
+    parsed = upload(client, fresh_upload, accept=first)
+    cached = upload(client, fresh_upload, accept=second)
+    assert parsed.status_code == cached.status_code == 200
+    assert parsed.mimetype == first
+    assert cached.mimetype == second
+    assert "Accept" in cached.headers["Vary"]
+    assert decode(parsed) == decode(cached)
+    assert decode(cached)["database"] == "BIGG"
+
+
+def test_upload_cache_counts_the_cached_body(app_module, client, fresh_upload):
+    before = app_module.upload_cache.stats()
+    response = upload(client, fresh_upload)
+    after = app_module.upload_cache.stats()
+    assert after["entries"] == before["entries"] + 1
+    assert after["bytes"] - before["bytes"] == len(response.data)